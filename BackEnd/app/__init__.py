@@ -1,5 +1,6 @@
-from flask import Flask
+from flask import Flask, jsonify, request
 from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate, stamp
 from flask_sqlalchemy import SQLAlchemy
 from flasgger import Swagger
 from dotenv import load_dotenv
@@ -15,8 +16,9 @@ load_dotenv(dotenv_path)
 # Initialize database
 db = SQLAlchemy()
 
-# Initialize blocklist set for storing JWT tokens
-BLOCKLIST = set()
+# Schema migrations live in BackEnd/migrations
+migrate = Migrate()
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
 
 
 # Create the Flask application
@@ -42,8 +44,47 @@ def create_app(config_class=None):
 
     # Initialize extensions
     db.init_app(app)
+    # Batch mode lets alembic alter SQLite tables by copying them
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
     jwt = JWTManager(app)
 
+    # Revoked tokens are shared by every worker through the database
+    from app.utilities.revocation import RevocationStore
+
+    revocation = RevocationStore(app.config["REVOCATION_SYNC_SECONDS"])
+    app.extensions["revocation"] = revocation
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return revocation.is_revoked(jwt_payload["jti"])
+
+    @jwt.revoked_token_loader
+    def revoked_token_response(jwt_header, jwt_payload):
+        return jsonify({"error": "Permission denied"}), 401
+
+    # Stream tokens (see routes/events.py) open event streams and nothing else
+    @jwt.token_verification_loader
+    def check_token_scope(jwt_header, jwt_data):
+        return "scope" not in jwt_data or request.endpoint == "events.stream_file_events"
+
+    @jwt.token_verification_failed_loader
+    def token_scope_response(jwt_header, jwt_data):
+        return jsonify({"error": "Permission denied"}), 401
+
+    # Resolve the authenticated Person once per request, through a shared cache
+    from app.utilities.current_user import UserCache
+
+    user_cache = UserCache(app.config["USER_CACHE_TTL_SECONDS"])
+    app.extensions["user_cache"] = user_cache
+
+    @jwt.user_lookup_loader
+    def load_current_user(jwt_header, jwt_data):
+        return user_cache.get(jwt_data[app.config["JWT_IDENTITY_CLAIM"]])
+
+    @jwt.user_lookup_error_loader
+    def current_user_not_found(jwt_header, jwt_data):
+        return jsonify({"error": "User not found"}), 404
+
     # Initialize Swagger with custom configuration
     swagger = Swagger(
         app,
@@ -73,6 +114,9 @@ def create_app(config_class=None):
     from app.routes.files import files
     from app.routes.patient import patients
     from app.routes.graph_data import graph_data
+    from app.routes.anomalies import anomalies
+    from app.routes.live import live
+    from app.routes.events import events
 
     app.register_blueprint(main)
     app.register_blueprint(api)
@@ -80,6 +124,38 @@ def create_app(config_class=None):
     app.register_blueprint(files)
     app.register_blueprint(patients)
     app.register_blueprint(graph_data)
+    app.register_blueprint(anomalies)
+    app.register_blueprint(live)
+    app.register_blueprint(events)
+
+    # Background ingestion queue for asynchronous uploads
+    from app.utilities.ingest_queue import IngestQueue
+
+    app.extensions["ingest_queue"] = IngestQueue(
+        app, app.config["INGEST_WORKERS"], app.config["INGEST_QUEUE_SIZE"]
+    )
+
+    # Password hashing off the request thread
+    from app.utilities.passwords import PasswordHasher
+
+    app.extensions["password_hasher"] = PasswordHasher(
+        app.config["PASSWORD_HASH_WORKERS"],
+        app.config["PASSWORD_HASH_ROUNDS"],
+        app.config["PASSWORD_HASH_MAX_PENDING"],
+        os.path.join(app.config["UPLOAD_FOLDER"], "password-slots"),
+    )
+
+    # Fan-out of the file event log to server-sent event streams
+    from app.utilities.file_events import FileEventPublisher
+
+    app.extensions["file_events"] = FileEventPublisher(
+        app, app.config["FILE_EVENT_POLL_SECONDS"]
+    )
+
+    # Register CLI commands
+    from app.cli import register_commands
+
+    register_commands(app)
 
     # Environment-specific database handling
     with app.app_context():
@@ -90,6 +166,8 @@ def create_app(config_class=None):
         if not os.path.exists(db_file):
             print("Database not found. Initializing production database...")
             db.create_all()
+            # The new schema is current; later changes arrive as migrations
+            stamp()
             InitDB.seed_db()
 
         if app.config["ENV"] == "development":
@@ -103,5 +181,22 @@ def create_app(config_class=None):
 
     return app
 
+def start_worker(app):
+    """
+    Forks the shared CPU pool and the hashing processes of a gunicorn worker,
+    then requeues the upload jobs an earlier worker left unfinished.
+    gunicorn.conf.py calls it from post_worker_init: the app is loaded but
+    the worker has not started its request threads, so the children are
+    forked from a single-threaded process holding no locks. Without
+    gunicorn (flask run, tests, CLI commands) the pools are created on
+    first use instead.
+    """
+    from app.utilities.ingest import Ingest
+
+    Ingest.pool(app.config["BATCH_PARSE_WORKERS"])
+    app.extensions["password_hasher"].start()
+    app.extensions["ingest_queue"].recover(app.config["INGEST_JOB_STALE_SECONDS"])
+
+
 # Expose the app callable for Gunicorn
 app = create_app()
@@ -0,0 +1,95 @@
+import click
+
+
+def register_commands(app):
+    """Registers the maintenance commands on the ``flask`` CLI."""
+
+    @app.cli.command("migrate-hr-data")
+    def migrate_hr_data():
+        """Re-encode legacy heart rate data with the current packed format."""
+        from app.init_db import InitDB
+
+        InitDB.migrate_hr_data()
+
+    @app.cli.command("build-hr-levels")
+    def build_hr_levels():
+        """Precompute zoom levels for recordings that have none."""
+        from app.init_db import InitDB
+
+        InitDB.build_hr_levels()
+
+    @app.cli.command("build-hr-payloads")
+    def build_hr_payloads():
+        """Precompute serialized responses for recordings that have none."""
+        from app.init_db import InitDB
+
+        InitDB.build_hr_payloads()
+
+    @app.cli.command("build-hr-metrics")
+    def build_hr_metrics():
+        """Compute derived metrics for recordings that have none."""
+        from app.init_db import InitDB
+
+        InitDB.build_hr_metrics()
+
+    @app.cli.command("rebuild-daily-rollups")
+    def rebuild_daily_rollups():
+        """Recompute the per-patient daily rollups from scratch."""
+        from app.init_db import InitDB
+
+        InitDB.rebuild_daily_rollups()
+
+    @app.cli.command("scan-anomalies")
+    @click.option("--batch-size", type=int, default=None, help="Recordings per chunk.")
+    @click.option("--workers", type=int, default=None, help="Scan processes.")
+    def scan_anomalies(batch_size, workers):
+        """Flag tachycardia, bradycardia and data gaps in every recording."""
+        from app.utilities.anomaly import AnomalyScan
+
+        run_id = AnomalyScan.start_run(app.config["ANOMALY_SCAN_STALE_SECONDS"])
+        if run_id is None:
+            raise click.ClickException("An anomaly scan is already running")
+        counts = AnomalyScan.run(
+            run_id,
+            batch_size or app.config["ANOMALY_SCAN_BATCH_SIZE"],
+            workers or app.config["ANOMALY_SCAN_WORKERS"],
+        )
+        print(f"Flagged {counts['flags']} anomalies in {counts['files']} recordings.")
+
+    @app.cli.command("prune-file-events")
+    @click.option("--days", type=int, default=7, help="Keep events this many days.")
+    def prune_file_events(days):
+        """Delete old entries of the file event log."""
+        from app.init_db import InitDB
+
+        InitDB.prune_file_events(days)
+
+    @app.cli.command("prune-upload-sessions")
+    @click.option("--hours", type=float, default=None, help="Idle time before removal.")
+    def prune_upload_sessions(hours):
+        """Delete resumable uploads that stopped receiving chunks."""
+        from app.utilities.chunked_upload import ChunkedUploadStore
+
+        max_age = (
+            hours * 3600 if hours is not None else app.config["UPLOAD_SESSION_TTL_SECONDS"]
+        )
+        removed = ChunkedUploadStore(app.config["UPLOAD_FOLDER"]).expire(max_age)
+        print(f"Removed {removed} upload sessions.")
+
+    @app.cli.command("import-roster")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--batch-size", type=int, default=500, help="Accounts per transaction.")
+    @click.option("--workers", type=int, default=None, help="Hashing processes.")
+    def import_roster(path, batch_size, workers):
+        """Register the accounts of a CSV or NDJSON roster."""
+        from app.utilities.roster import RosterImport
+
+        result = RosterImport.run(
+            path,
+            batch_size,
+            workers or app.config["PASSWORD_HASH_WORKERS"],
+            app.config["PASSWORD_HASH_ROUNDS"],
+        )
+        for error in result["errors"]:
+            print(f"Line {error['line']} ({error['email'] or 'no email'}): {error['error']}")
+        print(f"Imported {result['imported']} accounts, {len(result['errors'])} rows rejected.")
@@ -15,6 +15,48 @@ class Config:
     TEMPLATES_FOLDER = "templates"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER")
+    # Parse uploads incrementally instead of loading the whole JSON document
+    HR_STREAM_PARSE = environ.get("HR_STREAM_PARSE", "true").lower() == "true"
+    # "sync" parses uploads in the request, "async" hands them to the ingest queue
+    UPLOAD_INGEST_MODE = environ.get("UPLOAD_INGEST_MODE", "sync")
+    INGEST_WORKERS = int(environ.get("INGEST_WORKERS", 2))
+    INGEST_QUEUE_SIZE = int(environ.get("INGEST_QUEUE_SIZE", 32))
+    # Jobs still "processing" this long after being claimed are requeued on start
+    INGEST_JOB_STALE_SECONDS = int(environ.get("INGEST_JOB_STALE_SECONDS", 3600))
+    # Batch uploads: parse processes and maximum number of files per request
+    BATCH_PARSE_WORKERS = int(environ.get("BATCH_PARSE_WORKERS", 4))
+    BATCH_MAX_FILES = int(environ.get("BATCH_MAX_FILES", 100))
+    # Largest uncompressed size of one file extracted from a .zip batch
+    BATCH_MAX_MEMBER_BYTES = int(environ.get("BATCH_MAX_MEMBER_BYTES", 256 * 1024 * 1024))
+    # Largest chunk accepted by the resumable upload protocol
+    UPLOAD_CHUNK_MAX_BYTES = int(environ.get("UPLOAD_CHUNK_MAX_BYTES", 8 * 1024 * 1024))
+    # Resumable uploads idle this long are removed
+    UPLOAD_SESSION_TTL_SECONDS = int(environ.get("UPLOAD_SESSION_TTL_SECONDS", 24 * 3600))
+    # Most samples accepted in one live streaming batch
+    LIVE_BATCH_MAX_SAMPLES = int(environ.get("LIVE_BATCH_MAX_SAMPLES", 10000))
+    # Password hashing: bcrypt cost, hashing processes and operations queued at most
+    PASSWORD_HASH_ROUNDS = int(environ.get("PASSWORD_HASH_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS = int(environ.get("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(environ.get("PASSWORD_HASH_MAX_PENDING", 16))
+    # Seconds an authenticated user is cached between requests
+    USER_CACHE_TTL_SECONDS = float(environ.get("USER_CACHE_TTL_SECONDS", 30))
+    # Seconds a worker may take to see tokens revoked by another worker
+    REVOCATION_SYNC_SECONDS = float(environ.get("REVOCATION_SYNC_SECONDS", 5))
+    # Server-sent file events: event log poll interval and keep-alive period
+    FILE_EVENT_POLL_SECONDS = float(environ.get("FILE_EVENT_POLL_SECONDS", 1.0))
+    FILE_EVENT_HEARTBEAT_SECONDS = float(environ.get("FILE_EVENT_HEARTBEAT_SECONDS", 15))
+    # Streams end after this long and the client reconnects after the retry delay
+    FILE_EVENT_STREAM_SECONDS = float(environ.get("FILE_EVENT_STREAM_SECONDS", 300))
+    FILE_EVENT_RETRY_SECONDS = float(environ.get("FILE_EVENT_RETRY_SECONDS", 1))
+    # Lifetime of the stream tokens EventSource clients pass in the URL
+    FILE_EVENT_TOKEN_SECONDS = int(environ.get("FILE_EVENT_TOKEN_SECONDS", 60))
+    # Anomaly scan: recordings per chunk read from file_meta, and processes of
+    # the scan-anomalies command. Scans started over HTTP run in the worker's
+    # shared pool of BATCH_PARSE_WORKERS processes instead.
+    ANOMALY_SCAN_BATCH_SIZE = int(environ.get("ANOMALY_SCAN_BATCH_SIZE", 200))
+    ANOMALY_SCAN_WORKERS = int(environ.get("ANOMALY_SCAN_WORKERS", 4))
+    # A run without progress for this long is taken to have died
+    ANOMALY_SCAN_STALE_SECONDS = int(environ.get("ANOMALY_SCAN_STALE_SECONDS", 600))
 
 class DevelopmentConfig(Config):
     """Development-specific configuration."""
@@ -1,5 +1,8 @@
 from app import create_app, db
-from app.models import UserType
+from app.models import DailyRollup, FileEvent, FileMeta, UserType
+from app.utilities.hr_codec import HRCodec, VERSION
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, or_, text
 
 
 class InitDB:
@@ -35,6 +38,224 @@ class InitDB:
         finally:
             db.session.close()
 
+    @staticmethod
+    def migrate_hr_data(batch_size: int = 500):
+        """
+        Re-encodes legacy JSON text rows and blobs of older HRCodec versions
+        of file_meta.hr_data in the current packed format, then fills the
+        measurement_date and start_time columns rows stored before they
+        existed from their series.
+        """
+        select_legacy = text(
+            "SELECT id, hr_data FROM file_meta "
+            "WHERE hr_data IS NOT NULL "
+            "AND (typeof(hr_data) = 'text' OR hex(substr(hr_data, 4, 1)) != :version) "
+            "AND id > :last_id ORDER BY id LIMIT :limit"
+        )
+        table = FileMeta.__table__
+        update_row = (
+            table.update()
+            .where(table.c.id == bindparam("b_id"))
+            .values(hr_data=bindparam("b_hr_data"))
+        )
+
+        migrated = 0
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select_legacy,
+                {"version": f"{VERSION:02X}", "last_id": last_id, "limit": batch_size},
+            ).all()
+            if not rows:
+                break
+            db.session.execute(
+                update_row,
+                [{"b_id": row.id, "b_hr_data": HRCodec.decode(row.hr_data)} for row in rows],
+            )
+            db.session.commit()
+            migrated += len(rows)
+            last_id = rows[-1].id
+
+        print(f"Migrated {migrated} heart rate recordings.")
+        InitDB._backfill_hr_dates(batch_size)
+        return migrated
+
+    @staticmethod
+    def _backfill_hr_dates(batch_size: int):
+        """
+        Sets missing measurement_date/start_time columns from the
+        date_of_measurement and start_time the series itself recorded.
+        """
+        from app.utilities.ingest import Ingest
+
+        select_missing = text(
+            "SELECT id, hr_data FROM file_meta "
+            "WHERE hr_data IS NOT NULL "
+            "AND (measurement_date IS NULL OR start_time IS NULL) "
+            "AND id > :last_id ORDER BY id LIMIT :limit"
+        )
+        table = FileMeta.__table__
+        update_row = (
+            table.update()
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                measurement_date=func.coalesce(table.c.measurement_date, bindparam("b_date")),
+                start_time=func.coalesce(table.c.start_time, bindparam("b_start_time")),
+            )
+        )
+
+        backfilled = 0
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select_missing, {"last_id": last_id, "limit": batch_size}
+            ).all()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                data = HRCodec.decode(row.hr_data)
+                measurement_date = Ingest._parse_date(data.get("date_of_measurement"))
+                start_time = data.get("start_time")
+                if measurement_date is not None or start_time is not None:
+                    updates.append(
+                        {"b_id": row.id, "b_date": measurement_date, "b_start_time": start_time}
+                    )
+            if updates:
+                db.session.execute(update_row, updates)
+                db.session.commit()
+            backfilled += len(updates)
+            last_id = rows[-1].id
+
+        print(f"Backfilled the dates of {backfilled} heart rate recordings.")
+        return backfilled
+
+    @staticmethod
+    def build_hr_levels(batch_size: int = 100):
+        """Builds the zoom levels of recordings stored before they existed."""
+        from app.utilities.ingest import Ingest
+
+        built = 0
+        last_id = 0
+        while True:
+            records = (
+                FileMeta.query.filter(FileMeta.id > last_id, ~FileMeta.levels.any())
+                .order_by(FileMeta.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not records:
+                break
+            for record in records:
+                record.levels = Ingest.build_levels(record.hr_data)
+                record.sample_count = len(record.hr_data.get("time") or [])
+            db.session.commit()
+            built += len(records)
+            last_id = records[-1].id
+
+        print(f"Built zoom levels for {built} heart rate recordings.")
+        return built
+
+    @staticmethod
+    def build_hr_payloads(batch_size: int = 100):
+        """
+        Serializes the response payloads of recordings stored before they
+        existed, or before one of their content codings was available.
+        """
+        from app.utilities.ingest import Ingest
+        from app.utilities.series_payload import SeriesPayload
+
+        built = 0
+        last_id = 0
+        while True:
+            records = (
+                FileMeta.query.filter(
+                    FileMeta.id > last_id,
+                    or_(
+                        *(
+                            ~FileMeta.payloads.any(encoding=encoding)
+                            for encoding in SeriesPayload.VARIANTS
+                        )
+                    ),
+                )
+                .order_by(FileMeta.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not records:
+                break
+            # Rows of the replaced variants are deleted before the new ones go in
+            for record in records:
+                record.payloads = []
+            db.session.flush()
+            for record in records:
+                record.payloads = Ingest.build_payloads(record.hr_data)
+            db.session.commit()
+            built += len(records)
+            last_id = records[-1].id
+
+        print(f"Built response payloads for {built} heart rate recordings.")
+        return built
+
+    @staticmethod
+    def build_hr_metrics(batch_size: int = 100):
+        """Computes the metrics of recordings stored before they existed."""
+        from app.utilities.ingest import Ingest
+
+        built = 0
+        last_id = 0
+        while True:
+            records = (
+                FileMeta.query.filter(FileMeta.id > last_id, ~FileMeta.metrics.has())
+                .order_by(FileMeta.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not records:
+                break
+            for record in records:
+                record.metrics = Ingest.build_metrics(record.hr_data)
+            db.session.commit()
+            built += len(records)
+            last_id = records[-1].id
+
+        print(f"Computed metrics for {built} heart rate recordings.")
+        return built
+
+    @staticmethod
+    def rebuild_daily_rollups(batch_size: int = 100):
+        """Recomputes every daily rollup from the stored recordings."""
+        from app.utilities.ingest import Ingest
+
+        DailyRollup.query.delete()
+        folded = 0
+        last_id = 0
+        while True:
+            records = (
+                FileMeta.query.filter(FileMeta.id > last_id)
+                .order_by(FileMeta.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not records:
+                break
+            folded += Ingest.update_rollups(records)
+            db.session.commit()
+            last_id = records[-1].id
+        db.session.commit()
+
+        print(f"Rebuilt daily rollups from {folded} heart rate recordings.")
+        return folded
+
+    @staticmethod
+    def prune_file_events(days: int = 7):
+        """Deletes file events older than the given number of days."""
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        pruned = FileEvent.query.filter(FileEvent.created_at < cutoff).delete()
+        db.session.commit()
+        print(f"Pruned {pruned} file events.")
+        return pruned
+
 
 if __name__ == "__main__":
     app = create_app()
@@ -1,6 +1,29 @@
 from app import db
 from sqlalchemy import CheckConstraint
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
+from app.utilities.hr_codec import HRCodec
+
+
+class HeartRateSeries(TypeDecorator):
+    """Heart-rate series dict stored as a packed HRCodec blob."""
+
+    impl = db.LargeBinary
+    cache_ok = True
+
+    def __init__(self, compress: bool = True):
+        super().__init__()
+        self.compress = compress
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        return HRCodec.encode(value, compress=self.compress)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return HRCodec.decode(value)
 
 
 class UserType(db.Model):
@@ -31,14 +54,14 @@ class Person(db.Model):
     telecom_value = db.Column(db.Text)
     gender = db.Column(db.Text)
     active = db.Column(db.Integer)
-    user_type = db.Column(db.Integer, db.ForeignKey("user_type.id"))
+    user_type = db.Column(db.Integer, db.ForeignKey("user_type.id"), index=True)
 
 
 class Auth(db.Model):
     __tablename__ = "auth"
 
     id = db.Column(db.Integer, primary_key=True)
-    person_id = db.Column(db.Integer, db.ForeignKey("person.id"))
+    person_id = db.Column(db.Integer, db.ForeignKey("person.id"), index=True)
     password = db.Column(db.Text)
     role = db.Column(db.Text)
 
@@ -67,11 +90,251 @@ class FileMeta(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey("person.id"))
+    # Days of one multi-day export share the same upload_id
+    upload_id = db.Column(db.String(32), index=True)
     filename = db.Column(db.String(255))
     file_type = db.Column(db.String(10))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    hr_data = db.Column(db.Text)
+    measurement_date = db.Column(db.Date)
+    start_time = db.Column(db.BigInteger)  # Epoch milliseconds of first sample
+    content_hash = db.Column(db.String(64))  # SHA-256 of the uploaded file
+    sample_count = db.Column(db.Integer)
+    hr_data = db.Column(HeartRateSeries())
 
     uploader = db.relationship(
         "Person", backref="uploaded_files", foreign_keys=[patient_id]
     )
+    levels = db.relationship(
+        "HeartRateLevel", backref="file_meta", cascade="all, delete-orphan"
+    )
+    payloads = db.relationship(
+        "HeartRatePayload", backref="file_meta", cascade="all, delete-orphan"
+    )
+    metrics = db.relationship(
+        "HeartRateMetrics",
+        backref="file_meta",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        db.Index("ix_file_meta_patient_content_hash", patient_id, content_hash),
+        # File listings, newest uploads and date-range queries of one patient
+        db.Index("ix_file_meta_patient_created", patient_id, created_at),
+        db.Index("ix_file_meta_patient_measurement", patient_id, measurement_date),
+    )
+
+
+class HeartRateLevel(db.Model):
+    """Precomputed min/max/mean buckets of a FileMeta series (see Pyramid)."""
+
+    __tablename__ = "heart_rate_level"
+
+    file_id = db.Column(
+        db.Integer, db.ForeignKey("file_meta.id", ondelete="CASCADE"), primary_key=True
+    )
+    resolution = db.Column(db.Integer, primary_key=True)  # Seconds per bucket
+    bucket_count = db.Column(db.Integer)
+    data = db.Column(db.LargeBinary)
+
+
+class HeartRatePayload(db.Model):
+    """Serialized, optionally precompressed series of a FileMeta row (see SeriesPayload)."""
+
+    __tablename__ = "heart_rate_payload"
+
+    file_id = db.Column(
+        db.Integer, db.ForeignKey("file_meta.id", ondelete="CASCADE"), primary_key=True
+    )
+    encoding = db.Column(db.String(16), primary_key=True)  # HTTP content coding
+    data = db.Column(db.LargeBinary)
+
+
+class HeartRateMetrics(db.Model):
+    """Derived cardiac metrics of a FileMeta series (see Metrics)."""
+
+    __tablename__ = "heart_rate_metrics"
+
+    file_id = db.Column(
+        db.Integer, db.ForeignKey("file_meta.id", ondelete="CASCADE"), primary_key=True
+    )
+    sample_count = db.Column(db.Integer)
+    min_hr = db.Column(db.Float)
+    max_hr = db.Column(db.Float)
+    mean_hr = db.Column(db.Float)
+    sd_hr = db.Column(db.Float)
+    rmssd = db.Column(db.Float)  # Of successive samples, in bpm
+    resting_hr_reported = db.Column(db.Float)
+    resting_hr_estimate = db.Column(db.Float)
+    zone_minutes = db.Column(db.JSON)  # {zone name: minutes}
+    rolling_mean = db.Column(db.JSON)  # {window, time, value}
+
+
+class DailyRollup(db.Model):
+    """Per-patient daily heart-rate summary, folded in as uploads arrive."""
+
+    __tablename__ = "daily_rollup"
+
+    patient_id = db.Column(db.Integer, db.ForeignKey("person.id"), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    sample_count = db.Column(db.Integer, nullable=False)
+    value_sum = db.Column(db.Float, nullable=False)  # Keeps the mean exact when merging
+    min_hr = db.Column(db.Float)
+    max_hr = db.Column(db.Float)
+    mean_hr = db.Column(db.Float)
+    resting_hr = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class AnomalyFlag(db.Model):
+    """A stretch of a recording flagged by the anomaly scan (see AnomalyScan)."""
+
+    __tablename__ = "anomaly_flag"
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(
+        db.Integer,
+        db.ForeignKey("file_meta.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    patient_id = db.Column(db.Integer, db.ForeignKey("person.id"), nullable=False)
+    kind = db.Column(db.String(16), nullable=False)
+    start_minute = db.Column(db.Float)  # Relative to the first sample
+    end_minute = db.Column(db.Float)
+    start_at = db.Column(db.BigInteger)  # Epoch milliseconds, if known
+    peak_hr = db.Column(db.Float)  # Highest (tachycardia) or lowest (bradycardia)
+    detected_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        CheckConstraint(
+            kind.in_(["tachycardia", "bradycardia", "gap"]),
+            name="check_anomaly_flag_kind",
+        ),
+        db.Index("ix_anomaly_flag_patient_start", patient_id, start_at),
+        db.Index("ix_anomaly_flag_kind_start", kind, start_at),
+    )
+
+
+class AnomalyScanRun(db.Model):
+    """
+    A run of the anomaly scan. ``active`` is true while the run is in
+    progress and NULL afterwards; its unique index lets only one run be in
+    progress across all processes.
+    """
+
+    __tablename__ = "anomaly_scan_run"
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(16), default="running")
+    active = db.Column(db.Boolean, unique=True, default=True)
+    files = db.Column(db.Integer, default=0)
+    flags = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        CheckConstraint(
+            status.in_(["running", "done", "failed"]),
+            name="check_anomaly_scan_run_status",
+        ),
+    )
+
+
+class LiveSession(db.Model):
+    """A recording streamed by a device in batches (see LiveStream)."""
+
+    __tablename__ = "live_session"
+
+    id = db.Column(db.String(32), primary_key=True)  # Also the upload_id once closed
+    patient_id = db.Column(db.Integer, db.ForeignKey("person.id"), nullable=False)
+    status = db.Column(db.String(16), default="open", nullable=False)
+    sample_count = db.Column(db.Integer, default=0, nullable=False)
+    last_timestamp = db.Column(db.BigInteger)  # Latest sample, epoch milliseconds
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    closed_at = db.Column(db.DateTime)
+
+    batches = db.relationship(
+        "LiveBatch",
+        backref="session",
+        cascade="all, delete-orphan",
+        order_by="LiveBatch.seq",
+    )
+
+    __table_args__ = (
+        CheckConstraint(status.in_(["open", "closed"]), name="check_live_session_status"),
+    )
+
+
+class LiveBatch(db.Model):
+    """One appended batch of samples, packed by LiveStream.pack."""
+
+    __tablename__ = "live_batch"
+
+    session_id = db.Column(
+        db.String(32), db.ForeignKey("live_session.id", ondelete="CASCADE"), primary_key=True
+    )
+    seq = db.Column(db.Integer, primary_key=True)
+    sample_count = db.Column(db.Integer, nullable=False)
+    first_timestamp = db.Column(db.BigInteger)
+    last_timestamp = db.Column(db.BigInteger)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+
+class FileEvent(db.Model):
+    """
+    Append-only log of stored recordings, written in the transaction that
+    inserts the FileMeta row and read by every worker's FileEventPublisher.
+    """
+
+    __tablename__ = "file_event"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False, default="file_created")
+    patient_id = db.Column(db.Integer, nullable=False, index=True)
+    file_id = db.Column(db.Integer, nullable=False)
+    upload_id = db.Column(db.String(32))
+    measurement_date = db.Column(db.Date)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class TokenBlocklist(db.Model):
+    """Revoked JWTs shared by every worker, kept until the token expires."""
+
+    __tablename__ = "token_blocklist"
+
+    # Insertion order lets workers fetch only revocations they haven't seen
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=False, unique=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Ids are never reused, even once purging has emptied the table, or a
+    # worker that synced up to a higher id would skip the new revocations
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class UploadJob(db.Model):
+    __tablename__ = "upload_job"
+
+    # Also used as the upload_id of the FileMeta rows the job creates
+    id = db.Column(db.String(32), primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey("person.id"))
+    filename = db.Column(db.String(255))
+    file_type = db.Column(db.String(10))
+    file_path = db.Column(db.Text)
+    content_hash = db.Column(db.String(64))
+    status = db.Column(db.String(16), default="queued")
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)  # When a worker claimed the job
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        CheckConstraint(
+            status.in_(["queued", "processing", "done", "failed"]),
+            name="check_upload_job_status",
+        ),
+    )
@@ -0,0 +1,159 @@
+import threading
+from flask import Blueprint, current_app, jsonify, request
+from flask_cors import CORS
+from flask_jwt_extended import current_user, jwt_required
+from app.models import db, AnomalyFlag, AnomalyScanRun
+from app.utilities.anomaly import AnomalyScan
+from app.utilities.ingest import Ingest
+
+anomalies = Blueprint("anomalies", __name__)
+CORS(anomalies)  # Apply CORS to all routes within this Blueprint
+
+
+def _current_clinician():
+    """Returns (user, error response) for the authenticated clinician."""
+    user = current_user
+    if user.user_type == 2:
+        return None, (
+            jsonify(
+                {"error": "Permission denied. Only clinicians can access this endpoint"}
+            ),
+            403,
+        )
+    return user, None
+
+
+@anomalies.route("/anomaly-scans", methods=["POST"])
+@jwt_required()
+def start_anomaly_scan():
+    """
+    Starts a scan of every recording in the background. The nightly run is
+    the ``flask scan-anomalies`` command; this is the on-demand trigger.
+    Only one scan runs at a time across all workers and the CLI. It shares
+    the worker's process pool with batch uploads, so BATCH_PARSE_WORKERS
+    sizes it rather than ANOMALY_SCAN_WORKERS.
+    """
+    try:
+        _, error = _current_clinician()
+        if error:
+            return error
+
+        run_id = AnomalyScan.start_run(current_app.config["ANOMALY_SCAN_STALE_SECONDS"])
+        if run_id is None:
+            return jsonify({"error": "An anomaly scan is already running"}), 409
+
+        # Chunks are evaluated in the worker's shared process pool, which was
+        # forked before any background thread existed
+        app = current_app._get_current_object()
+        workers = app.config["BATCH_PARSE_WORKERS"]
+        threading.Thread(
+            target=_run_scan,
+            args=(app, run_id, workers, Ingest.pool(workers)),
+            name="anomaly-scan",
+            daemon=True,
+        ).start()
+        return jsonify({"message": "Anomaly scan started", "scan_id": run_id}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _run_scan(app, run_id, workers, executor):
+    with app.app_context():
+        try:
+            counts = AnomalyScan.run(
+                run_id, app.config["ANOMALY_SCAN_BATCH_SIZE"], workers, executor
+            )
+            print(f"Anomaly scan flagged {counts['flags']} in {counts['files']} recordings.")
+        except Exception as e:
+            print(f"Anomaly scan failed: {str(e)}")
+
+
+@anomalies.route("/anomaly-scans/<int:scan_id>", methods=["GET"])
+@jwt_required()
+def get_anomaly_scan(scan_id):
+    """Status of a scan: running, done or failed, with its progress."""
+    try:
+        _, error = _current_clinician()
+        if error:
+            return error
+
+        run = db.session.get(AnomalyScanRun, scan_id)
+        if not run:
+            return jsonify({"error": "Anomaly scan not found"}), 404
+        return (
+            jsonify(
+                {
+                    "id": run.id,
+                    "status": run.status,
+                    "files": run.files,
+                    "flags": run.flags,
+                    "error": run.error,
+                    "started_at": run.started_at.isoformat(),
+                    "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@anomalies.route("/anomaly-flags", methods=["GET"])
+@jwt_required()
+def list_anomaly_flags():
+    """
+    Flags of the last scan, newest first, filtered by the optional
+    patient_id, file_id and kind query parameters.
+    """
+    try:
+        _, error = _current_clinician()
+        if error:
+            return error
+
+        try:
+            page = int(request.args.get("page", 1))
+            per_page = int(request.args.get("limit", 50))
+            patient_id = request.args.get("patient_id", type=int)
+            file_id = request.args.get("file_id", type=int)
+        except ValueError:
+            return jsonify({"error": "Invalid query parameter"}), 400
+        kind = request.args.get("kind")
+
+        query = AnomalyFlag.query
+        if patient_id is not None:
+            query = query.filter(AnomalyFlag.patient_id == patient_id)
+        if file_id is not None:
+            query = query.filter(AnomalyFlag.file_id == file_id)
+        if kind:
+            query = query.filter(AnomalyFlag.kind == kind)
+
+        pagination = query.order_by(
+            AnomalyFlag.start_at.desc(), AnomalyFlag.id
+        ).paginate(page=page, per_page=per_page, error_out=False)
+
+        return (
+            jsonify(
+                {
+                    "total": pagination.total,
+                    "page": page,
+                    "limit": per_page,
+                    "data": [
+                        {
+                            "id": flag.id,
+                            "file_id": flag.file_id,
+                            "patient_id": flag.patient_id,
+                            "kind": flag.kind,
+                            "start_minute": flag.start_minute,
+                            "end_minute": flag.end_minute,
+                            "start_at": flag.start_at,
+                            "peak_hr": flag.peak_hr,
+                            "detected_at": flag.detected_at.isoformat(),
+                        }
+                        for flag in pagination.items
+                    ],
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
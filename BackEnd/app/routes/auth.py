@@ -1,7 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import (
+    create_access_token,
+    current_user,
+    get_jwt,
+    jwt_required,
+)
 from app.models import (
     db,
     Person,
@@ -12,13 +16,32 @@ from app.models import (
 from app.swagger.guides import register_desc, login_desc
 from flasgger import swag_from
 from app.utilities.util import Util
+from app.utilities.passwords import MAX_PASSWORD_BYTES, PasswordHasherBusy, password_too_long
 from datetime import datetime, timedelta
-from app import BLOCKLIST
 
 auth = Blueprint("auth", __name__)
 CORS(auth)  # Apply CORS to all routes within this Blueprint
 
 
+def _add_account(person, hashed_password, role):
+    """
+    Adds a person with its auth and register_meta rows. Flushing assigns the
+    ids the later rows refer to; the caller commits all three at once.
+    """
+    db.session.add(person)
+    db.session.flush()
+    new_auth = Auth(person_id=person.id, password=hashed_password, role=role)
+    db.session.add(new_auth)
+    db.session.flush()
+    db.session.add(RegisterMeta(person_id=person.id, auth_id=new_auth.id))
+
+
+def _hasher_busy_response():
+    response = jsonify({"error": "Too many sign-ins in progress, please retry later"})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+
 @auth.route("/register/patient", methods=["POST"])
 @swag_from(register_desc)
 def register_person():
@@ -32,7 +55,6 @@ def register_person():
     password = data.get("password")
     gender = data.get("gender")
     date_of_birth = data.get("dob")
-    user_type = UserType.query.filter_by(name="patient").first()
 
     # Validate input
     if not first_name:
@@ -43,6 +65,8 @@ def register_person():
         return jsonify({"error": "Email is required"}), 400
     if not password:
         return jsonify({"error": "Password is required"}), 400
+    if password_too_long(password):
+        return jsonify({"error": f"Password must be at most {MAX_PASSWORD_BYTES} bytes"}), 400
     if not date_of_birth:
         return jsonify({"error": "Date of birth is required"}), 400
     if not Util.check_email_address(email):
@@ -54,7 +78,10 @@ def register_person():
         return jsonify({"error": "Email already registered"}), 400
 
     # Hash the password
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = current_app.extensions["password_hasher"].hash(password)
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
 
     # Convert string date to Python date object
     try:
@@ -64,6 +91,7 @@ def register_person():
 
     # Create a new person
     try:
+        user_type = UserType.query.filter_by(name="patient").first()
         new_person = Person(
             identifier_value=email,
             name_given=first_name,
@@ -76,22 +104,7 @@ def register_person():
             active=0,
             user_type=user_type.id,
         )
-        db.session.add(new_person)
-        db.session.commit()
-
-        new_auth = Auth(
-            person_id=new_person.id,
-            password=hashed_password,
-            role="patient",
-        )
-        db.session.add(new_auth)
-        db.session.commit()
-
-        new_register_meta = RegisterMeta(
-            person_id=new_person.id,
-            auth_id=new_auth.id,
-        )
-        db.session.add(new_register_meta)
+        _add_account(new_person, hashed_password, "patient")
         db.session.commit()
 
         return jsonify({"message": "Person registered successfully"}), 201
@@ -127,6 +140,8 @@ def register_clinician():
         return jsonify({"error": "Email is required"}), 400
     if not password:
         return jsonify({"error": "Password is required"}), 400
+    if password_too_long(password):
+        return jsonify({"error": f"Password must be at most {MAX_PASSWORD_BYTES} bytes"}), 400
     if not user_type:
         return jsonify({"error": "Clinician Type is required"}), 400
 
@@ -136,7 +151,10 @@ def register_clinician():
         return jsonify({"error": "Email already registered"}), 400
 
     # Hash the password
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = current_app.extensions["password_hasher"].hash(password)
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
 
     # Create a new person
     try:
@@ -150,22 +168,7 @@ def register_clinician():
             active=0,
             user_type=user_type.id,
         )
-        db.session.add(new_person)
-        db.session.commit()
-
-        new_auth = Auth(
-            person_id=new_person.id,
-            password=hashed_password,
-            role="clinician",
-        )
-        db.session.add(new_auth)
-        db.session.commit()
-
-        new_register_meta = RegisterMeta(
-            person_id=new_person.id,
-            auth_id=new_auth.id,
-        )
-        db.session.add(new_register_meta)
+        _add_account(new_person, hashed_password, "clinician")
         db.session.commit()
 
         return jsonify({"message": "Clinician registered successfully"}), 201
@@ -192,27 +195,34 @@ def login():
     if not user:
         return jsonify({"error": "Unknown email address"}), 401
 
-    # Query to check user type
-    user_type = Person.query.filter_by(identifier_value=email).first().user_type
-    if user_type == 2:
-        user_type = "patient"
-    else:
-        user_type = "clinician"
-
-    print(f"User type: {user_type}")
+    user_type = "patient" if user.user_type == 2 else "clinician"
 
     # Verify password
-    if not check_password_hash(user.password_hash, password):
+    hasher = current_app.extensions["password_hasher"]
+    try:
+        valid = hasher.verify(password, user.password_hash)
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
+    if not valid:
         return jsonify({"error": "Invalid password"}), 401
 
-    # Query the active status us user
-    user = Person.query.filter_by(identifier_value=email).first()
     if user.active == 1:
         return jsonify({"error": "User already logged in"}), 401
 
     try:
         # Update active status to true
         user.active = 1
+
+        # Upgrade hashes made with other cost parameters while the password is
+        # known; werkzeug hashes of passwords bcrypt would truncate are kept
+        if hasher.needs_rehash(user.password_hash) and not password_too_long(password):
+            try:
+                user.password_hash = hasher.hash(password)
+                Auth.query.filter_by(person_id=user.id).update(
+                    {"password": user.password_hash}
+                )
+            except PasswordHasherBusy:
+                pass  # Upgraded on a later login
         db.session.commit()
 
         # Generate an access token for the user
@@ -239,16 +249,14 @@ def login():
 @swag_from("")
 @jwt_required()
 def logout():
-    user = get_jwt_identity()
-
-    # Query and change active status to false
-    person = Person.query.filter_by(identifier_value=user).first()
+    # Change active status to false; read from the table, not the user cache
+    person = db.session.get(Person, current_user.id)
     if person.active == 0:
         return jsonify({"error": "User already logged out"}), 401
     else:
         person.active = 0
         db.session.commit()
 
-    token = request.headers.get("Authorization").split(" ")[1]
-    BLOCKLIST.add(token)
+    token = get_jwt()
+    current_app.extensions["revocation"].revoke(token["jti"], token["exp"])
     return jsonify({"message": "Successfully logged out"}), 200
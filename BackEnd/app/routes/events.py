@@ -0,0 +1,122 @@
+import json
+import time
+from datetime import timedelta
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_cors import CORS
+from flask_jwt_extended import (
+    create_access_token,
+    current_user,
+    get_jwt,
+    get_jwt_identity,
+    get_jwt_request_location,
+    jwt_required,
+)
+
+events = Blueprint("events", __name__)
+CORS(events)  # Apply CORS to all routes within this Blueprint
+
+
+def _format_event(payload):
+    return f"id: {payload['id']}\nevent: {payload['kind']}\ndata: {json.dumps(payload)}\n\n"
+
+
+# Claim of the tokens minted for EventSource, which cannot set headers
+STREAM_SCOPE = "file-events"
+
+
+@events.route("/file-events/token", methods=["POST"])
+@jwt_required()
+def create_file_events_token():
+    """
+    Mints a short-lived token for opening event streams as ?jwt=, so the
+    access token never appears in a URL or an access log. The token only
+    authorizes GET /file-events.
+    """
+    try:
+        expires_in = current_app.config["FILE_EVENT_TOKEN_SECONDS"]
+        token = create_access_token(
+            identity=get_jwt_identity(),
+            additional_claims={"scope": STREAM_SCOPE},
+            expires_delta=timedelta(seconds=expires_in),
+        )
+        return jsonify({"token": token, "expires_in": expires_in}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@events.route("/file-events", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_file_events():
+    """
+    Server-sent events announcing new recordings. Clinicians receive every
+    patient's events, or only those of the repeated ?patient_id= parameters;
+    patients receive their own. A reconnecting client sends Last-Event-ID
+    (or ?last_event_id=) and first receives what it missed.
+
+    Browsers authenticate with a stream token from POST /file-events/token
+    passed as ?jwt=; access tokens are only accepted in the Authorization
+    header. The token is checked when a stream opens.
+
+    Each stream ends after FILE_EVENT_STREAM_SECONDS so it doesn't hold a
+    worker thread indefinitely; EventSource reconnects after the ``retry``
+    delay with the id of the last event, and the next stream resumes there.
+    Once the stream token has expired the reconnect is refused with 401, and
+    the client mints a new one and reconnects with ?last_event_id=.
+    """
+    try:
+        in_url = get_jwt_request_location() == "query_string"
+        if in_url and get_jwt().get("scope") != STREAM_SCOPE:
+            return jsonify({"error": "Use a stream token from POST /file-events/token"}), 401
+
+        user = current_user
+
+        if user.user_type == 2:
+            patient_ids = [user.id]
+        else:
+            try:
+                patient_ids = [int(value) for value in request.args.getlist("patient_id")]
+            except ValueError:
+                return jsonify({"error": "Invalid patient ID format"}), 400
+            patient_ids = patient_ids or None
+
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        try:
+            last_event_id = None if last_event_id is None else int(last_event_id)
+        except ValueError:
+            return jsonify({"error": "Invalid Last-Event-ID"}), 400
+
+        publisher = current_app.extensions["file_events"]
+        heartbeat = current_app.config["FILE_EVENT_HEARTBEAT_SECONDS"]
+        deadline = time.monotonic() + current_app.config["FILE_EVENT_STREAM_SECONDS"]
+        retry = current_app.config["FILE_EVENT_RETRY_SECONDS"]
+        subscription = publisher.subscribe(patient_ids)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        try:
+            yield f"retry: {int(retry * 1000)}\n\n"
+            if last_event_id is not None:
+                for payload in publisher.missed(last_event_id, subscription):
+                    yield _format_event(payload)
+            # An id without data moves the client's Last-Event-ID to where
+            # the live events begin, even if none are sent before the end
+            sent = max(subscription.start_id, last_event_id or 0)
+            yield f"id: {sent}\n\n"
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                payload = subscription.get(timeout=min(heartbeat, remaining))
+                if payload is None:
+                    yield ": keep-alive\n\n"
+                elif payload["id"] > sent:
+                    sent = payload["id"]
+                    yield _format_event(payload)
+        finally:
+            publisher.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -1,14 +1,18 @@
-from flask import Blueprint, current_app, json, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, url_for
 from flask_cors import CORS
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from contextlib import ExitStack
+from flask_jwt_extended import current_user, jwt_required
 import os
+import uuid
+import zipfile
 from werkzeug.utils import secure_filename
 from app.swagger.guides import files_desc
 from flasgger import swag_from
-from app import BLOCKLIST
 from datetime import datetime
-from app.models import Person, db, FileMeta
+from app.models import Person, db, FileMeta, UploadJob
 from app.utilities.util import Util
+from app.utilities.ingest import Ingest
+from app.utilities.chunked_upload import ChunkedUploadError, ChunkedUploadStore
 
 files = Blueprint("files", __name__)
 CORS(files)  # Apply CORS to all routes within this Blueprint
@@ -27,11 +31,6 @@ def allowed_file(filename):
 @jwt_required()
 def upload_file():
     try:
-        token = request.headers.get("Authorization").split(" ")[1]
-        if token in BLOCKLIST:
-            return jsonify({"error": "Permission denied"}), 401
-
-        current_user = get_jwt_identity()
         timestamp = datetime.now()
 
         file = request.files.get("file")
@@ -42,68 +41,478 @@ def upload_file():
             )
 
         # Get patient ID
-        patient = Person.query.filter_by(identifier_value=current_user).first()
-        if not patient:
-            return jsonify({"error": "Patient not found"}), 404
+        patient = current_user
+
+        # Identical re-uploads reuse the series that is already stored
+        content_hash = Util.content_hash(file.stream)
+        file.stream.seek(0)
+        existing = Ingest.find_duplicate(patient.id, content_hash)
+        if existing:
+            return _upload_response("File already uploaded", existing, duplicate=True)
+
+        # Reject early when the ingest queue cannot take more work
+        mode = request.args.get("mode", current_app.config["UPLOAD_INGEST_MODE"])
+        ingest_queue = current_app.extensions["ingest_queue"]
+        if mode == "async" and ingest_queue.full():
+            return _queue_full_response()
 
         # Create secure filename with timestamp
         filename = secure_filename(file.filename)
         file_type = filename.rsplit(".", 1)[1].lower()
 
-        # Save file
-        file_path = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
+        # Save file; queued files get a unique name so later uploads can't replace them
+        job_id = uuid.uuid4().hex if mode == "async" else None
+        stored_name = f"{job_id}_{filename}" if job_id else filename
+        file_path = os.path.join(current_app.config["UPLOAD_FOLDER"], stored_name)
         file.save(file_path)
 
-        file_data = Util.extract_heart_rate_values(file_path)
-
-        # Convert dictionary to JSON string
-        hr_data_json = json.dumps(file_data)
-
-        # Save metadata
-        try:
-            new_file = FileMeta(
+        if mode == "async":
+            job = UploadJob(
+                id=job_id,
                 patient_id=patient.id,
                 filename=filename,
                 file_type=file_type,
+                file_path=file_path,
+                content_hash=content_hash,
+                status="queued",
                 created_at=timestamp,
-                hr_data=hr_data_json,  # Save as string
             )
-            db.session.add(new_file)
+            db.session.add(job)
             db.session.commit()
+
+            if not ingest_queue.submit(job.id):
+                job.status = "failed"
+                job.error = "Ingestion queue is full"
+                job.finished_at = datetime.now()
+                db.session.commit()
+                return _queue_full_response()
+
+            status_url = url_for("files.get_upload_job", job_id=job.id)
+            response = jsonify(
+                {
+                    "message": "File accepted for processing",
+                    "job_id": job.id,
+                    "status": job.status,
+                    "status_url": status_url,
+                }
+            )
+            response.headers["Location"] = status_url
+            return response, 202
+
+        # One record per day of the export
+        days = Util.extract_heart_rate_days(
+            file_path, stream=current_app.config["HR_STREAM_PARSE"]
+        )
+
+        # Save metadata
+        try:
+            new_files = Ingest.store_days(
+                patient.id, days, filename, file_type, timestamp, content_hash=content_hash
+            )
         except Exception as e:
             print(f"Error saving file metadata: {str(e)}")
             return jsonify({"error": "Error saving file metadata"}), 500
 
+        return _upload_response("File uploaded successfully", new_files)
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+def _upload_response(message, records, duplicate=False):
+    return (
+        jsonify(
+            {
+                "message": message,
+                "file_id": records[0].id,
+                "file_ids": [record.id for record in records],
+                "upload_id": records[0].upload_id,
+                "filename": records[0].filename,
+                "duplicate": duplicate,
+                "created_at": records[0]
+                .created_at.isoformat()
+                .replace("T", " ")
+                .split(".")[0],
+            }
+        ),
+        200,
+    )
+
+
+@files.route("/upload-batch", methods=["POST"])
+@jwt_required()
+def upload_batch():
+    """
+    Uploads several JSON exports at once, either as repeated "files" parts or
+    as a single .zip archive. Files are parsed in parallel and all records are
+    stored in one transaction; the response reports a result per file.
+    """
+    try:
+        timestamp = datetime.now()
+
+        patient = current_user
+
+        uploads = request.files.getlist("files") or request.files.getlist("file")
+        if not uploads:
+            return jsonify({"error": "No files provided"}), 400
+
+        batch_id = uuid.uuid4().hex
+        upload_dir = current_app.config["UPLOAD_FOLDER"]
+        max_files = current_app.config["BATCH_MAX_FILES"]
+        max_member_bytes = current_app.config["BATCH_MAX_MEMBER_BYTES"]
+
+        with ExitStack() as stack:
+            # Collect (filename, archive, source) for every entry
+            sources = []
+            for upload in uploads:
+                if upload.filename.lower().endswith(".zip"):
+                    archive = stack.enter_context(zipfile.ZipFile(upload.stream))
+                    for member in archive.infolist():
+                        name = os.path.basename(member.filename)
+                        if member.is_dir() or not name or name.startswith("."):
+                            continue
+                        sources.append((secure_filename(name), archive, member))
+                else:
+                    sources.append((secure_filename(upload.filename), None, upload))
+
+            if len(sources) > max_files:
+                return (
+                    jsonify({"error": f"At most {max_files} files per batch"}),
+                    400,
+                )
+
+            entries = []
+            seen_hashes = {}
+            for index, (filename, archive, source) in enumerate(sources):
+                entry = {"filename": filename, "status": "failed"}
+                entries.append(entry)
+                if not filename or not allowed_file(filename):
+                    entry["error"] = "Invalid file type. Only .json files allowed."
+                    continue
+                # The declared size; extraction below also stops at the limit
+                if archive is not None and source.file_size > max_member_bytes:
+                    entry["error"] = f"File is larger than {max_member_bytes} bytes"
+                    continue
+
+                entry["file_type"] = filename.rsplit(".", 1)[1].lower()
+                entry["content_hash"] = _batch_entry_hash(archive, source)
+
+                # Skip re-parsing files already stored or repeated in this batch
+                if entry["content_hash"] in seen_hashes:
+                    entry["same_as"] = seen_hashes[entry["content_hash"]]
+                    continue
+                seen_hashes[entry["content_hash"]] = entry
+                entry["existing"] = Ingest.find_duplicate(
+                    patient.id, entry["content_hash"]
+                )
+                if not entry["existing"]:
+                    entry["file_path"] = os.path.join(
+                        upload_dir, f"{batch_id}_{index}_{filename}"
+                    )
+                    try:
+                        _save_batch_entry(
+                            archive, source, entry["file_path"], max_member_bytes
+                        )
+                    except ValueError as e:
+                        os.remove(entry["file_path"])
+                        entry.pop("file_path")
+                        entry["error"] = str(e)
+
+        # Parse every new entry in parallel
+        pending = [entry for entry in entries if entry.get("file_path")]
+        parsed = Ingest.parse_many(
+            [entry["file_path"] for entry in pending],
+            stream=current_app.config["HR_STREAM_PARSE"],
+            workers=current_app.config["BATCH_PARSE_WORKERS"],
+        )
+        for entry, (days, error) in zip(pending, parsed):
+            if error is not None:
+                entry["error"] = error
+                continue
+            entry["records"] = Ingest.build_records(
+                patient.id,
+                days,
+                entry["filename"],
+                entry["file_type"],
+                timestamp,
+                content_hash=entry["content_hash"],
+            )
+
+        # Store all records of the batch in one transaction
+        try:
+            records = [record for entry in pending for record in entry.get("records", [])]
+            db.session.add_all(records)
+            Ingest.update_rollups(records)
+            db.session.flush()
+            results = [_batch_result(entry) for entry in entries]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error saving file metadata: {str(e)}")
+            return jsonify({"error": "Error saving file metadata"}), 500
+
+        stored = sum(1 for result in results if result["status"] != "failed")
         return (
             jsonify(
                 {
-                    "message": "File uploaded successfully",
-                    "file_id": new_file.id,
-                    "filename": filename,
+                    "message": f"{stored} of {len(results)} files uploaded successfully",
+                    "results": results,
                     "created_at": timestamp.isoformat().replace("T", " ").split(".")[0],
                 }
             ),
+            200 if stored else 400,
+        )
+
+    except zipfile.BadZipFile:
+        return jsonify({"error": "Invalid zip archive"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+def _batch_entry_hash(archive, source):
+    if archive is not None:
+        with archive.open(source) as member:
+            return Util.content_hash(member)
+    content_hash = Util.content_hash(source.stream)
+    source.stream.seek(0)
+    return content_hash
+
+
+def _save_batch_entry(archive, source, file_path, max_bytes):
+    if archive is None:
+        source.save(file_path)
+        return
+    # Copy at most max_bytes so a zip bomb cannot fill the upload folder
+    with archive.open(source) as member, open(file_path, "wb") as target:
+        copied = 0
+        while True:
+            chunk = member.read(min(1024 * 1024, max_bytes + 1 - copied))
+            if not chunk:
+                break
+            copied += len(chunk)
+            if copied > max_bytes:
+                raise ValueError(f"File is larger than {max_bytes} bytes")
+            target.write(chunk)
+
+
+def _batch_result(entry):
+    """Builds the per-file result of a batch upload once ids are assigned."""
+    original = entry.get("same_as", entry)
+    records = original.get("existing") or original.get("records")
+    if not records:
+        return {
+            "filename": entry["filename"],
+            "status": "failed",
+            "error": entry.get("error") or original.get("error"),
+        }
+    return {
+        "filename": entry["filename"],
+        "status": "stored" if records is entry.get("records") else "duplicate",
+        "upload_id": records[0].upload_id,
+        "file_ids": [record.id for record in records],
+    }
+
+
+def _queue_full_response():
+    response = jsonify({"error": "Upload queue is full, please retry later"})
+    response.headers["Retry-After"] = "30"
+    return response, 503
+
+
+@files.route("/upload-jobs/<job_id>", methods=["GET"])
+@jwt_required()
+def get_upload_job(job_id):
+    try:
+        patient = current_user
+
+        job = UploadJob.query.filter_by(id=job_id, patient_id=patient.id).first()
+        if not job:
+            return jsonify({"error": "Upload job not found"}), 404
+
+        file_ids = []
+        if job.status == "done":
+            # Duplicate uploads resolve to the rows of the original upload
+            file_ids = [
+                file_id
+                for (file_id,) in db.session.query(FileMeta.id)
+                .filter_by(patient_id=job.patient_id, content_hash=job.content_hash)
+                .order_by(FileMeta.id)
+            ]
+
+        return (
+            jsonify(
+                {
+                    "job_id": job.id,
+                    "status": job.status,
+                    "filename": job.filename,
+                    "error": job.error,
+                    "file_ids": file_ids,
+                    "created_at": job.created_at.isoformat()
+                    .replace("T", " ")
+                    .split(".")[0],
+                    "finished_at": (
+                        job.finished_at.isoformat().replace("T", " ").split(".")[0]
+                        if job.finished_at
+                        else None
+                    ),
+                }
+            ),
             200,
         )
 
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@files.route("/upload-sessions", methods=["POST"])
+@jwt_required()
+def create_upload_session():
+    """
+    Starts a resumable upload. Chunks are then sent with
+    PUT /upload-sessions/<id>?offset=<n> and the file is parsed and stored by
+    POST /upload-sessions/<id>/finalize.
+    """
+    try:
+        patient = current_user
+
+        data = request.get_json() or {}
+        filename = secure_filename(data.get("filename") or "")
+        if not filename or not allowed_file(filename):
+            return (
+                jsonify({"error": "Invalid file type. Only .json files allowed."}),
+                400,
+            )
+
+        total_size = data.get("total_size")
+        if total_size is not None:
+            try:
+                total_size = int(total_size)
+            except (TypeError, ValueError):
+                return jsonify({"error": "Invalid total size"}), 400
+
+        store = _chunk_store()
+        store.expire(current_app.config["UPLOAD_SESSION_TTL_SECONDS"])
+        session = store.create(patient.id, filename, total_size)
+        return jsonify(_session_response(session)), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@files.route("/upload-sessions/<session_id>", methods=["GET", "PUT", "DELETE"])
+@jwt_required()
+def upload_session(session_id):
+    """
+    GET returns the acknowledged offset to resume from, PUT appends the raw
+    request body at ?offset=<n> and DELETE aborts the upload.
+    """
+    try:
+        patient = current_user
+
+        store = _chunk_store()
+        session = store.get(session_id, patient.id)
+        if not session:
+            return jsonify({"error": "Upload session not found"}), 404
+
+        if request.method == "DELETE":
+            store.discard(session_id)
+            return jsonify({"message": "Upload session deleted"}), 200
+
+        if request.method == "PUT":
+            try:
+                offset = int(request.args.get("offset", session["offset"]))
+            except ValueError:
+                return jsonify({"error": "Invalid offset"}), 400
+            try:
+                store.append(
+                    session,
+                    offset,
+                    request.stream,
+                    current_app.config["UPLOAD_CHUNK_MAX_BYTES"],
+                )
+            except ChunkedUploadError as e:
+                return jsonify({"error": str(e), "offset": e.offset}), e.status_code
+
+        return jsonify(_session_response(session)), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@files.route("/upload-sessions/<session_id>/finalize", methods=["POST"])
+@jwt_required()
+def finalize_upload_session(session_id):
+    try:
+        patient = current_user
+
+        store = _chunk_store()
+        session = store.get(session_id, patient.id)
+        if not session:
+            return jsonify({"error": "Upload session not found"}), 404
+
+        filename = session["filename"]
+        file_path = os.path.join(
+            current_app.config["UPLOAD_FOLDER"], f"{session_id}_{filename}"
+        )
+        try:
+            store.complete(session, file_path)
+        except ChunkedUploadError as e:
+            return jsonify({"error": str(e), "offset": e.offset}), e.status_code
+
+        with open(file_path, "rb") as file:
+            content_hash = Util.content_hash(file)
+        existing = Ingest.find_duplicate(patient.id, content_hash)
+        if existing:
+            os.remove(file_path)
+            return _upload_response("File already uploaded", existing, duplicate=True)
+
+        try:
+            new_files = Ingest.store_upload(
+                patient.id,
+                file_path,
+                filename,
+                filename.rsplit(".", 1)[1].lower(),
+                stream=current_app.config["HR_STREAM_PARSE"],
+                upload_id=session_id,
+                content_hash=content_hash,
+            )
+        except Exception:
+            # The session is gone, so nothing would ever reference the file
+            os.remove(file_path)
+            raise
+        return _upload_response("File uploaded successfully", new_files)
+
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
+def _chunk_store():
+    return ChunkedUploadStore(current_app.config["UPLOAD_FOLDER"])
+
+
+def _session_response(session):
+    return {
+        "session_id": session["id"],
+        "filename": session["filename"],
+        "offset": session["offset"],
+        "total_size": session["total_size"],
+    }
+
+
 @files.route("/list-files", methods=["GET"])
 @jwt_required()
 def list_files():
     try:
-        current_user = get_jwt_identity()
-        patient = Person.query.filter_by(identifier_value=current_user).first()
-        if not patient:
-            return jsonify({"error": "Patient not found"}), 404
+        patient = current_user
 
         # Join with Person to get uploader info
         files = (
             FileMeta.query.join(Person, FileMeta.patient_id == Person.id)
             .filter(FileMeta.patient_id == patient.id)
+            .order_by(FileMeta.created_at, FileMeta.id)
             .all()
         )
 
@@ -118,6 +527,12 @@ def list_files():
                     "file_id": file.id,
                     "filename": file.filename,
                     "file_type": file.file_type,
+                    "upload_id": file.upload_id,
+                    "measurement_date": (
+                        file.measurement_date.isoformat()
+                        if file.measurement_date
+                        else None
+                    ),
                     "uploaded_by": f"{uploader.name_given} {uploader.name_family}",
                     "created_at": file.created_at.isoformat()
                     .replace("T", " ")
@@ -136,8 +551,7 @@ def list_files():
 def list_files_by_patient(patient_id):
     try:
         # Get current user and check if clinician
-        current_user = get_jwt_identity()
-        user = Person.query.filter_by(identifier_value=current_user).first()
+        user = current_user
 
         if user.user_type == 2:  # 2 is patient type
             return (
@@ -155,7 +569,11 @@ def list_files_by_patient(patient_id):
             return jsonify({"error": "Patient not found"}), 404
 
         # Get files using relationship
-        files = FileMeta.query.filter_by(patient_id=patient_id).all()
+        files = (
+            FileMeta.query.filter_by(patient_id=patient_id)
+            .order_by(FileMeta.created_at, FileMeta.id)
+            .all()
+        )
 
         if not files:
             return jsonify({"message": "No files found"}), 404
@@ -167,6 +585,12 @@ def list_files_by_patient(patient_id):
                     "file_id": file_entry.id,
                     "filename": file_entry.filename,
                     "file_type": file_entry.file_type,
+                    "upload_id": file_entry.upload_id,
+                    "measurement_date": (
+                        file_entry.measurement_date.isoformat()
+                        if file_entry.measurement_date
+                        else None
+                    ),
                     "uploaded_by": f"{file_entry.uploader.name_given} {file_entry.uploader.name_family}",
                     "created_at": file_entry.created_at.isoformat()
                     .replace("T", " ")
@@ -1,10 +1,29 @@
-from flask import Blueprint, json, jsonify, request
+from flask import Blueprint, current_app, jsonify, make_response, request
 from flask_cors import CORS
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import BLOCKLIST
+from flask_jwt_extended import current_user, jwt_required
 from app.utilities.util import Util
+from app.utilities.downsample import Downsample
+from app.utilities.hr_codec import HRCodec
+from app.utilities.pyramid import Pyramid
+from app.utilities.series_payload import SeriesPayload
+from app.utilities.series_wire import MEDIA_TYPE as SERIES_MEDIA_TYPE, SeriesWire
+from datetime import date, datetime, timezone
+import hashlib
+import heapq
+import json
+from operator import itemgetter
+from sqlalchemy import LargeBinary, select, type_coerce
+from sqlalchemy.orm import defer
 import os
-from app.models import Person, FileMeta
+from app.models import (
+    db,
+    DailyRollup,
+    Person,
+    FileMeta,
+    HeartRateLevel,
+    HeartRateMetrics,
+    HeartRatePayload,
+)
 
 graph_data = Blueprint("graph_data", __name__)
 CORS(graph_data)
@@ -13,6 +32,20 @@ UPLOADS_DIR = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads"
 )
 
+# Point budget used to pick a zoom level when resolution=auto
+DEFAULT_MAX_POINTS = 1000
+RESOLUTION_LABELS = {"1s": 1, "10s": 10, "1min": 60, "10min": 600}
+# Stored recordings never change, so a response only varies with its ETag
+SERIES_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Bump when the shape of the series responses changes
+SERIES_ETAG_VERSION = "1"
+# Numeric start/end values at or above this are epoch milliseconds (1e11 ms
+# is March 1973) and below RELATIVE_TIME_LIMIT minutes since the first sample
+# (about 19 years). Values in between, such as epoch seconds, are rejected.
+ABSOLUTE_TIME_THRESHOLD = 1e11
+RELATIVE_TIME_LIMIT = 1e7
+AMBIGUOUS_TIME = "ambiguous"
+
 
 @graph_data.route("/heart-rate-data", methods=["GET"])
 @jwt_required()
@@ -29,14 +62,49 @@ def get_heart_rate_data():
         except ValueError:
             return jsonify({"error": "Invalid file ID format"}), 400
 
+        options, error = _parse_series_options(request.args)
+        if error:
+            return jsonify({"error": error}), 400
+
         # Get current user's ID
-        current_user = get_jwt_identity()
-        user = Person.query.filter_by(identifier_value=current_user).first()
+        user = current_user
+
+        # Get file metadata with proper parameter binding; hr_data is only
+        # loaded if the raw series is served
+        file_meta = (
+            FileMeta.query.options(defer(FileMeta.hr_data))
+            .filter_by(id=file_id, patient_id=user.id)
+            .first()
+        )
 
-        # Get file metadata with proper parameter binding
-        file_meta = FileMeta.query.filter_by(id=file_id, patient_id=user.id).first()
+        if not file_meta:
+            return jsonify({"error": "File not found"}), 404
+
+        # The full series is sent from the JSON payloads serialized at ingest
+        binary = _wants_binary()
+        encoding = None
+        if not binary and _is_full_series(options):
+            encoding = _payload_encoding(file_meta.id)
+
+        # Answer revalidations before any heart rate data is read
+        etag = _series_etag(
+            file_meta, options, SERIES_MEDIA_TYPE if binary else encoding
+        )
+        if request.if_none_match.contains_weak(etag):
+            return _cacheable(make_response("", 304), etag)
 
-        return jsonify({"data": json.loads(file_meta.hr_data)})
+        if encoding:
+            response = _json_payload(_stored_payload(file_meta.id, encoding))
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+            return _cacheable(response, etag)
+
+        series, error = _load_series(file_meta, options)
+        if error:
+            return jsonify({"error": error}), 400
+        if binary:
+            return _cacheable(_binary_series(series), etag)
+        return _cacheable(jsonify({"data": series}), etag)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -46,10 +114,7 @@ def get_heart_rate_data():
 def get_heart_rate_data_clinician():
     try:
         # Verify current user and clinician status
-        current_user = get_jwt_identity()
-        user = Person.query.filter_by(identifier_value=current_user).first()
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+        user = current_user
         if user.user_type == 2:
             return (
                 jsonify(
@@ -80,22 +145,47 @@ def get_heart_rate_data_clinician():
         except ValueError:
             return jsonify({"error": "Invalid ID format"}), 400
 
+        options, error = _parse_series_options({**request.args.to_dict(), **data})
+        if error:
+            return jsonify({"error": error}), 400
+
         # Check if patient exists
         patient = Person.query.filter_by(id=patient_id).first()
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
 
         # Check if file exists for patient
-        file_meta = FileMeta.query.filter_by(id=file_id, patient_id=patient_id).first()
+        file_meta = (
+            FileMeta.query.options(defer(FileMeta.hr_data))
+            .filter_by(id=file_id, patient_id=patient_id)
+            .first()
+        )
         if not file_meta:
             return jsonify({"error": "File not found for this patient"}), 404
 
+        patient_name = f"{patient.name_given} {patient.name_family}"
+        binary = _wants_binary()
+        if not binary and _is_full_series(options):
+            payload = db.session.get(HeartRatePayload, (file_meta.id, "identity"))
+            if payload:
+                return _json_payload(
+                    SeriesPayload.envelope(
+                        SeriesPayload.series(payload.data), patient_name=patient_name
+                    )
+                )
+
+        series, error = _load_series(file_meta, options)
+        if error:
+            return jsonify({"error": error}), 400
+        if binary:
+            return _binary_series(series, patient_name=patient_name)
+
         # Return heart rate data
         return (
             jsonify(
                 {
-                    "patient_name": f"{patient.name_given} {patient.name_family}",
-                    "data": json.loads(file_meta.hr_data),
+                    "patient_name": patient_name,
+                    "data": series,
                 }
             ),
             200,
@@ -103,3 +193,444 @@ def get_heart_rate_data_clinician():
 
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@graph_data.route("/heart-rate-data-clinician/merged", methods=["POST"])
+@jwt_required()
+def get_merged_heart_rate_data_clinician():
+    """
+    Merges several recordings of a patient into one time-ordered series on
+    an absolute axis (epoch milliseconds). Takes either ``file_ids`` or a
+    ``patient_id`` with an optional ``start_date``/``end_date`` range
+    (inclusive, YYYY-MM-DD) and an optional ``max_points``.
+    """
+    try:
+        # Verify current user and clinician status
+        user = current_user
+        if user.user_type == 2:
+            return (
+                jsonify(
+                    {
+                        "error": "Permission denied. Only clinicians can access this endpoint"
+                    }
+                ),
+                403,
+            )
+
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        file_ids = data.get("file_ids")
+        patient_id = data.get("patient_id")
+        if not file_ids and not patient_id:
+            return jsonify({"error": "file_ids or patient_id is required"}), 400
+
+        try:
+            if file_ids is not None:
+                if not isinstance(file_ids, list):
+                    raise ValueError
+                file_ids = [int(file_id) for file_id in file_ids]
+            if patient_id is not None:
+                patient_id = int(patient_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid ID format"}), 400
+
+        try:
+            start_date, end_date = (
+                date.fromisoformat(data[key]) if data.get(key) else None
+                for key in ("start_date", "end_date")
+            )
+        except (TypeError, ValueError):
+            return jsonify({"error": "Dates must be formatted as YYYY-MM-DD"}), 400
+
+        options, error = _parse_series_options({"max_points": data.get("max_points")})
+        if error:
+            return jsonify({"error": error}), 400
+
+        # All recordings in one query
+        query = FileMeta.query
+        if file_ids:
+            query = query.filter(FileMeta.id.in_(file_ids))
+        if patient_id is not None:
+            query = query.filter(FileMeta.patient_id == patient_id)
+        if start_date:
+            query = query.filter(FileMeta.measurement_date >= start_date)
+        if end_date:
+            query = query.filter(FileMeta.measurement_date <= end_date)
+        records = query.order_by(FileMeta.start_time, FileMeta.id).all()
+
+        if file_ids and len(records) != len(set(file_ids)):
+            return jsonify({"error": "File not found for this patient"}), 404
+        patient_ids = {record.patient_id for record in records}
+        if len(patient_ids) > 1:
+            return jsonify({"error": "Files belong to different patients"}), 400
+
+        patient = db.session.get(Person, patient_id or next(iter(patient_ids), None))
+        if not patient:
+            return jsonify({"error": "Patient not found"}), 404
+
+        series = _merge_series(records)
+        if options["max_points"] is not None:
+            series = Downsample.series(series, options["max_points"])
+
+        patient_name = f"{patient.name_given} {patient.name_family}"
+        if _wants_binary():
+            return _binary_series(series, patient_name=patient_name)
+        return jsonify({"patient_name": patient_name, "data": series}), 200
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@graph_data.route("/heart-rate-metrics", methods=["GET"])
+@jwt_required()
+def get_heart_rate_metrics():
+    """
+    Derived metrics of a recording, computed at ingest. Patients can read
+    their own recordings, clinicians any recording.
+    """
+    try:
+        file_id = request.args.get("file_id")
+        if not file_id:
+            return jsonify({"error": "File ID is required"}), 400
+        try:
+            file_id = int(file_id)
+        except ValueError:
+            return jsonify({"error": "Invalid file ID format"}), 400
+
+        user = current_user
+
+        query = db.session.query(HeartRateMetrics).join(FileMeta).filter(
+            HeartRateMetrics.file_id == file_id
+        )
+        if user.user_type == 2:
+            query = query.filter(FileMeta.patient_id == user.id)
+        metrics = query.first()
+        if not metrics:
+            return jsonify({"error": "Metrics not found for this file"}), 404
+
+        return jsonify(
+            {
+                "file_id": file_id,
+                "metrics": {
+                    column.name: getattr(metrics, column.name)
+                    for column in HeartRateMetrics.__table__.columns
+                    if column.name != "file_id"
+                },
+            }
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@graph_data.route("/heart-rate-trend", methods=["GET"])
+@jwt_required()
+def get_heart_rate_trend():
+    """
+    Daily min/max/mean/resting heart rate from the rollup table, optionally
+    limited to start_date/end_date (inclusive, YYYY-MM-DD). Clinicians pass
+    the patient_id; patients get their own trend.
+    """
+    try:
+        user = current_user
+
+        if user.user_type == 2:
+            patient_id = user.id
+        else:
+            try:
+                patient_id = int(request.args.get("patient_id", ""))
+            except ValueError:
+                return jsonify({"error": "Patient ID is required"}), 400
+
+        try:
+            start_date, end_date = (
+                date.fromisoformat(request.args[key]) if request.args.get(key) else None
+                for key in ("start_date", "end_date")
+            )
+        except ValueError:
+            return jsonify({"error": "Dates must be formatted as YYYY-MM-DD"}), 400
+
+        query = DailyRollup.query.filter(DailyRollup.patient_id == patient_id)
+        if start_date:
+            query = query.filter(DailyRollup.date >= start_date)
+        if end_date:
+            query = query.filter(DailyRollup.date <= end_date)
+
+        days = [
+            {
+                "date": rollup.date.isoformat(),
+                "min_hr": rollup.min_hr,
+                "max_hr": rollup.max_hr,
+                "mean_hr": round(rollup.mean_hr, 1),
+                "resting_hr": rollup.resting_hr,
+                "sample_count": rollup.sample_count,
+            }
+            for rollup in query.order_by(DailyRollup.date)
+        ]
+        return jsonify({"patient_id": patient_id, "days": days}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _merge_series(records):
+    """
+    Merges FileMeta rows into one series with epoch millisecond times.
+    Recordings without a start time cannot be placed and are listed under
+    ``skipped_file_ids``.
+    """
+    streams, files, skipped = [], [], []
+    for record in records:
+        if record.start_time is None:
+            skipped.append(record.id)
+            continue
+        data = record.hr_data
+        times = [record.start_time + round(t * 60000) for t in data.get("time") or []]
+        streams.append(zip(times, data.get("value") or []))
+        files.append(
+            {
+                "file_id": record.id,
+                "date_of_measurement": data.get("date_of_measurement"),
+                "start_time": record.start_time,
+                "sample_count": len(times),
+            }
+        )
+
+    merged = list(heapq.merge(*streams, key=itemgetter(0)))
+    return {
+        "time": [time for time, _ in merged],
+        "value": [value for _, value in merged],
+        "files": files,
+        "skipped_file_ids": skipped,
+    }
+
+
+def _series_etag(file_meta, options, variant=None):
+    """
+    Strong ETag of a series response: the recording's identity and content
+    hash plus the normalized request options and the representation (content
+    coding or wire format).
+    """
+    version = file_meta.content_hash or str(file_meta.created_at)
+    key = json.dumps(
+        [SERIES_ETAG_VERSION, file_meta.id, version, options, variant or "identity"],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def _cacheable(response, etag):
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = SERIES_CACHE_CONTROL
+    response.vary.update(("Authorization", "Accept", "Accept-Encoding"))
+    return response
+
+
+def _is_full_series(options):
+    return all(value is None for value in options.values())
+
+
+def _payload_encoding(file_id):
+    """
+    Best content coding of a recording's stored payloads the client accepts,
+    or None when none of them can be sent.
+    """
+    stored = set(
+        db.session.scalars(
+            select(HeartRatePayload.encoding).where(HeartRatePayload.file_id == file_id)
+        )
+    )
+    encoding = request.accept_encodings.best_match(
+        [encoding for encoding in SeriesPayload.ENCODINGS if encoding in stored]
+    )
+    if encoding is None and "identity" in stored:
+        encoding = "identity"
+    return encoding
+
+
+def _stored_payload(file_id, encoding):
+    """Body of a recording's stored payload in ``encoding``."""
+    return db.session.get(HeartRatePayload, (file_id, encoding)).data
+
+
+def _json_payload(body):
+    return current_app.response_class(body, mimetype="application/json")
+
+
+def _wants_binary():
+    """True when the client prefers the binary series format over JSON."""
+    best = request.accept_mimetypes.best_match(["application/json", SERIES_MEDIA_TYPE])
+    return best == SERIES_MEDIA_TYPE
+
+
+def _binary_series(series, **fields):
+    response = current_app.response_class(
+        SeriesWire.encode(series, **fields), mimetype=SERIES_MEDIA_TYPE
+    )
+    response.vary.add("Accept")
+    return response
+
+
+def _parse_series_options(params):
+    """
+    Validates the optional series parameters: max_points, resolution
+    ("raw", "auto", seconds or a label such as "10s") and the start/end
+    window. Window bounds are minutes since the first sample, epoch
+    milliseconds or ISO 8601 datetimes (UTC unless an offset is given).
+    Returns (options, error).
+    """
+    options = {"max_points": None, "resolution": None, "start": None, "end": None}
+
+    max_points = params.get("max_points")
+    if max_points not in (None, ""):
+        try:
+            options["max_points"] = int(max_points)
+        except (TypeError, ValueError):
+            return None, "Invalid max_points format"
+        if options["max_points"] < 3:
+            return None, "max_points must be at least 3"
+
+    for key in ("start", "end"):
+        value = params.get(key)
+        if value not in (None, ""):
+            options[key] = _parse_time_bound(value)
+            if options[key] is None:
+                return None, f"Invalid {key} format"
+            if options[key] == AMBIGUOUS_TIME:
+                return None, (
+                    f"Ambiguous {key}: use minutes since the first sample, "
+                    "epoch milliseconds or an ISO 8601 datetime"
+                )
+    if (
+        options["start"] is not None
+        and options["end"] is not None
+        and options["start"][1] == options["end"][1]
+        and options["start"][0] > options["end"][0]
+    ):
+        return None, "start must not be after end"
+
+    resolution = params.get("resolution")
+    if resolution in (None, "", "raw"):
+        pass
+    elif resolution == "auto":
+        options["resolution"] = "auto"
+    else:
+        resolution = RESOLUTION_LABELS.get(str(resolution), resolution)
+        try:
+            options["resolution"] = int(resolution)
+        except (TypeError, ValueError):
+            return None, "Invalid resolution format"
+        if options["resolution"] not in Pyramid.LEVELS:
+            return None, "Unsupported resolution"
+
+    return options, None
+
+
+def _parse_time_bound(value):
+    """
+    Returns (value, absolute) for a start/end parameter, where absolute
+    values are epoch milliseconds and relative ones minutes, AMBIGUOUS_TIME
+    for numbers too large to be minutes and too small to be milliseconds,
+    or None.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        pass
+    else:
+        if number != number or number in (float("inf"), float("-inf")):
+            return None
+        if abs(number) >= ABSOLUTE_TIME_THRESHOLD:
+            return number, True
+        if abs(number) >= RELATIVE_TIME_LIMIT:
+            return AMBIGUOUS_TIME
+        return number, False
+
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp() * 1000, True
+
+
+def _window_minutes(file_meta, options):
+    """
+    Resolves the start/end options of a file to minutes since its first
+    sample. Returns (start, end, error).
+    """
+    bounds = []
+    for key in ("start", "end"):
+        bound = options[key]
+        if bound is None:
+            bounds.append(None)
+            continue
+        value, absolute = bound
+        if absolute:
+            if file_meta.start_time is None:
+                return None, None, "Absolute times are not available for this file"
+            value = (value - file_meta.start_time) / (1000 * 60)
+        bounds.append(value)
+
+    start, end = bounds
+    if start is not None and end is not None and start > end:
+        return None, None, "start must not be after end"
+    return start, end, None
+
+
+def _load_hr_window(file_id, start, end):
+    """
+    Decodes only the samples of a recording inside [start, end] minutes by
+    reading the stored blob and skipping the blocks outside the window.
+    """
+    blob = db.session.execute(
+        select(type_coerce(FileMeta.hr_data, LargeBinary)).where(FileMeta.id == file_id)
+    ).scalar()
+    return HRCodec.decode_window(blob, start, end)
+
+
+def _load_series(file_meta, options):
+    """
+    Returns (series, error) for a FileMeta row: a precomputed zoom level
+    when a resolution is requested, otherwise the raw samples, limited to the
+    start/end window and downsampled to max_points.
+    """
+    start, end, error = _window_minutes(file_meta, options)
+    if error:
+        return None, error
+    resolution = options["resolution"]
+
+    if resolution is not None:
+        levels = dict(
+            db.session.query(HeartRateLevel.resolution, HeartRateLevel.bucket_count)
+            .filter_by(file_id=file_meta.id)
+            .all()
+        )
+        if resolution == "auto":
+            duration = end - start if start is not None and end is not None else None
+            resolution = Pyramid.choose_resolution(
+                levels,
+                file_meta.sample_count,
+                duration,
+                options["max_points"] or DEFAULT_MAX_POINTS,
+            )
+        elif resolution not in levels:
+            return None, "Resolution not available for this file"
+
+    if resolution is not None:
+        level = HeartRateLevel.query.filter_by(
+            file_id=file_meta.id, resolution=resolution
+        ).first()
+        return Pyramid.read(level.data, start, end), None
+
+    if start is None and end is None:
+        data = file_meta.hr_data
+    else:
+        data = _load_hr_window(file_meta.id, start, end)
+    if options["max_points"] is not None:
+        data = Downsample.series(data, options["max_points"])
+    return data, None
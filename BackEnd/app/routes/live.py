@@ -0,0 +1,190 @@
+import uuid
+from flask import Blueprint, current_app, jsonify, request
+from flask_cors import CORS
+from flask_jwt_extended import current_user, jwt_required
+from app.models import db, LiveSession
+from app.utilities.live_stream import LiveSessionClosed, LiveStream
+
+live = Blueprint("live", __name__)
+CORS(live)  # Apply CORS to all routes within this Blueprint
+
+
+def _find_session(session_id, owner_only=True):
+    """
+    Returns (session, error response). Clinicians may read any session when
+    owner_only is False; patients only their own.
+    """
+    user = current_user
+
+    session = db.session.get(LiveSession, session_id)
+    if not session or (
+        session.patient_id != user.id and (owner_only or user.user_type == 2)
+    ):
+        return None, (jsonify({"error": "Live session not found"}), 404)
+    return session, None
+
+
+def _session_response(session):
+    return {
+        "session_id": session.id,
+        "status": session.status,
+        "sample_count": session.sample_count,
+        "last_timestamp": session.last_timestamp,
+        "created_at": session.created_at.isoformat(),
+        "closed_at": session.closed_at.isoformat() if session.closed_at else None,
+    }
+
+
+@live.route("/live-sessions", methods=["POST"])
+@jwt_required()
+def create_live_session():
+    """
+    Opens a live recording. The device then appends batches with
+    POST /live-sessions/<id>/samples and finishes with
+    POST /live-sessions/<id>/close.
+    """
+    try:
+        patient = current_user
+
+        session = LiveSession(id=uuid.uuid4().hex, patient_id=patient.id)
+        db.session.add(session)
+        db.session.commit()
+        return jsonify(_session_response(session)), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@live.route("/live-sessions/<session_id>", methods=["GET"])
+@jwt_required()
+def get_live_session(session_id):
+    try:
+        session, error = _find_session(session_id, owner_only=False)
+        if error:
+            return error
+        return jsonify(_session_response(session)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@live.route("/live-sessions/<session_id>/samples", methods=["POST"])
+@jwt_required()
+def append_live_samples(session_id):
+    """
+    Appends one batch, sent as NDJSON (application/x-ndjson) or packed
+    little-endian int64 timestamp / float32 value records
+    (application/vnd.heartrate.samples). An optional ?seq=<n> makes retries
+    idempotent.
+    """
+    try:
+        session, error = _find_session(session_id)
+        if error:
+            return error
+        if session.status != "open":
+            return jsonify({"error": "Live session is closed"}), 409
+
+        seq = request.args.get("seq")
+        if seq is not None:
+            try:
+                seq = int(seq)
+            except ValueError:
+                return jsonify({"error": "Invalid seq format"}), 400
+            if seq < 0:
+                return jsonify({"error": "seq must not be negative"}), 400
+
+        try:
+            samples = LiveStream.parse(request.get_data(), request.mimetype)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if len(samples) > current_app.config["LIVE_BATCH_MAX_SAMPLES"]:
+            return (
+                jsonify(
+                    {
+                        "error": "Batches are limited to "
+                        f"{current_app.config['LIVE_BATCH_MAX_SAMPLES']} samples"
+                    }
+                ),
+                413,
+            )
+
+        try:
+            batch, duplicate = LiveStream.append(session, samples, seq)
+        except LiveSessionClosed as e:
+            return jsonify({"error": str(e)}), 409
+        return (
+            jsonify(
+                {
+                    "seq": batch.seq,
+                    "accepted": batch.sample_count,
+                    "duplicate": duplicate,
+                    "sample_count": session.sample_count,
+                }
+            ),
+            200 if duplicate else 201,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@live.route("/live-sessions/<session_id>/samples", methods=["GET"])
+@jwt_required()
+def get_live_samples(session_id):
+    """
+    Samples received so far, ordered by time. Monitors poll with
+    ?after=<epoch ms> to receive only newer samples.
+    """
+    try:
+        session, error = _find_session(session_id, owner_only=False)
+        if error:
+            return error
+        after = request.args.get("after")
+        if after is not None:
+            try:
+                after = int(after)
+            except ValueError:
+                return jsonify({"error": "Invalid after format"}), 400
+
+        samples = LiveStream.samples(session, after)
+        return (
+            jsonify(
+                {
+                    "session_id": session.id,
+                    "status": session.status,
+                    "time": [timestamp for timestamp, _ in samples],
+                    "value": [value for _, value in samples],
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@live.route("/live-sessions/<session_id>/close", methods=["POST"])
+@jwt_required()
+def close_live_session(session_id):
+    """Stores the streamed samples as regular recordings, one per day."""
+    try:
+        session, error = _find_session(session_id)
+        if error:
+            return error
+        if session.status != "open":
+            return jsonify({"error": "Live session is closed"}), 409
+
+        try:
+            records = LiveStream.close(session)
+        except LiveSessionClosed as e:
+            return jsonify({"error": str(e)}), 409
+        return (
+            jsonify(
+                {
+                    "message": "Live session closed",
+                    **_session_response(session),
+                    "upload_id": session.id,
+                    "file_ids": [record.id for record in records],
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
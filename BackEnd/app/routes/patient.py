@@ -1,10 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import current_user, jwt_required
 from app.models import db, Person, UserType
 from app.swagger.guides import get_patient_desc, get_patients_desc
 from flasgger import swag_from
-from app import BLOCKLIST
 
 patients = Blueprint("patients", __name__)
 CORS(patients)  # Apply CORS to all routes within this Blueprint
@@ -17,12 +16,7 @@ def get_patients():
     """
     Get a list of patients with optional filters and pagination.
     """
-    token = request.headers.get("Authorization").split(" ")[1]
-    if token in BLOCKLIST:
-        return jsonify({"error": "Permission denied"}), 401
-
-    identity = get_jwt_identity()
-    user = Person.query.filter_by(identifier_value=identity).first()
+    user = current_user
     if user.user_type == 2:
         return jsonify({"error": "Permission denied"}), 401
 
@@ -83,10 +77,6 @@ def get_patient(patient_id):
     """
     Get details of a specific patient by ID.
     """
-    token = request.headers.get("Authorization").split(" ")[1]
-    if token in BLOCKLIST:
-        return jsonify({"error": "Permission denied"}), 401
-
     patient = Person.query.filter_by(id=patient_id, active=1).first()
 
     if not patient:
@@ -0,0 +1,264 @@
+from collections import deque
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import LargeBinary, select, type_coerce, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, AnomalyFlag, AnomalyScanRun, FileMeta
+from app.utilities.hr_codec import HRCodec
+from app.utilities.ingest import Ingest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the pure Python path is used instead
+    np = None
+
+
+class AnomalyScan:
+    """
+    Flags sustained tachycardia, sustained bradycardia and large data gaps
+    in stored recordings.
+
+    A run is a stretch of consecutive samples beyond a threshold with no
+    more than ``MAX_SAMPLE_GAP_MINUTES`` between them; it is flagged once it
+    lasts ``SUSTAINED_MINUTES``. Gaps longer than ``GAP_MINUTES`` are
+    flagged on their own.
+    """
+
+    TACHYCARDIA_BPM = 100  # Above
+    BRADYCARDIA_BPM = 50  # Below
+    SUSTAINED_MINUTES = 10
+    MAX_SAMPLE_GAP_MINUTES = 5
+    GAP_MINUTES = 60
+
+    @staticmethod
+    def detect(data: dict) -> List[dict]:
+        """Returns the flags of one series, ordered by kind and start."""
+        times, values = data.get("time") or [], data.get("value") or []
+        if None in values or any(a > b for a, b in zip(times, times[1:])):
+            pairs = sorted((t, v) for t, v in zip(times, values) if v is not None)
+            times, values = [t for t, _ in pairs], [v for _, v in pairs]
+        if not times:
+            return []
+        if np is None:
+            return AnomalyScan._detect_python(times, values)
+
+        t = np.asarray(times, dtype=np.float64)
+        v = np.asarray(values, dtype=np.float64)
+        gaps = np.diff(t)
+        contiguous = gaps <= AnomalyScan.MAX_SAMPLE_GAP_MINUTES
+
+        flags = []
+        for kind, mask, peak in (
+            ("tachycardia", v > AnomalyScan.TACHYCARDIA_BPM, np.max),
+            ("bradycardia", v < AnomalyScan.BRADYCARDIA_BPM, np.min),
+        ):
+            # Sample i continues the run of sample i - 1
+            continues = np.zeros(len(v), dtype=bool)
+            continues[1:] = mask[1:] & mask[:-1] & contiguous
+            starts = np.flatnonzero(mask & ~continues)
+            ends = np.flatnonzero(mask & ~np.append(continues[1:], False))
+            sustained = t[ends] - t[starts] >= AnomalyScan.SUSTAINED_MINUTES
+            for start, end in zip(starts[sustained], ends[sustained]):
+                flags.append(
+                    AnomalyScan._flag(kind, t[start], t[end], peak(v[start : end + 1]))
+                )
+
+        for i in np.flatnonzero(gaps > AnomalyScan.GAP_MINUTES):
+            flags.append(AnomalyScan._flag("gap", t[i], t[i + 1], None))
+        return flags
+
+    @staticmethod
+    def _detect_python(times: Sequence[float], values: Sequence[float]) -> List[dict]:
+        flags = []
+        for kind, beyond, peak in (
+            ("tachycardia", lambda v: v > AnomalyScan.TACHYCARDIA_BPM, max),
+            ("bradycardia", lambda v: v < AnomalyScan.BRADYCARDIA_BPM, min),
+        ):
+            start = None
+            for i, value in enumerate(values):
+                if start is not None and (
+                    not beyond(value)
+                    or times[i] - times[i - 1] > AnomalyScan.MAX_SAMPLE_GAP_MINUTES
+                ):
+                    AnomalyScan._close_run(flags, kind, times, values, start, i - 1, peak)
+                    start = None
+                if start is None and beyond(value):
+                    start = i
+            if start is not None:
+                AnomalyScan._close_run(flags, kind, times, values, start, len(values) - 1, peak)
+
+        for i in range(len(times) - 1):
+            if times[i + 1] - times[i] > AnomalyScan.GAP_MINUTES:
+                flags.append(AnomalyScan._flag("gap", times[i], times[i + 1], None))
+        return flags
+
+    @staticmethod
+    def _close_run(flags, kind, times, values, start, end, peak):
+        if times[end] - times[start] >= AnomalyScan.SUSTAINED_MINUTES:
+            flags.append(
+                AnomalyScan._flag(kind, times[start], times[end], peak(values[start : end + 1]))
+            )
+
+    @staticmethod
+    def _flag(kind, start, end, peak) -> dict:
+        return {
+            "kind": kind,
+            "start_minute": float(start),
+            "end_minute": float(end),
+            "peak_hr": None if peak is None else float(peak),
+        }
+
+    @staticmethod
+    def start_run(stale_seconds: int) -> Optional[int]:
+        """
+        Records a new run and returns its id, or None while another process
+        has one in progress. A run without a heartbeat for ``stale_seconds``
+        is taken to have died with its process and marked failed.
+        """
+        now = datetime.utcnow()
+        db.session.execute(
+            update(AnomalyScanRun)
+            .where(
+                AnomalyScanRun.active.is_(True),
+                AnomalyScanRun.heartbeat_at < now - timedelta(seconds=stale_seconds),
+            )
+            .values(active=None, status="failed", error="Abandoned", finished_at=now)
+        )
+        run = AnomalyScanRun()
+        db.session.add(run)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return None
+        return run.id
+
+    @staticmethod
+    def run(
+        run_id: int, batch_size: int, workers: int, executor: Optional[Executor] = None
+    ) -> Dict[str, int]:
+        """Scans for a run recorded by start_run and stores its outcome."""
+
+        def heartbeat(counts):
+            AnomalyScan._update_run(run_id, heartbeat_at=datetime.utcnow(), **counts)
+
+        try:
+            counts = AnomalyScan.scan(batch_size, workers, executor, heartbeat)
+        except Exception as e:
+            db.session.rollback()
+            AnomalyScan._finish_run(run_id, "failed", error=str(e))
+            raise
+        AnomalyScan._finish_run(run_id, "done", **counts)
+        return counts
+
+    @staticmethod
+    def scan(
+        batch_size: int = 200,
+        workers: int = 4,
+        executor: Optional[Executor] = None,
+        on_chunk: Optional[Callable[[Dict[str, int]], None]] = None,
+    ) -> Dict[str, int]:
+        """
+        Rescans every recording and replaces its flags.
+
+        Rows are read in id-ordered chunks of ``batch_size`` and evaluated in
+        ``workers`` processes, or in ``executor`` if given. At most two
+        chunks per worker are in flight, so memory stays bounded by the
+        chunk size, not the table size. Each chunk's flags are committed as
+        it completes, after which ``on_chunk`` gets the running counts.
+        """
+        counts = {"files": 0, "flags": 0}
+        with nullcontext(executor) if executor else Ingest.executor(workers) as executor:
+            pending = deque()
+            for rows in AnomalyScan._chunks(batch_size):
+                blobs = [(file_id, blob) for file_id, _, _, blob in rows]
+                pending.append((rows, executor.submit(_detect_rows, blobs)))
+                if len(pending) >= 2 * max(1, workers):
+                    AnomalyScan._store(*pending.popleft(), counts)
+                    if on_chunk:
+                        on_chunk(counts)
+            while pending:
+                AnomalyScan._store(*pending.popleft(), counts)
+                if on_chunk:
+                    on_chunk(counts)
+        return counts
+
+    @staticmethod
+    def _update_run(run_id: int, **values):
+        db.session.execute(
+            update(AnomalyScanRun).where(AnomalyScanRun.id == run_id).values(**values)
+        )
+        db.session.commit()
+
+    @staticmethod
+    def _finish_run(run_id: int, status: str, **values):
+        AnomalyScan._update_run(
+            run_id, status=status, active=None, finished_at=datetime.utcnow(), **values
+        )
+
+    @staticmethod
+    def _chunks(batch_size: int) -> Iterator[List[Tuple]]:
+        """Keyset-paginated (id, patient_id, start_time, raw hr_data) rows."""
+        query = select(
+            FileMeta.id,
+            FileMeta.patient_id,
+            FileMeta.start_time,
+            type_coerce(FileMeta.hr_data, LargeBinary),
+        ).order_by(FileMeta.id)
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                query.where(FileMeta.id > last_id).limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+            last_id = rows[-1][0]
+
+    @staticmethod
+    def _store(rows, future, counts):
+        found = dict(future.result())
+        detected_at = datetime.utcnow()
+        flags = []
+        for file_id, patient_id, start_time, _ in rows:
+            for flag in found.get(file_id, []):
+                flags.append(
+                    AnomalyFlag(
+                        file_id=file_id,
+                        patient_id=patient_id,
+                        start_at=None
+                        if start_time is None
+                        else start_time + round(flag["start_minute"] * 60000),
+                        detected_at=detected_at,
+                        **flag,
+                    )
+                )
+        try:
+            AnomalyFlag.query.filter(
+                AnomalyFlag.file_id.in_([row[0] for row in rows])
+            ).delete(synchronize_session=False)
+            db.session.add_all(flags)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        counts["files"] += len(rows)
+        counts["flags"] += len(flags)
+
+
+def _detect_rows(rows: List[Tuple[int, bytes]]) -> List[Tuple[int, List[dict]]]:
+    """Worker entry point: decodes and scans one chunk of recordings."""
+    results = []
+    for file_id, blob in rows:
+        if blob is None:
+            continue
+        try:
+            data = HRCodec.decode(blob)
+        except ValueError:
+            continue
+        results.append((file_id, AnomalyScan.detect(data)))
+    return results
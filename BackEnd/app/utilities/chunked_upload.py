@@ -0,0 +1,190 @@
+import fcntl
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import IO, Optional
+
+_SESSION_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+class ChunkedUploadError(Exception):
+    """Raised when a chunk cannot be applied to an upload session."""
+
+    def __init__(self, message: str, status_code: int = 400, offset: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+class ChunkedUploadStore:
+    """
+    On-disk state of resumable uploads.
+
+    Each session keeps its bytes in ``<id>.part`` and its metadata in
+    ``<id>.json`` under ``<UPLOAD_FOLDER>/partial``. The acknowledged offset
+    is the size of the part file, so a session survives restarts and can be
+    resumed from any worker. Sessions idle longer than a TTL are removed by
+    expire().
+    """
+
+    def __init__(self, upload_folder: str):
+        self.folder = os.path.join(upload_folder, "partial")
+        os.makedirs(self.folder, exist_ok=True)
+
+    def create(self, patient_id: int, filename: str, total_size: Optional[int]) -> dict:
+        session = {
+            "id": uuid.uuid4().hex,
+            "patient_id": patient_id,
+            "filename": filename,
+            "total_size": total_size,
+            "created_at": datetime.now().isoformat(),
+        }
+        with open(self._meta_path(session["id"]), "w", encoding="utf-8") as file:
+            json.dump(session, file)
+        open(self._part_path(session["id"]), "wb").close()
+        session["offset"] = 0
+        return session
+
+    def get(self, session_id: str, patient_id: int) -> Optional[dict]:
+        """Returns the session if it exists and belongs to the patient."""
+        if not _SESSION_ID_RE.fullmatch(session_id or ""):
+            return None
+        try:
+            with open(self._meta_path(session_id), "r", encoding="utf-8") as file:
+                session = json.load(file)
+            session["offset"] = os.path.getsize(self._part_path(session_id))
+        except (OSError, ValueError):
+            return None
+        if session["patient_id"] != patient_id:
+            return None
+        return session
+
+    def append(self, session: dict, offset: int, stream: IO[bytes], max_bytes: int) -> int:
+        """
+        Writes a chunk at ``offset`` and returns the new acknowledged offset.
+
+        Offsets before the current end are accepted so a client can resend a
+        chunk whose acknowledgement was lost; gaps are rejected. A resent
+        chunk never shortens the upload. Concurrent requests for the same
+        session, from any worker, are applied one at a time.
+        """
+        with self._locked(session["id"]) as part:
+            # Another request may have appended since the session was read
+            session["offset"] = os.fstat(part.fileno()).st_size
+            if offset < 0 or offset > session["offset"]:
+                raise ChunkedUploadError(
+                    "Offset does not match the uploaded size", 409, session["offset"]
+                )
+
+            part.seek(offset)
+            written = 0
+            try:
+                while True:
+                    chunk = stream.read(64 * 1024)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise ChunkedUploadError(
+                            f"Chunks are limited to {max_bytes} bytes",
+                            413,
+                            session["offset"],
+                        )
+                    part.write(chunk)
+
+                end = offset + written
+                if session["total_size"] is not None and end > session["total_size"]:
+                    raise ChunkedUploadError(
+                        "Chunk exceeds the declared total size", 400, session["offset"]
+                    )
+            except ChunkedUploadError:
+                # Keep only what was acknowledged before this chunk
+                part.truncate(session["offset"])
+                raise
+
+            end = max(end, session["offset"])
+            part.truncate(end)
+            part.flush()
+            os.fsync(part.fileno())
+
+        session["offset"] = end
+        return end
+
+    def complete(self, session: dict, target_path: str) -> str:
+        """Moves the assembled file to ``target_path`` and drops the session."""
+        with self._locked(session["id"]) as part:
+            session["offset"] = os.fstat(part.fileno()).st_size
+            if session["total_size"] is not None and session["offset"] != session["total_size"]:
+                raise ChunkedUploadError("Upload is incomplete", 409, session["offset"])
+            os.replace(self._part_path(session["id"]), target_path)
+        self.discard(session["id"])
+        return target_path
+
+    def discard(self, session_id: str):
+        for path in (self._part_path(session_id), self._meta_path(session_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def expire(self, max_age_seconds: float) -> int:
+        """
+        Removes the sessions that received no chunk for ``max_age_seconds``
+        and returns how many were removed. Sessions locked by a request in
+        progress are left alone.
+        """
+        cutoff = time.time() - max_age_seconds
+        session_ids = {
+            name.rsplit(".", 1)[0]
+            for name in os.listdir(self.folder)
+            if name.endswith((".part", ".json"))
+        }
+        expired = 0
+        for session_id in session_ids:
+            if self._last_active(session_id) >= cutoff:
+                continue
+            try:
+                part = open(self._part_path(session_id), "r+b")
+            except FileNotFoundError:
+                # Left behind by a complete() that did not finish
+                self.discard(session_id)
+                expired += 1
+                continue
+            with part:
+                try:
+                    fcntl.flock(part.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                # A chunk may have landed before the lock was taken
+                if self._last_active(session_id) >= cutoff:
+                    continue
+                self.discard(session_id)
+            expired += 1
+        return expired
+
+    def _last_active(self, session_id: str) -> float:
+        times = [
+            os.path.getmtime(path)
+            for path in (self._part_path(session_id), self._meta_path(session_id))
+            if os.path.exists(path)
+        ]
+        return max(times, default=0)
+
+    @contextmanager
+    def _locked(self, session_id: str):
+        """The part file, exclusively locked across processes."""
+        try:
+            part = open(self._part_path(session_id), "r+b")
+        except FileNotFoundError:
+            raise ChunkedUploadError("Upload session not found", 404)
+        with part:
+            fcntl.flock(part.fileno(), fcntl.LOCK_EX)
+            yield part
+
+    def _part_path(self, session_id: str) -> str:
+        return os.path.join(self.folder, f"{session_id}.part")
+
+    def _meta_path(self, session_id: str) -> str:
+        return os.path.join(self.folder, f"{session_id}.json")
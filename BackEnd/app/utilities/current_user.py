@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models import db, Person
+
+
+class CurrentUser(NamedTuple):
+    """The columns of the authenticated Person that routes need."""
+
+    id: int
+    identifier_value: str
+    user_type: int
+    active: int
+
+    @property
+    def is_patient(self) -> bool:
+        return self.user_type == 2
+
+
+class UserCache:
+    """
+    Authenticated users keyed by JWT identity, kept for ``ttl_seconds``.
+
+    flask_jwt_extended's user_lookup_loader resolves the identity once per
+    request through this cache, so most requests run no Person query at all.
+    Changes made through the ORM in this process evict the entry right away;
+    the TTL bounds how long other workers may see the old columns.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}  # identity -> (CurrentUser, loaded at)
+
+    def get(self, identity: str) -> Optional[CurrentUser]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(identity)
+            if entry and now - entry[1] < self._ttl_seconds:
+                return entry[0]
+
+        row = db.session.execute(
+            db.select(Person.id, Person.identifier_value, Person.user_type, Person.active)
+            .where(Person.identifier_value == identity)
+            .limit(1)
+        ).first()
+        if row is None:
+            return None
+
+        user = CurrentUser(*row)
+        with self._lock:
+            if len(self._entries) >= self._max_entries:
+                self._entries = {
+                    key: value
+                    for key, value in self._entries.items()
+                    if now - value[1] < self._ttl_seconds
+                }
+            self._entries[identity] = (user, now)
+        return user
+
+    def invalidate(self, identity: str):
+        with self._lock:
+            self._entries.pop(identity, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+@event.listens_for(Session, "after_flush")
+def _evict_changed_users(session, flush_context):
+    """Evicts cached users whose Person row was updated or deleted."""
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get("user_cache")
+    if cache is None:
+        return
+    for record in list(session.dirty) + list(session.deleted):
+        if isinstance(record, Person):
+            # A changed email also drops the entry under the old identity
+            history = inspect(record).attrs.identifier_value.history
+            for identity in [record.identifier_value, *history.deleted]:
+                cache.invalidate(identity)
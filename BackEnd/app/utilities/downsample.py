@@ -0,0 +1,97 @@
+from typing import List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the pure Python path is used instead
+    np = None
+
+
+class Downsample:
+    """Shape-preserving reduction of time series for charting."""
+
+    @staticmethod
+    def lttb_indices(times: Sequence[float], values: Sequence[float], max_points: int) -> List[int]:
+        """
+        Largest-Triangle-Three-Buckets: indices of at most ``max_points``
+        samples that keep the visual shape of the series. The first and last
+        samples are always kept.
+        """
+        n = len(times)
+        if max_points >= n or max_points < 3:
+            return list(range(n))
+        if np is None:
+            return Downsample._lttb_indices_python(times, values, max_points)
+
+        x = np.asarray(times, dtype=np.float64)
+        y = np.asarray(values, dtype=np.float64)
+
+        # Bucket i (0 .. max_points - 3) covers samples [edges[i], edges[i + 1])
+        every = (n - 2) / (max_points - 2)
+        edges = (np.arange(max_points - 1) * every).astype(np.int64) + 1
+        edges[-1] = n - 1
+
+        # Averages of every bucket at once; the bucket after the last real one
+        # is the final sample
+        x_sums = np.concatenate(([0.0], np.cumsum(x)))
+        y_sums = np.concatenate(([0.0], np.cumsum(y)))
+        counts = edges[1:] - edges[:-1]
+        avg_x = np.append((x_sums[edges[1:]] - x_sums[edges[:-1]]) / counts, x[-1])
+        avg_y = np.append((y_sums[edges[1:]] - y_sums[edges[:-1]]) / counts, y[-1])
+
+        selected = np.empty(max_points, dtype=np.int64)
+        selected[0] = 0
+        selected[-1] = n - 1
+        a = 0
+        for i in range(max_points - 2):
+            start, end = edges[i], edges[i + 1]
+            areas = np.abs(
+                (x[a] - avg_x[i + 1]) * (y[start:end] - y[a])
+                - (x[a] - x[start:end]) * (avg_y[i + 1] - y[a])
+            )
+            a = start + int(areas.argmax())
+            selected[i + 1] = a
+        return selected.tolist()
+
+    @staticmethod
+    def _lttb_indices_python(times, values, max_points) -> List[int]:
+        n = len(times)
+        every = (n - 2) / (max_points - 2)
+        selected = [0]
+        a = 0
+        for i in range(max_points - 2):
+            start = int(i * every) + 1
+            end = int((i + 1) * every) + 1
+            next_end = min(int((i + 2) * every) + 1, n - 1)
+            if i == max_points - 3:
+                end = n - 1
+            if next_end > end:
+                avg_x = sum(times[end:next_end]) / (next_end - end)
+                avg_y = sum(values[end:next_end]) / (next_end - end)
+            else:
+                avg_x, avg_y = times[-1], values[-1]
+
+            best, best_area = start, -1.0
+            for j in range(start, end):
+                area = abs(
+                    (times[a] - avg_x) * (values[j] - values[a])
+                    - (times[a] - times[j]) * (avg_y - values[a])
+                )
+                if area > best_area:
+                    best, best_area = j, area
+            a = best
+            selected.append(a)
+        selected.append(n - 1)
+        return selected
+
+    @staticmethod
+    def series(data: dict, max_points: int) -> dict:
+        """Returns a copy of a heart-rate series dict reduced with LTTB."""
+        times, values = data.get("time") or [], data.get("value") or []
+        if len(times) <= max_points:
+            return data
+        indices = Downsample.lttb_indices(times, values, max_points)
+        return {
+            **data,
+            "time": [times[i] for i in indices],
+            "value": [values[i] for i in indices],
+        }
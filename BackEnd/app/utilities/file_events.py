@@ -0,0 +1,171 @@
+import queue
+import threading
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import db, FileEvent, FileMeta
+
+
+@event.listens_for(Session, "after_flush")
+def _log_new_files(session, flush_context):
+    """Writes a file_event row for every FileMeta inserted by the flush."""
+    rows = [
+        {
+            "kind": "file_created",
+            "patient_id": record.patient_id,
+            "file_id": record.id,
+            "upload_id": record.upload_id,
+            "measurement_date": record.measurement_date,
+            "created_at": datetime.utcnow(),
+        }
+        for record in session.new
+        if isinstance(record, FileMeta)
+    ]
+    if rows:
+        # Same connection, so the event commits or rolls back with the file
+        session.connection().execute(FileEvent.__table__.insert(), rows)
+
+
+def event_payload(file_event: FileEvent) -> dict:
+    return {
+        "id": file_event.id,
+        "kind": file_event.kind,
+        "patient_id": file_event.patient_id,
+        "file_id": file_event.file_id,
+        "upload_id": file_event.upload_id,
+        "measurement_date": file_event.measurement_date.isoformat()
+        if file_event.measurement_date
+        else None,
+        "created_at": file_event.created_at.isoformat(),
+    }
+
+
+class Subscription:
+    """
+    Bounded queue of events for one client, optionally limited to some
+    patients. It receives the events logged after ``start_id``.
+    """
+
+    def __init__(self, patient_ids: Optional[Iterable[int]], max_pending: int):
+        self.patient_ids = None if patient_ids is None else set(patient_ids)
+        self.start_id = 0
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def wants(self, payload: dict) -> bool:
+        return self.patient_ids is None or payload["patient_id"] in self.patient_ids
+
+    def put(self, payload: dict):
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            # The client fell behind; it reconnects with Last-Event-ID
+            self.overflowed = True
+
+    def get(self, timeout: float) -> Optional[dict]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class FileEventPublisher:
+    """
+    Fans file events out to the SSE subscribers of this process.
+
+    One thread per process polls the file_event log and hands new rows to
+    every matching subscription. Because the log lives in the database,
+    events committed by any gunicorn worker reach the subscribers of all of
+    them. The thread is started lazily on the first subscription so it is
+    created inside the worker process rather than before it forks.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, app: Flask, poll_seconds: float, max_pending: int = 1000):
+        self._app = app
+        self._poll_seconds = poll_seconds
+        self._max_pending = max_pending
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_id = 0
+
+    def subscribe(self, patient_ids: Optional[Iterable[int]] = None) -> Subscription:
+        subscription = Subscription(patient_ids, self._max_pending)
+        with self._lock:
+            if not self._subscriptions:
+                # Nobody listened in between; start from the current end of the log
+                self._last_id = self.latest_id()
+            subscription.start_id = self._last_id
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="file-event-publisher", daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def latest_id(self) -> int:
+        with self._app.app_context():
+            return db.session.query(db.func.max(FileEvent.id)).scalar() or 0
+
+    def missed(self, after_id: int, subscription: Subscription) -> Iterator[dict]:
+        """
+        Logged events after ``after_id`` up to where ``subscription`` starts,
+        read in batches, for reconnecting clients.
+        """
+        while after_id < subscription.start_id:
+            with self._app.app_context():
+                payloads = self.replay(
+                    after_id, subscription.patient_ids, self.BATCH_SIZE, subscription.start_id
+                )
+            yield from payloads
+            if len(payloads) < self.BATCH_SIZE:
+                return
+            after_id = payloads[-1]["id"]
+
+    @staticmethod
+    def replay(
+        after_id: int,
+        patient_ids: Optional[Iterable[int]],
+        limit: int = BATCH_SIZE,
+        until_id: Optional[int] = None,
+    ) -> List[dict]:
+        """Events after ``after_id`` (and up to ``until_id``) from the log."""
+        query = FileEvent.query.filter(FileEvent.id > after_id)
+        if until_id is not None:
+            query = query.filter(FileEvent.id <= until_id)
+        if patient_ids is not None:
+            query = query.filter(FileEvent.patient_id.in_(list(patient_ids)))
+        return [event_payload(row) for row in query.order_by(FileEvent.id).limit(limit)]
+
+    def _run(self):
+        stopped = threading.Event()
+        while not stopped.wait(self._poll_seconds):
+            with self._lock:
+                if not self._subscriptions:
+                    continue
+                last_id = self._last_id
+            try:
+                with self._app.app_context():
+                    payloads = self.replay(last_id, None, self.BATCH_SIZE)
+            except Exception as e:
+                print(f"File event publisher failed: {str(e)}")
+                continue
+
+            with self._lock:
+                for payload in payloads:
+                    for subscription in self._subscriptions:
+                        if subscription.wants(payload):
+                            subscription.put(payload)
+                if payloads:
+                    self._last_id = payloads[-1]["id"]
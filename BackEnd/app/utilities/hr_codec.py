@@ -0,0 +1,260 @@
+import json
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import List, Optional, Tuple, Union
+
+MAGIC = b"HRC"
+VERSION = 2
+
+FLAG_ZLIB = 0x01
+# Version 1: times could not be represented as hundredths of a minute and
+# are stored raw (version 2 marks this with a "d" time typecode per block)
+FLAG_RAW_TIME = 0x02
+
+# Set when the times are ascending, which lets a window be located by bisection
+FLAG_SORTED = 0x04
+
+_HEADER = struct.Struct("<3sBB")
+# Version 1: one body holding the JSON header, every time and every value
+_BODY_HEADER = struct.Struct("<IIcc")
+# Version 2: JSON header length, sample count, block count
+_INDEX_HEADER = struct.Struct("<III")
+# Per block: first time (minutes), sample count, data offset, data length
+_BLOCK_ENTRY = struct.Struct("<dIII")
+_BLOCK_TYPECODES = struct.Struct("<cc")
+
+# Samples per independently decodable block
+BLOCK_SIZE = 2048
+
+_SIGNED_TYPECODES = ("b", "h", "i", "q")
+_UNSIGNED_TYPECODES = ("B", "H", "I", "Q")
+
+
+def _int_typecode(values: List[int]) -> str:
+    """Return the smallest array typecode able to hold every value."""
+    if not values:
+        return "B"
+    low, high = min(values), max(values)
+    typecodes = _UNSIGNED_TYPECODES if low >= 0 else _SIGNED_TYPECODES
+    for typecode in typecodes:
+        bits = array(typecode).itemsize * 8
+        if typecode in _UNSIGNED_TYPECODES:
+            if high < 1 << bits:
+                return typecode
+        elif -(1 << (bits - 1)) <= low and high < 1 << (bits - 1):
+            return typecode
+    raise OverflowError("Value out of range for a 64-bit integer")
+
+
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+class HRCodec:
+    """
+    Packed binary encoding for heart-rate series dicts.
+
+    Samples are split into blocks of ``BLOCK_SIZE``. In each block ``time``
+    (minutes, two decimals) is stored as delta-encoded hundredths of a minute
+    and ``value`` as the smallest integer array that fits, optionally
+    zlib-compressed. A block index holding the first time of every block
+    follows the JSON header of the other keys, so ``decode_window`` only
+    decompresses the blocks overlapping the requested window. Version 1
+    blobs and legacy JSON text are still accepted by ``decode``.
+    """
+
+    @staticmethod
+    def encode(data: dict, compress: bool = True) -> bytes:
+        times = data.get("time") or []
+        values = data.get("value") or []
+        header = json.dumps(
+            {key: value for key, value in data.items() if key not in ("time", "value")},
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+        flags = FLAG_ZLIB if compress else 0
+        if all(a <= b for a, b in zip(times, times[1:])):
+            flags |= FLAG_SORTED
+
+        entries, blocks, offset = [], [], 0
+        for first in range(0, len(times), BLOCK_SIZE):
+            block = HRCodec._encode_block(
+                times[first : first + BLOCK_SIZE], values[first : first + BLOCK_SIZE]
+            )
+            if compress:
+                block = zlib.compress(block)
+            entries.append(
+                _BLOCK_ENTRY.pack(
+                    times[first], min(BLOCK_SIZE, len(times) - first), offset, len(block)
+                )
+            )
+            blocks.append(block)
+            offset += len(block)
+
+        return b"".join(
+            [
+                _HEADER.pack(MAGIC, VERSION, flags),
+                _INDEX_HEADER.pack(len(header), len(times), len(entries)),
+                header,
+            ]
+            + entries
+            + blocks
+        )
+
+    @staticmethod
+    def _encode_block(times: List[float], values: List[float]) -> bytes:
+        hundredths = [round(t * 100) for t in times]
+        if any(h / 100 != t for h, t in zip(hundredths, times)):
+            # Times could not be represented as hundredths of a minute
+            time_array = array("d", times)
+        else:
+            deltas = [b - a for a, b in zip([0] + hundredths, hundredths)]
+            time_array = array(_int_typecode(deltas), deltas)
+
+        if all(isinstance(v, int) for v in values):
+            value_array = array(_int_typecode(values), values)
+        else:
+            value_array = array("d", values)
+
+        return b"".join(
+            (
+                _BLOCK_TYPECODES.pack(
+                    time_array.typecode.encode(), value_array.typecode.encode()
+                ),
+                _to_bytes(time_array),
+                _to_bytes(value_array),
+            )
+        )
+
+    @staticmethod
+    def decode(blob: Union[bytes, str]) -> dict:
+        return HRCodec.decode_window(blob)
+
+    @staticmethod
+    def decode_window(
+        blob: Union[bytes, str], start: Optional[float] = None, end: Optional[float] = None
+    ) -> dict:
+        """
+        Decodes the samples with start <= time <= end (minutes, either bound
+        may be None). Only the blocks overlapping the window are decompressed.
+        """
+        if isinstance(blob, str):
+            return _slice(json.loads(blob), start, end)
+        blob = bytes(blob)
+        if not blob.startswith(MAGIC):
+            return _slice(json.loads(blob), start, end)
+
+        _, version, flags = _HEADER.unpack_from(blob)
+        if version == 1:
+            return _slice(_decode_v1(blob, flags), start, end)
+        if version != VERSION:
+            raise ValueError(f"Unsupported heart rate encoding version {version}")
+
+        header_len, _, block_count = _INDEX_HEADER.unpack_from(blob, _HEADER.size)
+        offset = _HEADER.size + _INDEX_HEADER.size
+        data = json.loads(blob[offset : offset + header_len])
+        offset += header_len
+        data_start = offset + block_count * _BLOCK_ENTRY.size
+        entries = list(_BLOCK_ENTRY.iter_unpack(blob[offset:data_start]))
+
+        sorted_times = bool(flags & FLAG_SORTED)
+        first, last = 0, block_count
+        if sorted_times:
+            firsts = [entry[0] for entry in entries]
+            if start is not None:
+                first = max(bisect_right(firsts, start) - 1, 0)
+            if end is not None:
+                last = bisect_right(firsts, end)
+
+        times, values = [], []
+        for _, count, block_offset, length in entries[first:last]:
+            block = blob[data_start + block_offset : data_start + block_offset + length]
+            if flags & FLAG_ZLIB:
+                block = zlib.decompress(block)
+            block_times, block_values = _decode_block(block, count)
+            times += block_times
+            values += block_values
+
+        data["time"], data["value"] = times, values
+        if sorted_times:
+            return _slice(data, start, end)
+        return _filter(data, start, end)
+
+    @staticmethod
+    def is_encoded(blob: Union[bytes, str, None]) -> bool:
+        return isinstance(blob, (bytes, memoryview)) and bytes(blob[:3]) == MAGIC
+
+
+def _decode_block(block: bytes, count: int) -> Tuple[List[float], List[float]]:
+    time_code, value_code = (code.decode() for code in _BLOCK_TYPECODES.unpack_from(block))
+    offset = _BLOCK_TYPECODES.size
+    time_end = offset + count * array(time_code).itemsize
+    time_array = _from_bytes(time_code, block[offset:time_end])
+    value_array = _from_bytes(value_code, block[time_end:])
+    if time_code == "d":
+        times = time_array.tolist()
+    else:
+        times = [h / 100 for h in accumulate(time_array)]
+    return times, value_array.tolist()
+
+
+def _decode_v1(blob: bytes, flags: int) -> dict:
+    body = blob[_HEADER.size :]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+
+    header_len, count, time_code, value_code = _BODY_HEADER.unpack_from(body)
+    offset = _BODY_HEADER.size
+    data = json.loads(body[offset : offset + header_len])
+    offset += header_len
+
+    time_code, value_code = time_code.decode(), value_code.decode()
+    time_end = offset + count * array(time_code).itemsize
+    time_array = _from_bytes(time_code, body[offset:time_end])
+    value_array = _from_bytes(value_code, body[time_end:])
+
+    if flags & FLAG_RAW_TIME:
+        data["time"] = time_array.tolist()
+    else:
+        data["time"] = [h / 100 for h in accumulate(time_array)]
+    data["value"] = value_array.tolist()
+    return data
+
+
+def _slice(data: dict, start: Optional[float], end: Optional[float]) -> dict:
+    """Limits an ascending series to [start, end] by bisection."""
+    if start is None and end is None:
+        return data
+    times = data.get("time") or []
+    low = 0 if start is None else bisect_left(times, start)
+    high = len(times) if end is None else bisect_right(times, end)
+    data["time"], data["value"] = times[low:high], (data.get("value") or [])[low:high]
+    return data
+
+
+def _filter(data: dict, start: Optional[float], end: Optional[float]) -> dict:
+    """Limits a series that is not ordered by time to [start, end]."""
+    if start is None and end is None:
+        return data
+    pairs = [
+        (t, v)
+        for t, v in zip(data.get("time") or [], data.get("value") or [])
+        if (start is None or t >= start) and (end is None or t <= end)
+    ]
+    data["time"], data["value"] = [t for t, _ in pairs], [v for _, v in pairs]
+    return data
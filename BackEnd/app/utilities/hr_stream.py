@@ -0,0 +1,253 @@
+import json
+import re
+from typing import IO, Any, Iterator, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+# One ``[timestamp, value]`` sample followed by its separator (``,`` or ``]``)
+_SAMPLE_RE = re.compile(
+    r"\s*\[\s*(-?\d+)\s*,\s*(null|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)\s*\]\s*([,\]])"
+)
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+# End of the samples array: the last sample's "]" followed by the array's "]"
+_ARRAY_END_RE = re.compile(r"\][ \t\n\r]*\]")
+
+# Characters allowed in a run of plain ``[ts, v]`` samples, and the mapping
+# that turns such a run into whitespace separated numbers for numpy
+_SAMPLE_CHARS = str.maketrans("", "", "0123456789.-+eE[], \t\n\rnul")
+_SAMPLE_SEPARATORS = str.maketrans("[],", "   ")
+
+
+def _number(text: str):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _parse_columns(region: str) -> Optional["np.ndarray"]:
+    """
+    Parses a run of ``[ts, v], [ts, v]`` samples into an (n, 2) float64 array
+    with NaN for null values. Returns None if the run is not plain pairs.
+    """
+    pairs = region.count("[")
+    if (
+        region.translate(_SAMPLE_CHARS)
+        or pairs != region.count("]")
+        or region.count(",") != 2 * pairs - 1
+    ):
+        return None
+    text = region.replace("null", "nan").translate(_SAMPLE_SEPARATORS)
+    columns = np.fromstring(text, dtype=np.float64, sep=" ")
+    if columns.size != 2 * pairs:
+        return None
+    columns = columns.reshape(-1, 2)
+    if np.isnan(columns[:, 0]).any():
+        return None
+    return columns
+
+
+class HeartRateStreamReader:
+    """
+    Incremental reader for heart-rate exports shaped like
+    ``[{date: {"heartRateValues": [[ts, v], ...], ...}}, ...]``.
+
+    The file is consumed in fixed-size chunks and events are yielded as soon
+    as they are parsed, so memory is bounded by the chunk size instead of the
+    file size. Events are ``(kind, date, payload)`` tuples:
+
+    - ``("samples", date, [(ts, value), ...])``: a batch of samples
+    - ``("field", date, (key, value))``: any other key of the day object
+    - ``("end_day", date, None)``: the day object is complete
+
+    With ``columns=True`` (requires numpy) samples are instead parsed a
+    chunk at a time into ``("columns", date, array)`` events, where ``array``
+    has shape (n, 2) holding float64 timestamps and values (NaN for null).
+    Irregular samples still come through as ``"samples"`` events.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self, file_obj: IO[str], chunk_size: int = CHUNK_SIZE, columns: bool = False
+    ):
+        if columns and np is None:
+            raise RuntimeError("numpy is required for columnar parsing")
+        self._file = file_obj
+        self._chunk_size = chunk_size
+        self._columns = columns
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def __iter__(self) -> Iterator[Tuple[str, str, Any]]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield from self._read_entry()
+            if not self._separator("]"):
+                return
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer, dropping consumed text."""
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+        return bool(chunk)
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE_RE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found or 'EOF'!r}")
+        self._pos += 1
+
+    def _separator(self, closing: str) -> bool:
+        """Consume ``,`` (more items follow) or the closing bracket."""
+        found = self._peek()
+        self._pos += 1
+        if found == ",":
+            return True
+        if found == closing:
+            return False
+        raise ValueError(f"Expected ',' or {closing!r} but found {found or 'EOF'!r}")
+
+    def _read_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _read_key(self) -> str:
+        if self._peek() != '"':
+            raise ValueError("Expected an object key")
+        key = self._read_value()
+        self._expect(":")
+        return key
+
+    def _read_entry(self):
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            date = self._read_key()
+            yield from self._read_day(date)
+            if not self._separator("}"):
+                return
+
+    def _read_day(self, date: str):
+        self._expect("{")
+        if self._peek() != "}":
+            while True:
+                key = self._read_key()
+                if key == "heartRateValues" and self._peek() == "[":
+                    self._pos += 1  # consume "["
+                    if self._columns:
+                        yield from self._read_sample_columns(date)
+                    else:
+                        yield from self._read_samples(date)
+                else:
+                    yield ("field", date, (key, self._read_value()))
+                if not self._separator("}"):
+                    break
+        else:
+            self._pos += 1
+        yield ("end_day", date, None)
+
+    def _read_sample_columns(self, date: str):
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            buf, pos = self._buf, self._pos
+            array_end = _ARRAY_END_RE.search(buf, pos)
+            region_end = array_end.start() + 1 if array_end else buf.rfind("]", pos) + 1
+
+            if region_end <= pos:
+                # Not even one complete sample buffered yet
+                if self._fill():
+                    continue
+                yield from self._read_samples(date)
+                return
+
+            columns = _parse_columns(buf[pos:region_end])
+            if columns is None:
+                yield from self._read_samples(date)
+                return
+
+            yield ("columns", date, columns)
+            if array_end:
+                self._pos = array_end.end()
+                return
+            self._pos = region_end
+            if not self._separator("]"):
+                return
+
+    def _read_samples(self, date: str):
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        match = _SAMPLE_RE.match
+        refilled = False
+        while True:
+            batch = []
+            buf, pos = self._buf, self._pos
+            while True:
+                found = match(buf, pos)
+                if found is None:
+                    break
+                timestamp, value, separator = found.groups()
+                batch.append((int(timestamp), None if value == "null" else _number(value)))
+                pos = found.end()
+                if separator == "]":
+                    self._pos = pos
+                    yield ("samples", date, batch)
+                    return
+            self._pos = pos
+            if batch:
+                refilled = False
+                yield ("samples", date, batch)
+
+            # Either the chunk ended mid-sample or the sample is formatted in a
+            # way the fast path does not cover: refill once, then fall back to
+            # the generic decoder for a single sample.
+            if not refilled and self._fill():
+                refilled = True
+                continue
+            refilled = False
+            sample = self._read_value()
+            if not isinstance(sample, list) or len(sample) < 2:
+                raise ValueError(f"Invalid heart rate sample: {sample!r}")
+            more = self._separator("]")
+            yield ("samples", date, [(sample[0], sample[1])])
+            if not more:
+                return
@@ -0,0 +1,310 @@
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import defer
+from app.models import (
+    db,
+    DailyRollup,
+    FileMeta,
+    HeartRateLevel,
+    HeartRateMetrics,
+    HeartRatePayload,
+    UploadJob,
+)
+from app.utilities.util import Util
+from app.utilities.metrics import Metrics
+from app.utilities.pyramid import Pyramid
+from app.utilities.series_payload import SeriesPayload
+
+# The long-lived pool of this process, see Ingest.pool
+_pool_lock = threading.Lock()
+_pool = {"pid": None, "executor": None}
+
+
+def _noop():
+    return None
+
+
+class Ingest:
+    """Parse-and-store pipeline shared by the upload endpoints."""
+
+    @staticmethod
+    def store_upload(
+        patient_id: int,
+        file_path: str,
+        filename: str,
+        file_type: str,
+        created_at: Optional[datetime] = None,
+        stream: bool = True,
+        upload_id: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> List[FileMeta]:
+        """
+        Extracts every day of an export and stores one FileMeta row per day.
+
+        All rows share a new upload_id and are written in a single bulk insert
+        and commit. If the patient already uploaded an identical file, its
+        stored rows are returned instead.
+        """
+        if content_hash is None:
+            with open(file_path, "rb") as file:
+                content_hash = Util.content_hash(file)
+
+        existing = Ingest.find_duplicate(patient_id, content_hash)
+        if existing:
+            return existing
+
+        days = Util.extract_heart_rate_days(file_path, stream=stream)
+        return Ingest.store_days(
+            patient_id,
+            days,
+            filename,
+            file_type,
+            created_at or datetime.now(),
+            upload_id,
+            content_hash,
+        )
+
+    @staticmethod
+    def find_duplicate(patient_id: int, content_hash: str) -> List[FileMeta]:
+        """Returns the rows of an earlier identical upload by the same patient."""
+        return (
+            FileMeta.query.options(defer(FileMeta.hr_data))
+            .filter_by(patient_id=patient_id, content_hash=content_hash)
+            .order_by(FileMeta.id)
+            .all()
+        )
+
+    @staticmethod
+    def run_job(job_id: str, stream: bool = True):
+        """Processes a queued UploadJob and records its outcome."""
+        # Claimed atomically, as a requeued job may sit in several workers' queues
+        claimed = db.session.execute(
+            update(UploadJob)
+            .where(UploadJob.id == job_id, UploadJob.status == "queued")
+            .values(status="processing", started_at=datetime.now())
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+        job = db.session.get(UploadJob, job_id)
+
+        try:
+            Ingest.store_upload(
+                job.patient_id,
+                job.file_path,
+                job.filename,
+                job.file_type,
+                created_at=job.created_at,
+                stream=stream,
+                upload_id=job.id,
+                content_hash=job.content_hash,
+            )
+            job.status = "done"
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error processing upload job {job_id}: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+
+        job.finished_at = datetime.now()
+        db.session.commit()
+
+    @staticmethod
+    def store_days(
+        patient_id: int,
+        days: List[dict],
+        filename: str,
+        file_type: str,
+        created_at: datetime,
+        upload_id: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> List[FileMeta]:
+        """Stores already extracted days in one bulk insert and commit."""
+        records = Ingest.build_records(
+            patient_id, days, filename, file_type, created_at, upload_id, content_hash
+        )
+        try:
+            db.session.add_all(records)
+            Ingest.update_rollups(records)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return records
+
+    @staticmethod
+    def build_records(
+        patient_id: int,
+        days: List[dict],
+        filename: str,
+        file_type: str,
+        created_at: datetime,
+        upload_id: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> List[FileMeta]:
+        upload_id = upload_id or uuid.uuid4().hex
+        return [
+            FileMeta(
+                patient_id=patient_id,
+                upload_id=upload_id,
+                filename=filename,
+                file_type=file_type,
+                created_at=created_at,
+                measurement_date=Ingest._parse_date(day["date_of_measurement"]),
+                start_time=day.pop("start_time", None),
+                content_hash=content_hash,
+                sample_count=len(day["time"]),
+                hr_data=day,
+                levels=Ingest.build_levels(day),
+                payloads=Ingest.build_payloads(day),
+                metrics=Ingest.build_metrics(day),
+            )
+            for day in days
+        ]
+
+    @staticmethod
+    def build_levels(day: dict) -> List[HeartRateLevel]:
+        """Precomputes the zoom levels stored next to a FileMeta row."""
+        return [
+            HeartRateLevel(resolution=resolution, bucket_count=count, data=blob)
+            for resolution, (count, blob) in Pyramid.build(day).items()
+        ]
+
+    @staticmethod
+    def build_payloads(day: dict) -> List[HeartRatePayload]:
+        """Serializes the response payloads stored next to a FileMeta row."""
+        return [
+            HeartRatePayload(encoding=encoding, data=body)
+            for encoding, body in SeriesPayload.build(day).items()
+        ]
+
+    @staticmethod
+    def build_metrics(day: dict) -> HeartRateMetrics:
+        """Computes the derived metrics stored next to a FileMeta row."""
+        return HeartRateMetrics(**Metrics.compute(day))
+
+    @staticmethod
+    def update_rollups(records: List[FileMeta]) -> int:
+        """
+        Folds recordings into the patients' daily rollups and returns how
+        many had a date and samples to fold. Each day is an atomic upsert, so
+        concurrent ingests of the same day merge instead of conflicting. Call
+        before committing the records.
+        """
+        rollup = DailyRollup.__table__
+        folded = 0
+        for record in records:
+            values = [v for v in record.hr_data.get("value") or [] if v is not None]
+            if record.measurement_date is None or not values:
+                continue
+            resting = (record.hr_data.get("metadata") or {}).get("restingHeartRate")
+            if resting is None and record.metrics is not None:
+                resting = record.metrics.resting_hr_estimate
+
+            insert = sqlite_insert(rollup).values(
+                patient_id=record.patient_id,
+                date=record.measurement_date,
+                sample_count=len(values),
+                value_sum=float(sum(values)),
+                min_hr=min(values),
+                max_hr=max(values),
+                mean_hr=sum(values) / len(values),
+                resting_hr=resting,
+                updated_at=datetime.utcnow(),
+            )
+            new = insert.excluded
+            sample_count = rollup.c.sample_count + new.sample_count
+            value_sum = rollup.c.value_sum + new.value_sum
+            db.session.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[rollup.c.patient_id, rollup.c.date],
+                    set_={
+                        "sample_count": sample_count,
+                        "value_sum": value_sum,
+                        "min_hr": func.min(rollup.c.min_hr, new.min_hr),
+                        "max_hr": func.max(rollup.c.max_hr, new.max_hr),
+                        "mean_hr": value_sum / sample_count,
+                        # SQLite's scalar min() is NULL if either side is
+                        "resting_hr": func.min(
+                            func.coalesce(rollup.c.resting_hr, new.resting_hr),
+                            func.coalesce(new.resting_hr, rollup.c.resting_hr),
+                        ),
+                        "updated_at": new.updated_at,
+                    },
+                )
+            )
+            folded += 1
+        return folded
+
+    @staticmethod
+    def parse_many(
+        file_paths: List[str], stream: bool = True, workers: int = 4
+    ) -> List[Tuple[Optional[List[dict]], Optional[str]]]:
+        """
+        Extracts several files in parallel.
+
+        Returns one ``(days, error)`` pair per path, in order.
+        """
+        if not file_paths:
+            return []
+
+        results = []
+        executor = Ingest.pool(workers)
+        futures = [
+            executor.submit(Util.extract_heart_rate_days, file_path, stream)
+            for file_path in file_paths
+        ]
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as e:
+                results.append((None, str(e)))
+        return results
+
+    @staticmethod
+    def pool(workers: int) -> Executor:
+        """
+        Long-lived pool for CPU-bound work in request handlers, one per
+        process. Every child is forked when the pool is first created, which
+        gunicorn workers do in start_worker before they start any thread;
+        forking later, while request, ingest queue or event publisher
+        threads hold locks, could deadlock the children. ``workers`` only
+        applies on creation.
+        """
+        with _pool_lock:
+            if _pool["pid"] != os.getpid():
+                executor = Ingest.executor(workers)
+                # Start every child now rather than on demand
+                for future in [executor.submit(_noop) for _ in range(max(1, workers))]:
+                    future.result()
+                _pool.update(pid=os.getpid(), executor=executor)
+            return _pool["executor"]
+
+    @staticmethod
+    def executor(workers: int) -> Executor:
+        """
+        Pool for one-off CPU-bound jobs such as CLI commands. Processes are
+        forked so children don't re-import the app package (which would run
+        create_app); threads are used where fork is unavailable. Request
+        handlers use the shared Ingest.pool instead.
+        """
+        workers = max(1, workers)
+        if "fork" in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("fork")
+            )
+        return ThreadPoolExecutor(workers)
+
+    @staticmethod
+    def _parse_date(value) -> Optional[date]:
+        try:
+            return date.fromisoformat(str(value)[:10])
+        except ValueError:
+            return None
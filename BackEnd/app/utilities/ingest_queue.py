@@ -0,0 +1,95 @@
+import queue
+import threading
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import or_, update
+from app.models import db, UploadJob
+from app.utilities.ingest import Ingest
+
+
+class IngestQueue:
+    """
+    Bounded in-process queue of upload jobs drained by a pool of threads.
+
+    Worker threads are started lazily on the first submit so they are created
+    inside the gunicorn worker process rather than before it forks.
+    """
+
+    def __init__(self, app: Flask, workers: int, max_pending: int):
+        self._app = app
+        self._workers = workers
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def full(self) -> bool:
+        return self._queue.full()
+
+    def submit(self, job_id: str) -> bool:
+        """Queues a job; returns False when the queue is full."""
+        self._start()
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            return False
+        return True
+
+    def recover(self, stale_seconds: float) -> int:
+        """
+        Queues the jobs a restarted or crashed worker left behind: every
+        "queued" job, and "processing" jobs claimed more than
+        ``stale_seconds`` ago, which are reset to "queued" first. Jobs also
+        queued by a live worker run once, as Ingest.run_job claims them.
+        Returns the number of jobs queued; the rest wait for the next start.
+        """
+        with self._app.app_context():
+            stale = datetime.now() - timedelta(seconds=stale_seconds)
+            db.session.execute(
+                update(UploadJob)
+                .where(
+                    UploadJob.status == "processing",
+                    or_(UploadJob.started_at.is_(None), UploadJob.started_at < stale),
+                )
+                .values(status="queued", started_at=None)
+            )
+            db.session.commit()
+            job_ids = db.session.scalars(
+                db.select(UploadJob.id)
+                .where(UploadJob.status == "queued")
+                .order_by(UploadJob.created_at)
+            ).all()
+
+        queued = 0
+        for job_id in job_ids:
+            if not self.submit(job_id):
+                break
+            queued += 1
+        if queued:
+            print(f"Requeued {queued} upload jobs.")
+        return queued
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self._workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"ingest-worker-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self._app.app_context():
+                    Ingest.run_job(job_id, stream=self._app.config["HR_STREAM_PARSE"])
+            except Exception as e:
+                print(f"Ingest worker failed on job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Blocks until every queued job has been processed."""
+        self._queue.join()
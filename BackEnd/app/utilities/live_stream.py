@@ -0,0 +1,244 @@
+import json
+import math
+import struct
+import sys
+from array import array
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, FileMeta, LiveBatch, LiveSession
+from app.utilities.ingest import Ingest
+from app.utilities.util import HR_METADATA_KEYS, Util
+
+# Compact binary batches: little-endian (int64 epoch ms, float32 bpm) records
+MEDIA_TYPE = "application/vnd.heartrate.samples"
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson")
+_SAMPLE = struct.Struct("<qf")
+# Inserts of a batch whose seq was taken by a concurrent append
+APPEND_ATTEMPTS = 5
+
+
+class LiveSessionClosed(Exception):
+    """Raised when samples are appended to, or a close is repeated on, a closed session."""
+
+
+class LiveStream:
+    """
+    Batches of samples streamed by a device into a LiveSession.
+
+    Every batch is stored as its own LiveBatch row, so appending never
+    rewrites what was already received. Closing the session merges the
+    batches into regular per-day FileMeta recordings.
+    """
+
+    @staticmethod
+    def parse(body: bytes, content_type: Optional[str]) -> List[Tuple[int, float]]:
+        """
+        Parses a request body into ``(epoch ms, bpm)`` samples. NDJSON lines
+        are ``[timestamp, value]`` or ``{"timestamp": ..., "value": ...}``;
+        samples without a value are dropped.
+        """
+        if content_type == MEDIA_TYPE:
+            if len(body) % _SAMPLE.size:
+                raise ValueError("Binary batches must be a whole number of samples")
+            return [
+                (timestamp, value)
+                for timestamp, value in _SAMPLE.iter_unpack(body)
+                if not math.isnan(value)
+            ]
+        if content_type in NDJSON_TYPES:
+            return LiveStream._parse_ndjson(body)
+        raise ValueError("Unsupported sample format")
+
+    @staticmethod
+    def _parse_ndjson(body: bytes) -> List[Tuple[int, float]]:
+        samples = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    timestamp, value = item["timestamp"], item.get("value")
+                else:
+                    timestamp, value = item[0], item[1]
+                if value is None:
+                    continue
+                if isinstance(timestamp, bool) or isinstance(value, bool):
+                    raise TypeError
+                samples.append((int(timestamp), float(value)))
+            except (ValueError, KeyError, IndexError, TypeError):
+                raise ValueError(f"Invalid sample on line {number}")
+        return samples
+
+    @staticmethod
+    def pack(samples: List[Tuple[int, float]]) -> bytes:
+        """Timestamps as int64 followed by values as float64, little-endian."""
+        columns = [array("q", [t for t, _ in samples]), array("d", [v for _, v in samples])]
+        if sys.byteorder != "little":
+            for column in columns:
+                column.byteswap()
+        return b"".join(column.tobytes() for column in columns)
+
+    @staticmethod
+    def unpack(data: bytes, count: int) -> List[Tuple[int, float]]:
+        timestamps, values = array("q"), array("d")
+        timestamps.frombytes(data[: 8 * count])
+        values.frombytes(data[8 * count :])
+        if sys.byteorder != "little":
+            timestamps.byteswap()
+            values.byteswap()
+        return list(zip(timestamps, values))
+
+    @staticmethod
+    def append(session: LiveSession, samples, seq: Optional[int] = None) -> Tuple[LiveBatch, bool]:
+        """
+        Stores a batch and returns ``(batch, duplicate)``. Resending a batch
+        with a ``seq`` that was already stored is acknowledged, not applied
+        twice. Without a ``seq`` the batch takes the next free one, chosen
+        in the INSERT itself; should a concurrent append still take it first
+        the insert is retried. Raises LiveSessionClosed once the session was
+        closed, even by a close that started after this request.
+        """
+        session_id = session.id
+        timestamps = [timestamp for timestamp, _ in samples]
+        values = {
+            "session_id": session_id,
+            "seq": seq,
+            "sample_count": len(samples),
+            "first_timestamp": min(timestamps, default=None),
+            "last_timestamp": max(timestamps, default=None),
+            "data": LiveStream.pack(samples),
+        }
+        if seq is None:
+            values["seq"] = (
+                select(db.func.coalesce(db.func.max(LiveBatch.seq), -1) + 1)
+                .where(LiveBatch.session_id == session_id)
+                .scalar_subquery()
+            )
+        # Counted in SQL so concurrent appends don't overwrite each other
+        totals = {"sample_count": LiveSession.sample_count + len(samples)}
+        if timestamps:
+            totals["last_timestamp"] = db.func.max(
+                db.func.coalesce(LiveSession.last_timestamp, 0), values["last_timestamp"]
+            )
+
+        for attempt in range(APPEND_ATTEMPTS):
+            if seq is not None:
+                existing = db.session.get(LiveBatch, (session_id, seq))
+                if existing:
+                    return existing, True
+            try:
+                # Writing the totals first takes the write lock, so a close
+                # either sees this batch or has already marked the session
+                opened = db.session.execute(
+                    update(LiveSession)
+                    .where(LiveSession.id == session_id, LiveSession.status == "open")
+                    .values(**totals)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not opened:
+                    db.session.rollback()
+                    raise LiveSessionClosed("Live session is closed")
+                stored_seq = db.session.execute(
+                    insert(LiveBatch).values(**values).returning(LiveBatch.seq)
+                ).scalar_one()
+                db.session.commit()
+            except LiveSessionClosed:
+                raise
+            except IntegrityError:
+                db.session.rollback()
+                # Another request stored this seq first; look it up or take the next
+                if attempt == APPEND_ATTEMPTS - 1:
+                    raise
+                continue
+            except Exception:
+                db.session.rollback()
+                raise
+            return db.session.get(LiveBatch, (session_id, stored_seq)), False
+
+    @staticmethod
+    def samples(session: LiveSession, after: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Time-ordered samples of a session, optionally only those after ``after``."""
+        query = LiveBatch.query.filter_by(session_id=session.id)
+        if after is not None:
+            query = query.filter(LiveBatch.last_timestamp > after)
+        samples = [
+            sample
+            for batch in query.order_by(LiveBatch.seq)
+            for sample in LiveStream.unpack(batch.data, batch.sample_count)
+            if after is None or sample[0] > after
+        ]
+        return LiveStream._ordered(samples)
+
+    @staticmethod
+    def _ordered(samples: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+        """Sorts by timestamp; a resent timestamp keeps its latest value."""
+        latest = dict(samples)
+        return sorted(latest.items())
+
+    @staticmethod
+    def to_days(samples: List[Tuple[int, float]]) -> List[dict]:
+        """Splits ordered samples into day dicts shaped like extract_heart_rate_days."""
+        days = []
+        for measurement_date, group in groupby(
+            samples,
+            key=lambda sample: datetime.fromtimestamp(sample[0] / 1000, timezone.utc).date(),
+        ):
+            group = [
+                (timestamp, int(value) if value.is_integer() else value)
+                for timestamp, value in group
+            ]
+            values = [value for _, value in group]
+            day = {
+                "date_of_measurement": measurement_date.isoformat(),
+                "time": [],
+                "value": [],
+                "metadata": {key: None for key in HR_METADATA_KEYS},
+                "start_time": group[0][0],
+            }
+            day["metadata"].update({"maxHeartRate": max(values), "minHeartRate": min(values)})
+            Util._append_samples(group, day["start_time"], day["time"], day["value"])
+            days.append(day)
+        return days
+
+    @staticmethod
+    def close(session: LiveSession) -> List[FileMeta]:
+        """
+        Stores the session as regular recordings, one per day, and drops its
+        batches, all in one transaction. The session is marked closed first,
+        which takes the write lock: concurrent closes raise
+        LiveSessionClosed, and no append can commit a batch that would be
+        dropped unread.
+        """
+        try:
+            closing = db.session.execute(
+                update(LiveSession)
+                .where(LiveSession.id == session.id, LiveSession.status == "open")
+                .values(status="closed", closed_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not closing:
+                raise LiveSessionClosed("Live session is closed")
+
+            days = LiveStream.to_days(LiveStream.samples(session))
+            records = Ingest.build_records(
+                session.patient_id,
+                days,
+                f"live-{session.id}.json",
+                "live",
+                datetime.now(),
+                upload_id=session.id,
+            )
+            db.session.add_all(records)
+            Ingest.update_rollups(records)
+            LiveBatch.query.filter_by(session_id=session.id).delete()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return records
@@ -0,0 +1,150 @@
+import math
+from bisect import bisect_right
+from typing import List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the pure Python path is used instead
+    np = None
+
+
+class Metrics:
+    """
+    Derived cardiac metrics of a heart-rate series, computed once at ingest.
+
+    Samples more than ``MAX_GAP_MINUTES`` apart are treated as a gap in the
+    recording: the gap counts towards no zone and its successive difference
+    is left out of the variability. Variability is the RMSSD of successive
+    heart-rate samples (the exports carry no RR intervals), in bpm.
+    """
+
+    # Heart-rate zones: (name, lower bound in bpm, inclusive)
+    ZONES = (
+        ("below_60", 0),
+        ("60_to_99", 60),
+        ("100_to_139", 100),
+        ("140_to_169", 140),
+        ("170_and_above", 170),
+    )
+    MAX_GAP_MINUTES = 5
+    ROLLING_WINDOW_MINUTES = 10
+
+    @staticmethod
+    def compute(data: dict) -> dict:
+        times, values = data.get("time") or [], data.get("value") or []
+        metadata = data.get("metadata") or {}
+        if None in values or any(a > b for a, b in zip(times, times[1:])):
+            pairs = sorted((t, v) for t, v in zip(times, values) if v is not None)
+            times, values = [t for t, _ in pairs], [v for _, v in pairs]
+
+        result = {
+            "sample_count": len(values),
+            "resting_hr_reported": metadata.get("restingHeartRate"),
+            "zone_minutes": {name: 0.0 for name, _ in Metrics.ZONES},
+            "rolling_mean": {
+                "window": Metrics.ROLLING_WINDOW_MINUTES,
+                "time": [],
+                "value": [],
+            },
+        }
+        for key in ("min_hr", "max_hr", "mean_hr", "sd_hr", "rmssd", "resting_hr_estimate"):
+            result[key] = None
+        if not values:
+            return result
+
+        if np is not None:
+            computed = Metrics._compute_numpy(times, values)
+        else:
+            computed = Metrics._compute_python(times, values)
+        zone_minutes, rolling, points, rmssd, sd = computed
+
+        result.update(
+            {
+                "min_hr": min(values),
+                "max_hr": max(values),
+                "mean_hr": round(sum(values) / len(values), 1),
+                "sd_hr": round(sd, 2),
+                "rmssd": None if rmssd is None else round(rmssd, 2),
+            }
+        )
+        result["zone_minutes"] = {
+            name: round(minutes, 2) for (name, _), minutes in zip(Metrics.ZONES, zone_minutes)
+        }
+
+        # Lowest trailing average over a full window; short recordings fall
+        # back to every window
+        full = [
+            mean
+            for t, mean in zip(times, rolling)
+            if t - times[0] >= Metrics.ROLLING_WINDOW_MINUTES
+        ]
+        result["resting_hr_estimate"] = round(min(full or rolling), 1)
+
+        # One rolling average point per window: the last sample of each
+        result["rolling_mean"]["time"] = [times[i] for i in points]
+        result["rolling_mean"]["value"] = [round(rolling[i], 1) for i in points]
+        return result
+
+    @staticmethod
+    def _compute_numpy(times: Sequence[float], values: Sequence[float]):
+        t = np.asarray(times, dtype=np.float64)
+        v = np.asarray(values, dtype=np.float64)
+
+        gaps = np.diff(t)
+        contiguous = gaps <= Metrics.MAX_GAP_MINUTES
+        durations = np.append(np.where(contiguous, gaps, 0.0), 0.0)
+        bounds = np.array([bound for _, bound in Metrics.ZONES], dtype=np.float64)
+        zones = np.clip(np.searchsorted(bounds, v, side="right") - 1, 0, None)
+        zone_minutes = np.bincount(zones, weights=durations, minlength=len(bounds))
+
+        # Trailing mean over (t - window, t] from prefix sums
+        sums = np.concatenate(([0.0], np.cumsum(v)))
+        right = np.arange(1, len(v) + 1)
+        left = np.searchsorted(t, t - Metrics.ROLLING_WINDOW_MINUTES, side="right")
+        rolling = (sums[right] - sums[left]) / (right - left)
+
+        buckets = np.floor(t / Metrics.ROLLING_WINDOW_MINUTES)
+        points = np.append(np.flatnonzero(np.diff(buckets)), len(t) - 1)
+
+        steps = np.diff(v)[contiguous]
+        rmssd = float(np.sqrt(np.mean(steps**2))) if steps.size else None
+        return zone_minutes.tolist(), rolling.tolist(), points.tolist(), rmssd, float(v.std())
+
+    @staticmethod
+    def _compute_python(times: Sequence[float], values: Sequence[float]):
+        bounds = [bound for _, bound in Metrics.ZONES]
+        zone_minutes = [0.0] * len(bounds)
+        squares = []
+        for i in range(len(times) - 1):
+            gap = times[i + 1] - times[i]
+            if gap <= Metrics.MAX_GAP_MINUTES:
+                zone = max(bisect_right(bounds, values[i]) - 1, 0)
+                zone_minutes[zone] += gap
+                squares.append((values[i + 1] - values[i]) ** 2)
+
+        sums = [0.0]
+        for value in values:
+            sums.append(sums[-1] + value)
+        rolling = []
+        for i, t in enumerate(times):
+            left = bisect_right(times, t - Metrics.ROLLING_WINDOW_MINUTES)
+            rolling.append((sums[i + 1] - sums[left]) / (i + 1 - left))
+
+        mean = sums[-1] / len(values)
+        sd = math.sqrt(sum((value - mean) ** 2 for value in values) / len(values))
+        rmssd = math.sqrt(sum(squares) / len(squares)) if squares else None
+        return zone_minutes, rolling, Metrics._window_ends(times), rmssd, sd
+
+    @staticmethod
+    def _window_ends(times: Sequence[float]) -> List[int]:
+        """Index of the last sample of every rolling window bucket."""
+        window = Metrics.ROLLING_WINDOW_MINUTES
+        ends: List[int] = []
+        previous: Optional[int] = None
+        for i, t in enumerate(times):
+            bucket = math.floor(t / window)
+            if previous is not None and bucket != previous:
+                ends.append(i - 1)
+            previous = bucket
+        ends.append(len(times) - 1)
+        return ends
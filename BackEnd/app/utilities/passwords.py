@@ -0,0 +1,123 @@
+import fcntl
+import os
+import threading
+from typing import Optional
+
+import bcrypt
+from werkzeug.security import check_password_hash
+
+from app.utilities.ingest import Ingest, _noop
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool already has ``max_pending`` operations."""
+
+
+# bcrypt ignores everything after the first 72 bytes of a password
+MAX_PASSWORD_BYTES = 72
+
+
+def password_too_long(password: str) -> bool:
+    return len(password.encode("utf-8")) > MAX_PASSWORD_BYTES
+
+
+def hash_password(password: str, rounds: int) -> str:
+    if password_too_long(password):
+        raise ValueError(f"Passwords are limited to {MAX_PASSWORD_BYTES} bytes")
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def _verify(password: str, hashed: str) -> bool:
+    if hashed.startswith("$2"):
+        # A longer password would match on its first 72 bytes alone
+        if password_too_long(password):
+            return False
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("ascii"))
+    # Accounts registered before bcrypt hold werkzeug hashes
+    return check_password_hash(hashed, password)
+
+
+class PasswordHasher:
+    """
+    Bcrypt hashing and verification in a small pool of processes.
+
+    Hashing is slow on purpose, so running it in the request worker blocks
+    that worker for the whole computation. Operations are handed to a pool
+    of ``workers`` processes, which caps the CPU that sign-ins take from
+    the data endpoints. At most ``max_pending`` operations are queued or
+    running across all gunicorn workers: each holds a lock on one of as
+    many slot files in ``slot_folder``, and once every slot is taken further
+    calls raise PasswordHasherBusy straight away so a burst of logins is
+    turned away instead of piling up. The pool is started inside the
+    gunicorn worker process rather than before it forks (see ``start``).
+    """
+
+    def __init__(self, workers: int, rounds: int, max_pending: int, slot_folder: str):
+        self.rounds = rounds
+        self._workers = workers
+        self._max_pending = max_pending
+        self._slot_folder = slot_folder
+        os.makedirs(slot_folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def hash(self, password: str) -> str:
+        return self._run(hash_password, password, self.rounds)
+
+    def verify(self, password: str, hashed: Optional[str]) -> bool:
+        if not hashed:
+            return False
+        return self._run(_verify, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True for werkzeug hashes and bcrypt hashes of another cost."""
+        if not hashed.startswith("$2"):
+            return True
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def start(self):
+        """
+        Forks the hashing processes of this worker. Gunicorn workers call it
+        in start_worker, before they hold any slot or file lock a forked
+        child would inherit and keep; elsewhere the pool starts on first use.
+        """
+        self._pool()
+
+    def _run(self, func, *args):
+        pool = self._pool()
+        slot = self._acquire_slot()
+        if slot is None:
+            raise PasswordHasherBusy("Too many password operations in progress")
+        try:
+            return pool.submit(func, *args).result()
+        finally:
+            # Closing the file releases its lock
+            os.close(slot)
+
+    def _acquire_slot(self) -> Optional[int]:
+        """Descriptor of a free slot file, locked until closed, or None."""
+        for number in range(self._max_pending):
+            slot = os.open(
+                os.path.join(self._slot_folder, f"{number}.lock"), os.O_RDWR | os.O_CREAT
+            )
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot
+            except BlockingIOError:
+                os.close(slot)
+        return None
+
+    def _pool(self):
+        with self._lock:
+            # A forked child must not reuse its parent's pool
+            if self._executor is None or self._pid != os.getpid():
+                executor = Ingest.executor(self._workers)
+                # Start every child now rather than on demand
+                for future in [executor.submit(_noop) for _ in range(max(1, self._workers))]:
+                    future.result()
+                self._executor, self._pid = executor, os.getpid()
+            return self._executor
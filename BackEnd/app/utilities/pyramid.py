@@ -0,0 +1,180 @@
+import json
+import math
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the pure Python path is used instead
+    np = None
+
+MAGIC = b"HRP1"
+# magic, bucket count, resolution in seconds, header length
+_HEADER = struct.Struct("<4sIII")
+
+
+class Pyramid:
+    """
+    Multi-resolution min/max/mean buckets of a heart-rate series.
+
+    Each level is a fixed-width little-endian blob: a small JSON header
+    followed by the bucket indexes (uint32, bucket start = index * resolution
+    seconds) and float32 min, max and mean columns. Because the index column
+    is sorted and fixed-width, a time window is located by binary search and
+    only the buckets inside it are decoded.
+    """
+
+    # Bucket sizes in seconds: 1 s, 10 s, 1 min, 10 min
+    LEVELS = (1, 10, 60, 600)
+
+    @staticmethod
+    def build(data: dict) -> Dict[int, Tuple[int, bytes]]:
+        """
+        Returns ``{resolution: (bucket_count, blob)}`` for every level that
+        actually reduces the series.
+        """
+        times, values = data.get("time") or [], data.get("value") or []
+        header = {
+            "date_of_measurement": data.get("date_of_measurement"),
+            "metadata": data.get("metadata"),
+        }
+        levels = {}
+        for resolution in Pyramid.LEVELS:
+            buckets = Pyramid._buckets(times, values, resolution)
+            if len(buckets[0]) < len(times):
+                levels[resolution] = (
+                    len(buckets[0]),
+                    Pyramid._encode(resolution, header, *buckets),
+                )
+        return levels
+
+    @staticmethod
+    def _buckets(times: Sequence[float], values: Sequence[float], resolution: int):
+        if np is not None and len(times):
+            seconds = np.asarray(times, dtype=np.float64) * 60
+            samples = np.asarray(values, dtype=np.float64)
+            order = np.argsort(seconds, kind="stable")
+            seconds, samples = seconds[order], samples[order]
+
+            index = np.floor(seconds / resolution + 1e-9).astype(np.int64)
+            starts = np.flatnonzero(np.diff(index, prepend=-1))
+            counts = np.diff(np.append(starts, len(index)))
+            return (
+                index[starts].tolist(),
+                np.minimum.reduceat(samples, starts).tolist(),
+                np.maximum.reduceat(samples, starts).tolist(),
+                (np.add.reduceat(samples, starts) / counts).tolist(),
+            )
+
+        indexes, mins, maxs, means = [], [], [], []
+        pairs = sorted(zip(times, values), key=lambda pair: pair[0])
+        for index, group in groupby(
+            pairs, key=lambda pair: math.floor(pair[0] * 60 / resolution + 1e-9)
+        ):
+            bucket = [value for _, value in group]
+            indexes.append(index)
+            mins.append(min(bucket))
+            maxs.append(max(bucket))
+            means.append(sum(bucket) / len(bucket))
+        return indexes, mins, maxs, means
+
+    @staticmethod
+    def _encode(resolution, header, indexes, mins, maxs, means) -> bytes:
+        header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        header += b" " * (-len(header) % 4)  # keep the columns 4-byte aligned
+        columns = [array("I", indexes)] + [array("f", column) for column in (mins, maxs, means)]
+        if sys.byteorder != "little":
+            for column in columns:
+                column.byteswap()
+        return b"".join(
+            [_HEADER.pack(MAGIC, len(indexes), resolution, len(header)), header]
+            + [column.tobytes() for column in columns]
+        )
+
+    @staticmethod
+    def read(blob: bytes, start: Optional[float] = None, end: Optional[float] = None) -> dict:
+        """
+        Decodes the buckets of a level that start within [start, end]
+        (minutes relative to the first sample).
+        """
+        magic, count, resolution, header_len = _HEADER.unpack_from(blob)
+        if magic != MAGIC:
+            raise ValueError("Invalid heart rate level data")
+        offset = _HEADER.size + header_len
+        data = json.loads(blob[_HEADER.size : offset])
+
+        columns = Pyramid._columns(blob, offset, count)
+        indexes = columns[0]
+        low = 0 if start is None else bisect_left(indexes, math.ceil(start * 60 / resolution - 1e-9))
+        high = count if end is None else bisect_right(indexes, math.floor(end * 60 / resolution + 1e-9))
+
+        data.update(
+            {
+                "resolution": resolution,
+                "time": [round(i * resolution / 60, 2) for i in indexes[low:high]],
+                "min": columns[1][low:high],
+                "max": columns[2][low:high],
+                "value": [round(v, 1) for v in columns[3][low:high]],
+            }
+        )
+        return data
+
+    @staticmethod
+    def _columns(blob: bytes, offset: int, count: int) -> List[Sequence]:
+        """Zero-copy views of the four columns (decoded arrays on big-endian hosts)."""
+        view = memoryview(blob)
+        columns = []
+        for position, typecode in enumerate("Ifff"):
+            raw = view[offset + position * 4 * count : offset + (position + 1) * 4 * count]
+            if sys.byteorder == "little":
+                columns.append(_ListView(raw.cast(typecode)))
+            else:
+                column = array(typecode, raw)
+                column.byteswap()
+                columns.append(column)
+        return columns
+
+    @staticmethod
+    def choose_resolution(
+        levels: Dict[int, int],
+        sample_count: Optional[int],
+        duration: Optional[float],
+        max_points: int,
+    ) -> Optional[int]:
+        """
+        Picks the finest representation with at most max_points points for a
+        window of ``duration`` minutes (None for the whole recording).
+
+        ``levels`` maps resolution to bucket count. Returns None when the raw
+        samples should be served.
+        """
+        def estimate(count, per_minute):
+            if duration is None:
+                return count
+            return min(count, math.ceil(duration * per_minute) + 1)
+
+        if sample_count is not None and max(sample_count, 1) <= max_points:
+            return None
+        for resolution in sorted(levels):
+            if estimate(levels[resolution], 60 / resolution) <= max_points:
+                return resolution
+        return max(levels) if levels else None
+
+
+class _ListView:
+    """Sequence over a memoryview whose slices come back as lists."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+
+    def __len__(self):
+        return len(self._view)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self._view[item].tolist()
+        return self._view[item]
@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import db, TokenBlocklist
+
+
+class _BloomFilter:
+    """Fixed-size bloom filter over strings."""
+
+    def __init__(self, bits: int, hashes: int):
+        self._bits = bits
+        self._hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4 * self._hashes).digest()
+        for i in range(self._hashes):
+            yield int.from_bytes(digest[4 * i : 4 * i + 4], "little") % self._bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationStore:
+    """
+    Revoked JWT ids shared through the token_blocklist table.
+
+    Each process mirrors the table into a bloom filter, pulling only rows
+    added since its last sync and at most every ``sync_seconds``. A token
+    absent from the filter is not revoked, so the common check costs no
+    query. Filter hits are confirmed against the table and the answer is
+    cached for ``sync_seconds``. Rows are deleted once the token has expired
+    and the filter is rebuilt from the remaining rows every
+    ``REBUILD_SECONDS``, so neither grows without bound.
+    """
+
+    BLOOM_BITS = 1 << 20
+    BLOOM_HASHES = 4
+    REBUILD_SECONDS = 3600
+
+    def __init__(self, sync_seconds: float):
+        self._sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._bloom = _BloomFilter(self.BLOOM_BITS, self.BLOOM_HASHES)
+        self._cache = {}  # jti -> (revoked, checked at)
+        self._last_id = 0
+        self._synced_at = None
+        self._built_at = None
+
+    def revoke(self, jti: str, expires: int):
+        """Revokes a token until ``expires`` (the JWT exp claim)."""
+        expires_at = datetime.fromtimestamp(expires, timezone.utc).replace(tzinfo=None)
+        self.purge_expired()
+        db.session.execute(
+            sqlite_insert(TokenBlocklist)
+            .values(jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["jti"])
+        )
+        db.session.commit()
+        with self._lock:
+            self._bloom.add(jti)
+            self._cache[jti] = (True, time.monotonic())
+
+    def is_revoked(self, jti: str) -> bool:
+        now = time.monotonic()
+        self._sync(now)
+        with self._lock:
+            if jti not in self._bloom:
+                return False
+            cached = self._cache.get(jti)
+            if cached and (cached[0] or now - cached[1] < self._sync_seconds):
+                return cached[0]
+
+        revoked = (
+            db.session.execute(
+                select(TokenBlocklist.id).where(TokenBlocklist.jti == jti)
+            ).first()
+            is not None
+        )
+        with self._lock:
+            self._cache[jti] = (revoked, now)
+        return revoked
+
+    def purge_expired(self) -> int:
+        """Deletes revocations of tokens that have expired anyway."""
+        purged = TokenBlocklist.query.filter(
+            TokenBlocklist.expires_at < datetime.utcnow()
+        ).delete()
+        db.session.commit()
+        return purged
+
+    def _sync(self, now: float):
+        with self._lock:
+            if self._synced_at is not None and now - self._synced_at < self._sync_seconds:
+                return
+            rebuild = self._built_at is None or now - self._built_at >= self.REBUILD_SECONDS
+            last_id = 0 if rebuild else self._last_id
+            self._synced_at = now
+
+        rows = db.session.execute(
+            select(TokenBlocklist.id, TokenBlocklist.jti).where(TokenBlocklist.id > last_id)
+        ).all()
+
+        with self._lock:
+            if rebuild:
+                self._bloom = _BloomFilter(self.BLOOM_BITS, self.BLOOM_HASHES)
+                self._cache = {}
+                self._built_at = now
+            for row_id, jti in rows:
+                self._bloom.add(jti)
+                self._last_id = max(self._last_id, row_id)
+            # Drop stale answers so the cache stays small
+            self._cache = {
+                jti: entry
+                for jti, entry in self._cache.items()
+                if now - entry[1] < self._sync_seconds
+            }
@@ -0,0 +1,201 @@
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import insert
+
+from app.models import db, Auth, Person, RegisterMeta, UserType
+from app.utilities.ingest import Ingest
+from app.utilities.passwords import MAX_PASSWORD_BYTES, hash_password, password_too_long
+from app.utilities.util import Util
+
+ROSTER_FIELDS = ("first_name", "last_name", "email", "password", "gender", "dob", "role", "type")
+
+
+class RosterImport:
+    """
+    Bulk registration of the accounts listed in a CSV or NDJSON roster.
+
+    Every row carries the fields of the registration endpoints: first_name,
+    last_name, email, password, and gender and dob (MM/DD/YYYY) for patients.
+    ``role`` is "patient" (the default) or "clinician", in which case
+    ``type`` holds the clinician's SNOMED code. Rows are validated, their
+    passwords hashed in a process pool and the person, auth and
+    register_meta rows inserted in bulk, one transaction per batch. Invalid
+    rows are reported and skipped; the rest of the batch is still imported.
+    """
+
+    @staticmethod
+    def read(path: str) -> Iterator[Tuple[int, dict]]:
+        """Yields ``(line number, row)``; NDJSON for .ndjson/.jsonl files, else CSV."""
+        with open(path, newline="", encoding="utf-8") as file:
+            if path.lower().endswith((".ndjson", ".jsonl")):
+                for number, line in enumerate(file, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        row = None
+                    yield number, row if isinstance(row, dict) else None
+            else:
+                reader = csv.DictReader(file)
+                for row in reader:
+                    yield reader.line_num, row
+
+    @staticmethod
+    def run(path: str, batch_size: int, workers: int, rounds: int) -> dict:
+        """Imports a roster and returns the imported count and the row errors."""
+        user_types = {user_type.snomed_code: user_type for user_type in UserType.query}
+        patient_type = next(t for t in user_types.values() if t.name == "patient")
+        rows = RosterImport.read(path)
+        imported, errors, seen = 0, [], set()
+
+        with Ingest.executor(workers) as executor:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+
+                accounts = []
+                for number, row in batch:
+                    account, error = RosterImport._validate(row, user_types, patient_type)
+                    if not error and account["email"] in seen:
+                        error = "Email listed more than once"
+                    if error:
+                        errors.append({"line": number, "email": _email(row), "error": error})
+                        continue
+                    seen.add(account["email"])
+                    accounts.append((number, account))
+
+                registered = RosterImport._registered([account["email"] for _, account in accounts])
+                for number, account in accounts:
+                    if account["email"] in registered:
+                        errors.append(
+                            {
+                                "line": number,
+                                "email": account["email"],
+                                "error": "Email already registered",
+                            }
+                        )
+                accounts = [item for item in accounts if item[1]["email"] not in registered]
+                if not accounts:
+                    continue
+
+                hashes = executor.map(
+                    hash_password,
+                    [account.pop("password") for _, account in accounts],
+                    [rounds] * len(accounts),
+                    chunksize=max(1, len(accounts) // (4 * max(1, workers))),
+                )
+                try:
+                    RosterImport._insert([account for _, account in accounts], list(hashes))
+                    imported += len(accounts)
+                except Exception as e:
+                    db.session.rollback()
+                    errors.extend(
+                        {"line": number, "email": account["email"], "error": str(e)}
+                        for number, account in accounts
+                    )
+
+        return {"imported": imported, "errors": errors}
+
+    @staticmethod
+    def _validate(row, user_types: Dict[str, UserType], patient_type: UserType):
+        """Returns ``(account, None)`` or ``(None, error message)``."""
+        if not row:
+            return None, "Invalid row"
+        row = {key: (str(row.get(key) or "")).strip() for key in ROSTER_FIELDS}
+        role = row["role"].lower() or "patient"
+
+        for field, label in (
+            ("first_name", "First name"),
+            ("last_name", "Last name"),
+            ("email", "Email"),
+            ("password", "Password"),
+        ):
+            if not row[field]:
+                return None, f"{label} is required"
+        if not Util.check_email_address(row["email"]):
+            return None, "Invalid email address"
+        if password_too_long(row["password"]):
+            return None, f"Password must be at most {MAX_PASSWORD_BYTES} bytes"
+
+        account = {
+            "email": row["email"],
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+            "password": row["password"],
+            "gender": row["gender"] or None,
+            "birth_date": None,
+            "role": role,
+        }
+        if role == "patient":
+            if not row["dob"]:
+                return None, "Date of birth is required"
+            try:
+                account["birth_date"] = datetime.strptime(row["dob"], "%m/%d/%Y").date()
+            except ValueError:
+                return None, "Invalid date format. Use MM/DD/YYYY"
+            account["user_type"] = patient_type.id
+        elif role == "clinician":
+            user_type = user_types.get(row["type"])
+            if not user_type or user_type.id == patient_type.id:
+                return None, "Invalid clinician type"
+            account["user_type"] = user_type.id
+        else:
+            return None, "Role must be patient or clinician"
+        return account, None
+
+    @staticmethod
+    def _registered(emails: List[str]) -> set:
+        if not emails:
+            return set()
+        return set(
+            db.session.scalars(
+                db.select(Person.identifier_value).where(Person.identifier_value.in_(emails))
+            )
+        )
+
+    @staticmethod
+    def _insert(accounts: List[dict], hashes: List[str]):
+        """Inserts the three rows of every account in one transaction."""
+        person_ids = db.session.scalars(
+            insert(Person).returning(Person.id, sort_by_parameter_order=True),
+            [
+                {
+                    "identifier_value": account["email"],
+                    "name_given": account["first_name"],
+                    "name_family": account["last_name"],
+                    "password_hash": hashed,
+                    "telecom_system": "email",
+                    "telecom_value": account["email"],
+                    "birth_date": account["birth_date"],
+                    "gender": account["gender"],
+                    "active": 0,
+                    "user_type": account["user_type"],
+                }
+                for account, hashed in zip(accounts, hashes)
+            ],
+        ).all()
+        auth_ids = db.session.scalars(
+            insert(Auth).returning(Auth.id, sort_by_parameter_order=True),
+            [
+                {"person_id": person_id, "password": hashed, "role": account["role"]}
+                for person_id, account, hashed in zip(person_ids, accounts, hashes)
+            ],
+        ).all()
+        db.session.execute(
+            insert(RegisterMeta),
+            [
+                {"person_id": person_id, "auth_id": auth_id}
+                for person_id, auth_id in zip(person_ids, auth_ids)
+            ],
+        )
+        db.session.commit()
+
+
+def _email(row) -> str:
+    return str(row.get("email") or "") if isinstance(row, dict) else ""
@@ -0,0 +1,60 @@
+import gzip
+import json
+from typing import Dict
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - br responses are not offered without it
+    brotli = None
+
+
+class SeriesPayload:
+    """
+    Serialized heart-rate series stored at ingest, so full-series responses
+    are sent without decoding and re-serializing the samples.
+
+    Each variant is the complete ``/heart-rate-data`` body,
+    ``{"data": <series>}``, in one content coding: plain JSON, gzip and,
+    when the brotli package is installed, Brotli. Requests only read them.
+    """
+
+    GZIP_LEVEL = 6
+    # Brotli's default quality of 11 costs seconds per series for a few
+    # percent over quality 5
+    BROTLI_QUALITY = 5
+
+    # In order of preference when a client accepts several
+    ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+    # Every variant stored per recording
+    VARIANTS = ("identity",) + ENCODINGS
+
+    @staticmethod
+    def build(data: dict) -> Dict[str, bytes]:
+        """Returns the stored variants of a series by content coding."""
+        body = SeriesPayload.envelope(SeriesPayload.dumps(data))
+        variants = {
+            "identity": body,
+            "gzip": gzip.compress(body, compresslevel=SeriesPayload.GZIP_LEVEL, mtime=0),
+        }
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=SeriesPayload.BROTLI_QUALITY)
+        return variants
+
+    @staticmethod
+    def series(body: bytes) -> bytes:
+        """The serialized series of an uncompressed ``{"data": <series>}`` body."""
+        return body[len(b'{"data":') : -1]
+
+    @staticmethod
+    def dumps(value) -> bytes:
+        """Compact, key-sorted JSON matching ``jsonify`` output."""
+        return json.dumps(value, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+    @staticmethod
+    def envelope(series: bytes, **fields) -> bytes:
+        """Splices serialized series JSON into ``{"data": <series>, **fields}``."""
+        parts = [b'{"data":', series]
+        for key in sorted(fields):
+            parts += [b",", SeriesPayload.dumps(key), b":", SeriesPayload.dumps(fields[key])]
+        parts.append(b"}")
+        return b"".join(parts)
@@ -0,0 +1,70 @@
+import json
+import struct
+import sys
+from array import array
+
+MEDIA_TYPE = "application/vnd.heartrate.series"
+
+MAGIC = b"HRS1"
+# magic, sample count, header length
+_HEADER = struct.Struct("<4sII")
+
+# Sample columns in wire order; time needs float64 once it is on an absolute
+# axis, heart rates fit float32
+COLUMNS = (("time", "d"), ("value", "f"), ("min", "f"), ("max", "f"))
+_TYPE_NAMES = {"d": "float64", "f": "float32"}
+_TYPECODES = {name: typecode for typecode, name in _TYPE_NAMES.items()}
+
+
+def _pad(size: int) -> bytes:
+    return b" " * (-size % 8)
+
+
+class SeriesWire:
+    """
+    Compact binary representation of series responses for chart clients.
+
+    Layout (little-endian): magic ``HRS1``, uint32 sample count and uint32
+    header length, then a JSON header holding every non-sample key plus
+    ``"columns": [[name, type], ...]``, then one typed array per column.
+    The header and every column are padded to 8 bytes so a browser can view
+    the columns in place with ``Float64Array`` / ``Float32Array``.
+    """
+
+    @staticmethod
+    def encode(data: dict, **fields) -> bytes:
+        columns = [(name, typecode) for name, typecode in COLUMNS if name in data]
+        count = len(data.get("time") or [])
+        header = {key: value for key, value in data.items() if key not in dict(columns)}
+        header.update(fields)
+        header["columns"] = [[name, _TYPE_NAMES[typecode]] for name, typecode in columns]
+
+        header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        header += _pad(_HEADER.size + len(header))
+        parts = [_HEADER.pack(MAGIC, count, len(header)), header]
+        for name, typecode in columns:
+            column = array(typecode, data[name] or [])
+            if len(column) != count:
+                raise ValueError(f"Column {name!r} does not match the time column")
+            if sys.byteorder != "little":
+                column.byteswap()
+            parts += [column.tobytes(), _pad(len(column) * column.itemsize)]
+        return b"".join(parts)
+
+    @staticmethod
+    def decode(blob: bytes) -> dict:
+        magic, count, header_len = _HEADER.unpack_from(blob)
+        if magic != MAGIC:
+            raise ValueError("Invalid heart rate series data")
+        offset = _HEADER.size + header_len
+        data = json.loads(blob[_HEADER.size : offset])
+
+        for name, type_name in data.pop("columns"):
+            column = array(_TYPECODES[type_name])
+            size = count * column.itemsize
+            column.frombytes(blob[offset : offset + size])
+            if sys.byteorder != "little":
+                column.byteswap()
+            data[name] = column.tolist()
+            offset += size + len(_pad(size))
+        return data
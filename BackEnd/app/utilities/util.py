@@ -1,6 +1,17 @@
+import hashlib
 import re
+from contextlib import closing
 from flask import json
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+from app.utilities.hr_stream import HeartRateStreamReader
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the pure Python path is used instead
+    np = None
+
+# Day-level keys copied into the extracted "metadata" dict
+HR_METADATA_KEYS = ("maxHeartRate", "minHeartRate", "restingHeartRate")
 
 
 class Util:
@@ -14,7 +25,18 @@ class Util:
         return data.strip()
 
     @staticmethod
-    def extract_heart_rate_values(file_path: str) -> dict:
+    def content_hash(file_obj, chunk_size: int = 1024 * 1024) -> str:
+        """SHA-256 hex digest of a binary file object from its current position."""
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def extract_heart_rate_values(file_path: str, stream: bool = False) -> dict:
+        if stream:
+            return Util.extract_heart_rate_values_stream(file_path)
+
         try:
             # Load and validate JSON data
             with open(file_path, "r", encoding="utf-8") as file:
@@ -60,3 +82,174 @@ class Util:
         except Exception as e:
             print(f"Error processing file {file_path}: {str(e)}")
             raise
+
+    @staticmethod
+    def extract_heart_rate_values_stream(file_path: str) -> dict:
+        """
+        Incremental variant of extract_heart_rate_values.
+
+        Samples are consumed chunk by chunk from the file instead of loading
+        the whole JSON document, so peak memory no longer depends on the size
+        of the export. The returned dict has the same shape.
+        """
+        try:
+            # Only the first day of the export is extracted
+            with closing(Util.iter_heart_rate_days(file_path)) as days:
+                day = next(days, None)
+            if day is None or day.pop("start_time") is None:
+                raise ValueError("No heart rate values found")
+            return day
+
+        except Exception as e:
+            print(f"Error processing file {file_path}: {str(e)}")
+            raise
+
+    @staticmethod
+    def extract_heart_rate_days(
+        file_path: str, stream: bool = False, vectorized: Optional[bool] = None
+    ) -> List[dict]:
+        """
+        Extracts every dated entry of an export, one dict per day.
+
+        Each dict has the shape returned by extract_heart_rate_values plus a
+        "start_time" key holding the epoch milliseconds of the first sample.
+        Days without any samples are skipped. Samples are converted with numpy
+        when it is installed, unless vectorized=False.
+        """
+        vectorized = np is not None if vectorized is None else vectorized
+        try:
+            if stream:
+                days = list(Util.iter_heart_rate_days(file_path, vectorized))
+            else:
+                with open(file_path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+
+                days = []
+                for entry in data:
+                    for measurement_date, day_data in entry.items():
+                        heart_rate_values = day_data.get("heartRateValues") or []
+                        day = {
+                            "date_of_measurement": measurement_date,
+                            "time": [],
+                            "value": [],
+                            "metadata": {
+                                key: day_data.get(key) for key in HR_METADATA_KEYS
+                            },
+                            "start_time": None,
+                        }
+                        if heart_rate_values:
+                            Util._fill_day(day, heart_rate_values, vectorized)
+                        days.append(day)
+
+            days = [day for day in days if day["start_time"] is not None]
+            if not days:
+                raise ValueError("No heart rate values found")
+            return days
+
+        except Exception as e:
+            print(f"Error processing file {file_path}: {str(e)}")
+            raise
+
+    @staticmethod
+    def iter_heart_rate_days(
+        file_path: str, vectorized: bool = False
+    ) -> Iterator[dict]:
+        """Streams the days of an export as they are parsed, one dict per day."""
+        day = None
+        columns = []
+        with open(file_path, "r", encoding="utf-8") as file:
+            for kind, date, payload in HeartRateStreamReader(file, columns=vectorized):
+                if day is None:
+                    day = {
+                        "date_of_measurement": date,
+                        "time": [],
+                        "value": [],
+                        "metadata": {key: None for key in HR_METADATA_KEYS},
+                        "start_time": None,
+                    }
+
+                if kind == "columns":
+                    columns.append(payload)
+                elif kind == "samples" and vectorized:
+                    columns.append(Util.sample_columns(payload))
+                elif kind == "samples":
+                    if day["start_time"] is None:
+                        day["start_time"] = payload[0][0]
+                    Util._append_samples(
+                        payload, day["start_time"], day["time"], day["value"]
+                    )
+                elif kind == "field":
+                    key, value = payload
+                    if key in day["metadata"]:
+                        day["metadata"][key] = value
+                elif kind == "end_day":
+                    if columns:
+                        Util._fill_day_from_columns(day, np.concatenate(columns))
+                        columns = []
+                    yield day
+                    day = None
+
+    @staticmethod
+    def _fill_day(day: dict, heart_rate_values: list, vectorized: bool):
+        if vectorized:
+            try:
+                columns = Util.sample_columns(heart_rate_values)
+            except (TypeError, ValueError):
+                columns = None  # Irregular samples, use the Python path
+            if columns is not None:
+                Util._fill_day_from_columns(day, columns)
+                return
+
+        day["start_time"] = heart_rate_values[0][0]
+        Util._append_samples(heart_rate_values, day["start_time"], day["time"], day["value"])
+
+    @staticmethod
+    def _fill_day_from_columns(day: dict, columns: "np.ndarray"):
+        times, values, day["start_time"] = Util.relative_columns(columns)
+        day["time"] = times.tolist()
+        day["value"] = values.tolist()
+        if values.dtype.kind == "f":
+            # Fractional values force a float array; whole ones stay ints as in JSON
+            day["value"] = [int(value) if value.is_integer() else value for value in day["value"]]
+
+    @staticmethod
+    def sample_columns(samples) -> "np.ndarray":
+        """(n, 2) float64 array of [timestamp, value] samples, NaN for missing values."""
+        return np.array(samples, dtype=np.float64)[:, :2]
+
+    @staticmethod
+    def relative_columns(columns: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray", int]:
+        """
+        Vectorized counterpart of _append_samples.
+
+        Returns relative minutes rounded to two decimals, the non-empty values
+        (int16 when they are all whole numbers) and the first timestamp.
+        """
+        timestamps = columns[:, 0].astype(np.int64)
+        start_time = int(timestamps[0])
+        present = ~np.isnan(columns[:, 1])
+
+        offsets = timestamps[present] - start_time
+        minutes = offsets / (1000 * 60)
+        times = np.round(minutes, 2)
+        # Offsets of 300 ms past a multiple of 600 ms sit half-way between two
+        # hundredths of a minute, where np.round's scaling can round the other
+        # way than round(); those few take round() itself
+        ties = np.flatnonzero(offsets % 600 == 300)
+        if ties.size:
+            times[ties] = [round(minute, 2) for minute in minutes[ties].tolist()]
+        values = columns[present, 1]
+        if np.array_equal(values, np.trunc(values)):
+            limit = np.iinfo(np.int16).max
+            dtype = np.int16 if not values.size or np.abs(values).max() <= limit else np.int64
+            values = values.astype(dtype)
+        return times, values, start_time
+
+    @staticmethod
+    def _append_samples(samples, start_time, times: list, values: list):
+        """Appends non-empty samples as minutes relative to start_time."""
+        for timestamp, value in samples:
+            if value is not None:
+                relative_time = (timestamp - start_time) / (1000 * 60)
+                times.append(round(relative_time, 2))
+                values.append(value)
@@ -0,0 +1,79 @@
+"""
+Benchmark of the heart-rate extraction paths.
+
+Generates a synthetic export and times Util.extract_heart_rate_days with the
+pure Python and the numpy implementations, for both the json.load and the
+streaming parser. Run from the BackEnd folder:
+
+    python -m benchmarks.bench_extract --samples 200000 --days 3
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utilities.util import Util  # noqa: E402
+
+
+def write_export(path, days, samples):
+    start = 1704067200000
+    export = []
+    for day in range(days):
+        day_start = start + day * 86400000
+        values = [
+            [day_start + i * 2000, None if random.random() < 0.02 else random.randint(45, 180)]
+            for i in range(samples)
+        ]
+        export.append(
+            {f"2024-01-{day + 1:02d}": {"heartRateValues": values, "restingHeartRate": 55}}
+        )
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(export, file)
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=200000, help="samples per day")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "export.json")
+        write_export(path, args.days, args.samples)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.days} day(s) x {args.samples} samples, {size_mb:.1f} MB")
+
+        for stream in (False, True):
+            python = best_of(
+                args.repeat,
+                lambda: Util.extract_heart_rate_days(path, stream=stream, vectorized=False),
+            )
+            numpy = best_of(
+                args.repeat,
+                lambda: Util.extract_heart_rate_days(path, stream=stream, vectorized=True),
+            )
+            mode = "stream" if stream else "json.load"
+            print(
+                f"{mode:>9}: python {python * 1000:7.1f} ms | "
+                f"numpy {numpy * 1000:7.1f} ms | speedup {python / numpy:4.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
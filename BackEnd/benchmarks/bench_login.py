@@ -0,0 +1,212 @@
+"""
+Benchmark of login throughput under concurrency.
+
+Starts gunicorn the way the Dockerfile does, with a temporary database, for
+every requested number of worker processes, registers synthetic patients
+and runs bursts of concurrent logins over HTTP. While each burst runs, a
+probe thread polls a data endpoint to show how much sign-ins slow other
+requests down. Rejected logins are those turned away once the hashing slots
+shared by all workers are taken. Run from the BackEnd folder:
+
+    python -m benchmarks.bench_login --users 64 --gunicorn-workers 1 2 --concurrency 1 4 16
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(base, method, path, body=None, token=None):
+    """Returns ``(status, json body or None)``."""
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = None if body is None else json.dumps(body).encode()
+    req = urllib.request.Request(base + path, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            if response.headers.get_content_type() != "application/json":
+                return response.status, None
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def start_server(folder, workers, args):
+    env = {
+        **os.environ,
+        "FLASK_ENV": "production",
+        "PROD_DB_NAME": os.path.join(folder, "bench.db"),
+        "UPLOAD_FOLDER": os.path.join(folder, "uploads"),
+        "PASSWORD_HASH_ROUNDS": str(args.rounds),
+        "PASSWORD_HASH_WORKERS": str(args.hash_workers),
+        "PASSWORD_HASH_MAX_PENDING": str(args.max_pending),
+    }
+    # Create the database once, so the workers don't race to initialize it
+    subprocess.run([sys.executable, "-c", "import app"], cwd=BACKEND, env=env, check=True)
+
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config=gunicorn.conf.py",
+            f"--bind=127.0.0.1:{port}",
+            f"--workers={workers}",
+            "--worker-class=gthread",
+            f"--threads={args.threads}",
+            "app:app",
+        ],
+        cwd=BACKEND,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            request(base, "GET", "/")
+            return server, base
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+def register(base, email):
+    request(
+        base,
+        "POST",
+        "/auth/register/patient",
+        {
+            "first_name": "bench",
+            "last_name": "patient",
+            "email": email,
+            "password": "benchpassword",
+            "gender": "female",
+            "dob": "01/02/1990",
+        },
+    )
+
+
+def login_and_logout(base, email):
+    started = time.perf_counter()
+    status, body = request(
+        base, "POST", "/auth/login", {"email": email, "password": "benchpassword"}
+    )
+    elapsed = time.perf_counter() - started
+    if status != 200:
+        return None
+    request(base, "POST", "/auth/logout", token=body["access_token"])
+    return elapsed
+
+
+def probe(base, token, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        request(base, "GET", "/patients/1", token=token)
+        latencies.append(time.perf_counter() - started)
+
+
+def burst(base, emails, concurrency, token):
+    stop, probe_latencies = threading.Event(), []
+    prober = threading.Thread(target=probe, args=(base, token, stop, probe_latencies))
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        timings = list(pool.map(lambda email: login_and_logout(base, email), emails))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+
+    ok = [timing for timing in timings if timing is not None]
+    return {
+        "logins_per_second": len(ok) / elapsed,
+        "login_p50_ms": statistics.median(ok) * 1000 if ok else float("nan"),
+        "rejected": len(timings) - len(ok),
+        "probe_p50_ms": statistics.median(probe_latencies) * 1000
+        if probe_latencies
+        else float("nan"),
+    }
+
+
+def run(workers, args):
+    with tempfile.TemporaryDirectory() as folder:
+        server, base = start_server(folder, workers, args)
+        try:
+            emails = [f"bench{i}@example.com" for i in range(args.users)]
+            for email in emails:
+                register(base, email)
+            request(
+                base,
+                "POST",
+                "/auth/register/clinician",
+                {
+                    "first_name": "bench",
+                    "last_name": "clinician",
+                    "email": "clinician@example.com",
+                    "password": "benchpassword",
+                    "type": "158965000",
+                },
+            )
+            _, body = request(
+                base,
+                "POST",
+                "/auth/login",
+                {"email": "clinician@example.com", "password": "benchpassword"},
+            )
+            for concurrency in args.concurrency:
+                result = burst(base, emails, concurrency, body["access_token"])
+                print(
+                    f"{workers:>2} workers x{concurrency:<3}: "
+                    f"{result['logins_per_second']:7.1f} logins/s | "
+                    f"login p50 {result['login_p50_ms']:7.1f} ms | "
+                    f"probe p50 {result['probe_p50_ms']:6.1f} ms | "
+                    f"rejected {result['rejected']}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--gunicorn-workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--threads", type=int, default=8, help="threads per worker")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--hash-workers", type=int, default=2, help="hashing processes per worker")
+    parser.add_argument("--max-pending", type=int, default=16, help="hashing slots in total")
+    args = parser.parse_args()
+
+    print(
+        f"{args.users} logins per burst, bcrypt cost {args.rounds}, "
+        f"{args.hash_workers} hashing processes per worker, {args.max_pending} slots"
+    )
+    for workers in args.gunicorn_workers:
+        run(workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# Loaded by gunicorn from the working directory, see the Dockerfile
+
+
+def post_worker_init(worker):
+    """Starts the worker's process pools before its request threads exist."""
+    from app import start_worker
+
+    start_worker(worker.wsgi)
@@ -0,0 +1,84 @@
+import json
+import time
+from datetime import timedelta
+import pytest
+from app import create_app
+from tests.test_files import _login_patient, _upload
+from tests.test_graph_data import _login_clinician
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    # Scans started over HTTP use the shared pool, created on first use
+    app.config["BATCH_PARSE_WORKERS"] = 2
+    with app.test_client() as client:
+        with app.app_context():
+            from app.init_db import InitDB
+
+            InitDB.flush_db()
+            InitDB.seed_db()
+        yield client
+
+
+def _anomalous_export():
+    start = 1704067200000
+    # 20 minutes at 120 bpm, a 90 minute gap, then 20 minutes at 45 bpm
+    samples = [[start + i * 60000, 120] for i in range(20)]
+    samples += [[start + (110 + i) * 60000, 45] for i in range(20)]
+    return json.dumps([{"2024-01-01": {"heartRateValues": samples}}]).encode()
+
+
+def _wait_for_scan(client, headers, response):
+    assert response.status_code == 202
+    scan_id = response.json["scan_id"]
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        scan = client.get(f"/anomaly-scans/{scan_id}", headers=headers).json
+        if scan["status"] != "running":
+            return scan
+        time.sleep(0.05)
+    raise AssertionError("anomaly scan did not finish")
+
+
+def test_anomaly_scan_and_flags(client):
+    headers = _login_patient(client)
+    file_id = _upload(client, headers, _anomalous_export()).json["file_id"]
+    clinician = _login_clinician(client)
+
+    assert client.post("/anomaly-scans", headers=headers).status_code == 403
+    scan = _wait_for_scan(client, clinician, client.post("/anomaly-scans", headers=clinician))
+    assert (scan["status"], scan["files"], scan["flags"]) == ("done", 1, 3)
+
+    flags = client.get("/anomaly-flags?patient_id=1", headers=clinician).json
+    assert flags["total"] == 3
+    by_kind = {flag["kind"]: flag for flag in flags["data"]}
+    assert by_kind["tachycardia"]["file_id"] == file_id
+    assert by_kind["tachycardia"]["peak_hr"] == 120
+    assert by_kind["tachycardia"]["start_at"] == 1704067200000
+    assert (by_kind["gap"]["start_minute"], by_kind["gap"]["end_minute"]) == (19.0, 110.0)
+    assert by_kind["bradycardia"]["end_minute"] == 129.0
+
+    # A rescan replaces the flags instead of adding to them
+    _wait_for_scan(client, clinician, client.post("/anomaly-scans", headers=clinician))
+    only_gaps = client.get("/anomaly-flags?kind=gap", headers=clinician).json
+    assert only_gaps["total"] == 1
+
+
+def test_anomaly_scan_runs_one_at_a_time(client):
+    from app.models import AnomalyScanRun, db
+    from app.utilities.anomaly import AnomalyScan
+
+    clinician = _login_clinician(client)
+    with client.application.app_context():
+        run_id = AnomalyScan.start_run(600)
+        assert AnomalyScan.start_run(600) is None
+    assert client.post("/anomaly-scans", headers=clinician).status_code == 409
+
+    with client.application.app_context():
+        # A run whose process died stops blocking new ones
+        db.session.get(AnomalyScanRun, run_id).heartbeat_at -= timedelta(hours=1)
+        db.session.commit()
+        assert AnomalyScan.start_run(600) not in (None, run_id)
+        assert db.session.get(AnomalyScanRun, run_id).status == "failed"
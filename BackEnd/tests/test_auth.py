@@ -1,5 +1,11 @@
 import pytest
-from app import create_app
+from flask_jwt_extended import decode_token
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Auth, Person
+from app.utilities.revocation import RevocationStore
+from app.utilities.roster import RosterImport
+from tests.test_files import _login_patient
 
 
 @pytest.fixture
@@ -171,3 +177,145 @@ def test_login_failure(client):
     )
     assert response.status_code == 401
     assert response.json == {"error": "Invalid password"}
+
+
+def test_logout_revokes_token(client):
+    headers = _login_patient(client)
+    assert client.get("/patients/1", headers=headers).status_code == 200
+
+    # Started before the logout, like a second worker process
+    other_worker = RevocationStore(sync_seconds=0)
+    with client.application.app_context():
+        assert not other_worker.is_revoked("unknown")
+
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    response = client.get("/patients/1", headers=headers)
+    assert response.status_code == 401
+    assert response.json == {"error": "Permission denied"}
+
+    with client.application.app_context():
+        jti = decode_token(headers["Authorization"].split()[1], allow_expired=True)["jti"]
+        assert other_worker.is_revoked(jti)
+        assert not other_worker.is_revoked("unknown")
+
+
+def test_revocations_after_purge_reach_other_workers(client):
+    from datetime import datetime, timedelta
+    from app.models import TokenBlocklist
+
+    expires = int((datetime.utcnow() + timedelta(hours=1)).timestamp())
+    with client.application.app_context():
+        worker, other_worker = RevocationStore(sync_seconds=0), RevocationStore(sync_seconds=0)
+        worker.revoke("first", expires)
+        assert other_worker.is_revoked("first")
+
+        # Purging empties the table; new ids must still be above those seen
+        TokenBlocklist.query.update({"expires_at": datetime.utcnow() - timedelta(minutes=1)})
+        db.session.commit()
+        worker.revoke("second", expires)
+        assert TokenBlocklist.query.count() == 1
+        assert other_worker.is_revoked("second")
+
+
+def test_current_user_resolved_once(client):
+    headers = _login_patient(client)
+    with client.application.app_context():
+        engine = db.engine
+
+    lookups = []
+
+    def record(conn, cursor, statement, *args):
+        if "WHERE person.identifier_value" in statement:
+            lookups.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for _ in range(3):
+            assert client.get("/patients/1", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert len(lookups) == 1
+
+    # Logging out changes the Person row, which evicts the cached user
+    cache = client.application.extensions["user_cache"]
+    assert "patient@example.com" in cache._entries
+    client.post("/auth/logout", headers=headers)
+    assert "patient@example.com" not in cache._entries
+
+
+def test_login_upgrades_password_hash(client):
+    headers = _login_patient(client)
+    client.post("/auth/logout", headers=headers)
+
+    client.application.extensions["password_hasher"].rounds = 5
+    response = client.post(
+        "/auth/login", json={"email": "patient@example.com", "password": "testpassword"}
+    )
+    assert response.status_code == 200
+    with client.application.app_context():
+        person = Person.query.filter_by(identifier_value="patient@example.com").first()
+        assert person.password_hash.startswith("$2b$05$")
+        assert Auth.query.filter_by(person_id=person.id).first().password == person.password_hash
+
+
+def test_register_rejects_passwords_bcrypt_truncates(client):
+    response = client.post(
+        "/auth/register/patient",
+        json={
+            "first_name": "test",
+            "last_name": "user",
+            "email": "long@example.com",
+            "password": "é" * 37,
+            "gender": "female",
+            "dob": "01/02/1990",
+        },
+    )
+    assert response.status_code == 400
+    assert response.json == {"error": "Password must be at most 72 bytes"}
+
+
+def test_import_roster(client, tmp_path):
+    client.application.config["PASSWORD_HASH_ROUNDS"] = 4
+    _login_patient(client, "existing@example.com")
+    roster = tmp_path / "roster.csv"
+    roster.write_text(
+        "first_name,last_name,email,password,gender,dob,role,type\n"
+        "Ada,One,ada@example.com,pw1,female,01/02/1990,,\n"
+        "Bob,Two,bob@example.com,pw2,male,1990-01-02,patient,\n"
+        "Cy,Three,cy@example.com,pw3,,,clinician,158965000\n"
+        "Di,Four,existing@example.com,pw4,female,01/02/1990,,\n"
+        "Ed,Five,ada@example.com,pw5,male,01/02/1990,,\n"
+        "Fe,Six,fe@example.com,pw6,,,clinician,116154003\n"
+        f"Hu,Seven,hu@example.com,{'x' * 73},female,01/02/1990,,\n"
+    )
+    result = client.application.test_cli_runner().invoke(
+        args=["import-roster", str(roster), "--batch-size", "2", "--workers", "1"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Line 3 (bob@example.com): Invalid date format. Use MM/DD/YYYY" in result.output
+    assert "Line 5 (existing@example.com): Email already registered" in result.output
+    assert "Line 6 (ada@example.com): Email listed more than once" in result.output
+    assert "Line 7 (fe@example.com): Invalid clinician type" in result.output
+    assert "Line 8 (hu@example.com): Password must be at most 72 bytes" in result.output
+    assert "Imported 2 accounts, 5 rows rejected." in result.output
+
+    with client.application.app_context():
+        cy = Person.query.filter_by(identifier_value="cy@example.com").first()
+        assert cy.user_type == 1
+        assert Auth.query.filter_by(person_id=cy.id).first().role == "clinician"
+    response = client.post("/auth/login", json={"email": "ada@example.com", "password": "pw1"})
+    assert response.status_code == 200
+    assert response.json["user_type"] == "patient"
+
+    ndjson = tmp_path / "roster.ndjson"
+    ndjson.write_text(
+        '{"first_name": "Gu", "last_name": "Seven", "email": "gu@example.com",'
+        ' "password": "pw7", "dob": "03/04/1985"}\n'
+        "not json\n"
+    )
+    with client.application.app_context():
+        result = RosterImport.run(str(ndjson), batch_size=10, workers=1, rounds=4)
+    assert result == {
+        "imported": 1,
+        "errors": [{"line": 2, "email": "", "error": "Invalid row"}],
+    }
@@ -0,0 +1,91 @@
+import json
+import pytest
+from app import create_app
+from tests.test_files import _export, _login_patient, _upload
+from tests.test_graph_data import _login_clinician
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["FILE_EVENT_HEARTBEAT_SECONDS"] = 0.2
+    with app.test_client() as client:
+        with app.app_context():
+            from app.init_db import InitDB
+
+            InitDB.flush_db()
+            InitDB.seed_db()
+        yield client
+
+
+def _next_event(chunks, attempts=50):
+    for _ in range(attempts):
+        chunk = next(chunks)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith("id:") and "\ndata: " in chunk:
+            fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+            return fields["event"], json.loads(fields["data"])
+    raise AssertionError("No event received")
+
+
+def test_file_events_stream(client):
+    client.application.extensions["file_events"]._poll_seconds = 0.05
+    patient = _login_patient(client)
+    clinician = _login_clinician(client)
+
+    response = client.get("/file-events?patient_id=1", headers=clinician, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    chunks = iter(response.response)
+
+    upload = _upload(client, patient, _export(["2024-01-01", "2024-01-02"])).json
+    kind, first = _next_event(chunks)
+    assert kind == "file_created"
+    assert first["patient_id"] == 1 and first["file_id"] == upload["file_ids"][0]
+    assert _next_event(chunks)[1]["measurement_date"] == "2024-01-02"
+    response.close()
+
+    # A reconnecting client replays what it missed, then keeps streaming
+    token = client.post("/file-events/token", headers=patient).json["token"]
+    replay = client.get(
+        f"/file-events?jwt={token}",
+        headers={"Last-Event-ID": str(first["id"])},
+        buffered=False,
+    )
+    assert _next_event(iter(replay.response))[1]["file_id"] == upload["file_ids"][1]
+    replay.close()
+
+
+def test_file_events_replay_catches_up_and_stream_ends(client):
+    client.application.config["FILE_EVENT_STREAM_SECONDS"] = 0.5
+    client.application.extensions["file_events"].BATCH_SIZE = 2
+    patient = _login_patient(client)
+    days = ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+    upload = _upload(client, patient, _export(days)).json
+
+    # More missed events than one replay batch, then the stream ends on time
+    response = client.get("/file-events", headers={**patient, "Last-Event-ID": "0"})
+    chunks = response.get_data(as_text=True).strip().split("\n\n")
+    events = [chunk for chunk in chunks if "\ndata: " in chunk]
+    assert [json.loads(event.split("data: ")[1])["file_id"] for event in events] == upload[
+        "file_ids"
+    ]
+    resume = [chunk for chunk in chunks if chunk.startswith("id:") and "\n" not in chunk]
+    assert resume == [f"id: {json.loads(events[-1].split('data: ')[1])['id']}"]
+
+
+def test_file_events_stream_tokens(client):
+    patient = _login_patient(client)
+    access_token = patient["Authorization"].split()[1]
+
+    # Access tokens stay out of URLs
+    assert client.get(f"/file-events?jwt={access_token}").status_code == 401
+
+    # Stream tokens open streams and nothing else
+    token = client.post("/file-events/token", headers=patient).json["token"]
+    stream = client.get(f"/file-events?jwt={token}", buffered=False)
+    assert stream.status_code == 200
+    stream.close()
+    scoped = {"Authorization": f"Bearer {token}"}
+    assert client.get("/list-files", headers=scoped).status_code == 401
+    assert client.post("/file-events/token", headers=scoped).status_code == 401
@@ -0,0 +1,330 @@
+import io
+import json
+import os
+import pytest
+import time
+import zipfile
+from app import create_app
+from app.routes.files import _save_batch_entry
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            from app.init_db import InitDB
+
+            InitDB.flush_db()
+            InitDB.seed_db()
+        yield client
+
+
+def _login_patient(client, email="patient@example.com"):
+    client.post(
+        "/auth/register/patient",
+        json={
+            "first_name": "test",
+            "last_name": "patient",
+            "email": email,
+            "password": "testpassword",
+            "gender": "male",
+            "dob": "01/02/1990",
+        },
+    )
+    response = client.post(
+        "/auth/login", json={"email": email, "password": "testpassword"}
+    )
+    return {"Authorization": f"Bearer {response.json['access_token']}"}
+
+
+def _export(dates, samples_per_day=30):
+    start = 1704067200000
+    return json.dumps(
+        [
+            {
+                date: {
+                    "heartRateValues": [
+                        [start + day * 86400000 + i * 120000, 60 + i]
+                        for i in range(samples_per_day)
+                    ],
+                    "restingHeartRate": 55 + day,
+                }
+            }
+            for day, date in enumerate(dates)
+        ]
+    ).encode()
+
+
+def _upload(client, headers, content, filename="export.json"):
+    return client.post(
+        "/upload",
+        data={"file": (io.BytesIO(content), filename)},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+
+
+def test_upload_stores_every_day(client):
+    headers = _login_patient(client)
+
+    response = _upload(client, headers, _export(["2024-01-01", "2024-01-02", "2024-01-03"]))
+
+    assert response.status_code == 200
+    assert len(response.json["file_ids"]) == 3
+    assert response.json["file_id"] == response.json["file_ids"][0]
+
+    listing = client.get("/list-files", headers=headers).json["files"]
+    assert [f["measurement_date"] for f in listing] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert len({f["upload_id"] for f in listing}) == 1
+
+    data = client.get(
+        f"/heart-rate-data?file_id={response.json['file_ids'][1]}", headers=headers
+    ).json["data"]
+    assert data["date_of_measurement"] == "2024-01-02"
+    assert data["time"][:3] == [0.0, 2.0, 4.0]
+    assert data["metadata"]["restingHeartRate"] == 56
+
+
+def test_async_upload_job(client):
+    headers = _login_patient(client)
+
+    response = client.post(
+        "/upload?mode=async",
+        data={"file": (io.BytesIO(_export(["2024-01-01", "2024-01-02"])), "export.json")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+
+    client.application.extensions["ingest_queue"].join()
+
+    job = client.get(f"/upload-jobs/{job_id}", headers=headers)
+    assert job.status_code == 200
+    assert job.json["status"] == "done"
+    assert len(job.json["file_ids"]) == 2
+
+
+def test_async_upload_job_reports_parse_errors(client):
+    headers = _login_patient(client)
+
+    response = client.post(
+        "/upload?mode=async",
+        data={"file": (io.BytesIO(b"not json"), "broken.json")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    client.application.extensions["ingest_queue"].join()
+
+    job = client.get(response.json["status_url"], headers=headers).json
+    assert job["status"] == "failed"
+    assert job["error"]
+
+
+def test_recover_requeues_jobs_left_by_a_dead_worker(client, tmp_path):
+    from datetime import datetime, timedelta
+    from app.models import db, Person, UploadJob
+
+    _login_patient(client)
+    app = client.application
+    path = tmp_path / "export.json"
+    path.write_bytes(_export(["2024-01-01"]))
+    with app.app_context():
+        patient = Person.query.filter_by(identifier_value="patient@example.com").first()
+        long_ago = datetime.now() - timedelta(hours=2)
+        for job_id, status, started_at in [
+            ("queued", "queued", None),
+            ("stale", "processing", long_ago),
+            ("running", "processing", datetime.now()),
+        ]:
+            db.session.add(
+                UploadJob(
+                    id=job_id,
+                    patient_id=patient.id,
+                    filename="export.json",
+                    file_type="json",
+                    file_path=str(path),
+                    status=status,
+                    started_at=started_at,
+                    created_at=long_ago,
+                )
+            )
+        db.session.commit()
+
+    queue = app.extensions["ingest_queue"]
+    assert queue.recover(stale_seconds=3600) == 2
+    queue.join()
+
+    with app.app_context():
+        statuses = {job.id: job.status for job in UploadJob.query.all()}
+    assert statuses["running"] == "processing"
+    assert statuses["queued"] in ("done", "failed")
+    assert statuses["stale"] in ("done", "failed")
+
+
+def test_upload_batch_files_and_zip(client):
+    headers = _login_patient(client)
+
+    response = client.post(
+        "/upload-batch",
+        data={
+            "files": [
+                (io.BytesIO(_export(["2024-01-01"])), "a.json"),
+                (io.BytesIO(_export(["2024-01-02", "2024-01-03"])), "b.json"),
+                (io.BytesIO(b"[]"), "empty.json"),
+                (io.BytesIO(b"text"), "notes.txt"),
+            ]
+        },
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [r["status"] for r in results] == ["stored", "stored", "failed", "failed"]
+    assert len(results[1]["file_ids"]) == 2
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("exports/c.json", _export(["2024-02-01"]))
+        zip_file.writestr("exports/d.json", _export(["2024-02-02"]))
+    archive.seek(0)
+
+    response = client.post(
+        "/upload-batch",
+        data={"files": (archive, "exports.zip")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    assert [r["filename"] for r in response.json["results"]] == ["c.json", "d.json"]
+
+    assert len(client.get("/list-files", headers=headers).json["files"]) == 5
+
+
+def test_upload_batch_rejects_large_zip_members(client, tmp_path):
+    headers = _login_patient(client)
+    small = _export(["2024-01-01"], samples_per_day=5)
+    client.application.config["BATCH_MAX_MEMBER_BYTES"] = len(small)
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("small.json", small)
+        zip_file.writestr("large.json", _export(["2024-01-02"], samples_per_day=50))
+
+    response = client.post(
+        "/upload-batch",
+        data={"files": (io.BytesIO(archive.getvalue()), "exports.zip")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    results = response.json["results"]
+    assert [r["status"] for r in results] == ["stored", "failed"]
+    assert results[1]["error"] == f"File is larger than {len(small)} bytes"
+
+    # Extraction stops at the limit whatever the header claims
+    archive.seek(0)
+    with zipfile.ZipFile(archive) as zip_file:
+        with pytest.raises(ValueError):
+            _save_batch_entry(zip_file, zip_file.getinfo("large.json"), tmp_path / "out", 100)
+        assert (tmp_path / "out").stat().st_size <= 100
+
+
+def test_duplicate_upload_reuses_stored_series(client):
+    headers = _login_patient(client)
+    content = _export(["2024-01-01", "2024-01-02"])
+
+    first = _upload(client, headers, content)
+    second = _upload(client, headers, content, filename="copy.json")
+
+    assert second.status_code == 200
+    assert second.json["duplicate"] is True
+    assert second.json["file_ids"] == first.json["file_ids"]
+
+    response = client.post(
+        "/upload-batch",
+        data={
+            "files": [
+                (io.BytesIO(content), "again.json"),
+                (io.BytesIO(_export(["2024-03-01"])), "new.json"),
+                (io.BytesIO(_export(["2024-03-01"])), "new-copy.json"),
+            ]
+        },
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    results = response.json["results"]
+    assert [r["status"] for r in results] == ["duplicate", "stored", "duplicate"]
+    assert results[0]["file_ids"] == first.json["file_ids"]
+    assert results[2]["file_ids"] == results[1]["file_ids"]
+
+    assert len(client.get("/list-files", headers=headers).json["files"]) == 3
+
+
+def test_chunked_upload_resume_and_finalize(client):
+    headers = _login_patient(client)
+    content = _export(["2024-01-01", "2024-01-02"], samples_per_day=200)
+
+    session = client.post(
+        "/upload-sessions",
+        json={"filename": "export.json", "total_size": len(content)},
+        headers=headers,
+    ).json
+    url = f"/upload-sessions/{session['session_id']}"
+
+    first = client.put(f"{url}?offset=0", data=content[:1000], headers=headers)
+    assert first.json["offset"] == 1000
+
+    # A chunk leaving a gap is rejected with the offset to resume from
+    gap = client.put(f"{url}?offset=2000", data=content[2000:], headers=headers)
+    assert gap.status_code == 409
+    assert gap.json["offset"] == 1000
+
+    second = client.put(f"{url}?offset=1000", data=content[1000:3000], headers=headers)
+    assert second.json["offset"] == 3000
+
+    # Resending an earlier chunk keeps the bytes acknowledged after it
+    resent = client.put(f"{url}?offset=0", data=content[:1000], headers=headers)
+    assert resent.json["offset"] == 3000
+
+    resumed = client.get(url, headers=headers).json["offset"]
+    assert resumed == 3000
+    client.put(f"{url}?offset={resumed}", data=content[resumed:], headers=headers)
+
+    response = client.post(f"{url}/finalize", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json["file_ids"]) == 2
+    assert client.get(url, headers=headers).status_code == 404
+
+
+def test_chunked_upload_failed_finalize_removes_the_file(client):
+    headers = _login_patient(client)
+    session = client.post(
+        "/upload-sessions", json={"filename": "broken.json"}, headers=headers
+    ).json
+    url = f"/upload-sessions/{session['session_id']}"
+    client.put(f"{url}?offset=0", data=b"not json", headers=headers)
+
+    response = client.post(f"{url}/finalize", headers=headers)
+    assert response.status_code == 500
+    folder = client.application.config["UPLOAD_FOLDER"]
+    assert not any(name.startswith(session["session_id"]) for name in os.listdir(folder))
+
+
+def test_idle_upload_sessions_expire(client):
+    from app.utilities.chunked_upload import ChunkedUploadStore
+
+    headers = _login_patient(client)
+    store = ChunkedUploadStore(client.application.config["UPLOAD_FOLDER"])
+    idle = client.post("/upload-sessions", json={"filename": "a.json"}, headers=headers).json
+    active = client.post("/upload-sessions", json={"filename": "b.json"}, headers=headers).json
+
+    long_ago = time.time() - 7200
+    for name in os.listdir(store.folder):
+        if name.startswith(idle["session_id"]):
+            os.utime(os.path.join(store.folder, name), (long_ago, long_ago))
+
+    assert store.expire(3600) == 1
+    assert client.get(f"/upload-sessions/{idle['session_id']}", headers=headers).status_code == 404
+    assert client.get(f"/upload-sessions/{active['session_id']}", headers=headers).status_code == 200
@@ -0,0 +1,337 @@
+import gzip
+import json
+import pytest
+from app import create_app
+from app.utilities.series_wire import MEDIA_TYPE, SeriesWire
+from tests.test_files import _export, _login_patient, _upload
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            from app.init_db import InitDB
+
+            InitDB.flush_db()
+            InitDB.seed_db()
+        yield client
+
+
+def _login_clinician(client, email="clinician@example.com"):
+    client.post(
+        "/auth/register/clinician",
+        json={
+            "first_name": "test",
+            "last_name": "clinician",
+            "email": email,
+            "password": "testpassword",
+            "type": "158965000",
+        },
+    )
+    response = client.post(
+        "/auth/login", json={"email": email, "password": "testpassword"}
+    )
+    return {"Authorization": f"Bearer {response.json['access_token']}"}
+
+
+def test_heart_rate_data_max_points(client):
+    headers = _login_patient(client)
+    file_id = _upload(client, headers, _export(["2024-01-01"], samples_per_day=700)).json["file_id"]
+
+    data = client.get(
+        f"/heart-rate-data?file_id={file_id}&max_points=100", headers=headers
+    ).json["data"]
+    assert len(data["time"]) == len(data["value"]) == 100
+    assert data["time"][0] == 0.0 and data["time"][-1] == 1398.0
+
+    response = client.get(f"/heart-rate-data?file_id={file_id}&max_points=1", headers=headers)
+    assert response.status_code == 400
+
+
+def test_heart_rate_data_zoom_levels(client):
+    headers = _login_patient(client)
+    # 700 samples two minutes apart: 1 s and 10 s buckets would not reduce it
+    file_id = _upload(client, headers, _export(["2024-01-01"], samples_per_day=700)).json["file_id"]
+
+    level = client.get(
+        f"/heart-rate-data?file_id={file_id}&resolution=10min&start=60&end=120",
+        headers=headers,
+    ).json["data"]
+    assert level["resolution"] == 600
+    assert level["time"] == [60.0, 70.0, 80.0, 90.0, 100.0, 110.0, 120.0]
+    assert level["min"][0] == 60 + 30 and level["max"][0] == 60 + 34
+
+    auto = client.get(
+        f"/heart-rate-data?file_id={file_id}&resolution=auto&max_points=200",
+        headers=headers,
+    ).json["data"]
+    assert auto["resolution"] == 600
+
+    raw = client.get(
+        f"/heart-rate-data?file_id={file_id}&resolution=auto", headers=headers
+    ).json["data"]
+    assert "resolution" not in raw and len(raw["time"]) == 700
+
+    missing = client.get(f"/heart-rate-data?file_id={file_id}&resolution=1s", headers=headers)
+    assert missing.status_code == 400
+
+
+def test_heart_rate_data_time_window(client):
+    headers = _login_patient(client)
+    file_id = _upload(client, headers, _export(["2024-01-01"], samples_per_day=700)).json["file_id"]
+
+    relative = client.get(
+        f"/heart-rate-data?file_id={file_id}&start=60&end=70", headers=headers
+    ).json["data"]
+    assert relative["time"] == [60.0, 62.0, 64.0, 66.0, 68.0, 70.0]
+    assert relative["value"] == [90, 91, 92, 93, 94, 95]
+
+    # The export starts at 2024-01-01T00:00:00Z
+    for start, end in (
+        (1704067200000 + 60 * 60000, 1704067200000 + 70 * 60000),
+        ("2024-01-01T01:00:00Z", "2024-01-01T01:10:00"),
+    ):
+        absolute = client.get(
+            "/heart-rate-data",
+            query_string={"file_id": file_id, "start": start, "end": end},
+            headers=headers,
+        ).json["data"]
+        assert absolute["time"] == relative["time"]
+
+    # Epoch seconds would otherwise be read as minutes and match nothing
+    for query in (
+        "start=70&end=60",
+        "start=yesterday",
+        "start=2024-01-01T02:00:00&end=60",
+        "start=1704070800&end=1704071400",
+    ):
+        response = client.get(f"/heart-rate-data?file_id={file_id}&{query}", headers=headers)
+        assert response.status_code == 400
+
+
+def test_heart_rate_data_conditional_get(client):
+    headers = _login_patient(client)
+    file_id = _upload(client, headers, _export(["2024-01-01"])).json["file_id"]
+
+    first = client.get(f"/heart-rate-data?file_id={file_id}", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert "immutable" in first.headers["Cache-Control"]
+
+    cached = client.get(
+        f"/heart-rate-data?file_id={file_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag and cached.data == b""
+
+    other = client.get(
+        f"/heart-rate-data?file_id={file_id}&max_points=10",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+    missing = client.get("/heart-rate-data?file_id=999", headers=headers)
+    assert missing.status_code == 404
+
+
+def test_heart_rate_data_stored_payloads(client):
+    headers = _login_patient(client)
+    upload = _upload(client, headers, _export(["2024-01-01"])).json
+    file_id = upload["file_id"]
+
+    plain = client.get(f"/heart-rate-data?file_id={file_id}", headers=headers)
+    assert "Content-Encoding" not in plain.headers
+    data = plain.json["data"]
+    assert data["time"][:2] == [0.0, 2.0] and data["value"][:2] == [60, 61]
+    assert data["metadata"]["restingHeartRate"] == 55
+
+    compressed = client.get(
+        f"/heart-rate-data?file_id={file_id}",
+        headers={**headers, "Accept-Encoding": "gzip, deflate"},
+    )
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    assert json.loads(gzip.decompress(compressed.data)) == plain.json
+
+    clinician = _login_clinician(client)
+    response = client.post(
+        "/heart-rate-data-clinician",
+        json={"file_id": file_id, "patient_id": 1},
+        headers=clinician,
+    )
+    assert response.status_code == 200
+    assert response.json == {"data": data, "patient_name": "test patient"}
+
+    with client.application.app_context():
+        from app.models import HeartRatePayload
+
+        from app.utilities.series_payload import SeriesPayload
+
+        stored = HeartRatePayload.query.filter_by(file_id=file_id).all()
+        assert sorted(payload.encoding for payload in stored) == sorted(SeriesPayload.VARIANTS)
+
+
+def test_build_hr_payloads_fills_missing_variants(client):
+    headers = _login_patient(client)
+    file_id = _upload(client, headers, _export(["2024-01-01"])).json["file_id"]
+    url = f"/heart-rate-data?file_id={file_id}"
+    expected = client.get(url, headers=headers).json
+
+    with client.application.app_context():
+        from app.init_db import InitDB
+        from app.models import HeartRatePayload, db
+
+        HeartRatePayload.query.filter_by(file_id=file_id, encoding="identity").delete()
+        db.session.commit()
+
+    # Served from the samples until the variant is rebuilt, without writing it
+    assert client.get(url, headers=headers).json == expected
+    with client.application.app_context():
+        assert not HeartRatePayload.query.filter_by(file_id=file_id, encoding="identity").count()
+        assert InitDB.build_hr_payloads() == 1
+        assert InitDB.build_hr_payloads() == 0
+    assert client.get(url, headers=headers).json == expected
+
+
+def test_heart_rate_data_brotli_payload(client):
+    brotli = pytest.importorskip("brotli")
+    headers = _login_patient(client)
+    file_id = _upload(client, headers, _export(["2024-01-01"])).json["file_id"]
+    plain = client.get(f"/heart-rate-data?file_id={file_id}", headers=headers)
+
+    response = client.get(
+        f"/heart-rate-data?file_id={file_id}",
+        headers={**headers, "Accept-Encoding": "gzip, br"},
+    )
+    assert response.headers["Content-Encoding"] == "br"
+    assert json.loads(brotli.decompress(response.data)) == plain.json
+
+
+def test_heart_rate_data_binary_format(client):
+    headers = _login_patient(client)
+    file_id = _upload(client, headers, _export(["2024-01-01"])).json["file_id"]
+    data = client.get(f"/heart-rate-data?file_id={file_id}", headers=headers).json["data"]
+
+    response = client.get(
+        f"/heart-rate-data?file_id={file_id}", headers={**headers, "Accept": MEDIA_TYPE}
+    )
+    assert response.mimetype == MEDIA_TYPE
+    assert "Accept" in response.headers["Vary"]
+    assert SeriesWire.decode(response.data) == data
+
+    window = client.get(
+        f"/heart-rate-data?file_id={file_id}&start=10&end=14",
+        headers={**headers, "Accept": f"{MEDIA_TYPE}, application/json;q=0.5"},
+    )
+    assert SeriesWire.decode(window.data)["value"] == [65, 66, 67]
+
+    clinician = client.post(
+        "/heart-rate-data-clinician",
+        json={"file_id": file_id, "patient_id": 1},
+        headers={**_login_clinician(client), "Accept": MEDIA_TYPE},
+    )
+    assert SeriesWire.decode(clinician.data) == {**data, "patient_name": "test patient"}
+
+
+def test_heart_rate_data_clinician_merged(client):
+    headers = _login_patient(client)
+    upload = _upload(
+        client, headers, _export(["2024-01-01", "2024-01-02", "2024-01-03"])
+    ).json
+    clinician = _login_clinician(client)
+
+    by_ids = client.post(
+        "/heart-rate-data-clinician/merged",
+        json={"file_ids": list(reversed(upload["file_ids"]))},
+        headers=clinician,
+    )
+    assert by_ids.status_code == 200
+    data = by_ids.json["data"]
+    assert by_ids.json["patient_name"] == "test patient"
+    assert len(data["time"]) == 90 and data["time"] == sorted(data["time"])
+    assert data["time"][0] == 1704067200000 and data["time"][30] == 1704067200000 + 86400000
+    assert [file["file_id"] for file in data["files"]] == upload["file_ids"]
+
+    by_range = client.post(
+        "/heart-rate-data-clinician/merged",
+        json={
+            "patient_id": 1,
+            "start_date": "2024-01-02",
+            "end_date": "2024-01-03",
+            "max_points": 20,
+        },
+        headers=clinician,
+    ).json["data"]
+    assert len(by_range["time"]) == 20
+    assert by_range["time"][0] == 1704067200000 + 86400000
+    assert by_range["time"][-1] == data["time"][-1]
+
+    missing = client.post(
+        "/heart-rate-data-clinician/merged",
+        json={"file_ids": upload["file_ids"] + [999]},
+        headers=clinician,
+    )
+    assert missing.status_code == 404
+
+    denied = client.post(
+        "/heart-rate-data-clinician/merged",
+        json={"file_ids": upload["file_ids"]},
+        headers=headers,
+    )
+    assert denied.status_code == 403
+
+
+def test_heart_rate_metrics(client):
+    headers = _login_patient(client)
+    file_id = _upload(client, headers, _export(["2024-01-01"])).json["file_id"]
+
+    response = client.get(f"/heart-rate-metrics?file_id={file_id}", headers=headers)
+    assert response.status_code == 200
+    metrics = response.json["metrics"]
+    # 30 samples two minutes apart rising from 60 to 89 bpm
+    assert metrics["sample_count"] == 30
+    assert metrics["min_hr"] == 60 and metrics["max_hr"] == 89 and metrics["mean_hr"] == 74.5
+    assert metrics["rmssd"] == 1.0
+    assert metrics["zone_minutes"]["60_to_99"] == 58.0
+    assert metrics["resting_hr_reported"] == 55
+    assert metrics["rolling_mean"]["time"][:2] == [8.0, 18.0]
+
+    clinician = client.get(
+        f"/heart-rate-metrics?file_id={file_id}", headers=_login_clinician(client)
+    )
+    assert clinician.json == response.json
+
+    other = _login_patient(client, "other@example.com")
+    assert client.get(f"/heart-rate-metrics?file_id={file_id}", headers=other).status_code == 404
+
+
+def test_heart_rate_trend(client):
+    headers = _login_patient(client)
+    _upload(client, headers, _export(["2024-01-01", "2024-01-02"]))
+    # A second recording of 2024-01-02 folds into the same day
+    later = _export(["2023-12-31", "2024-01-02"], samples_per_day=10)
+    _upload(client, headers, later.replace(b'"restingHeartRate": 56', b'"restingHeartRate": 52'))
+
+    days = client.get("/heart-rate-trend", headers=headers).json["days"][1:]
+    assert [day["date"] for day in days] == ["2024-01-01", "2024-01-02"]
+    assert days[0] == {
+        "date": "2024-01-01",
+        "min_hr": 60,
+        "max_hr": 89,
+        "mean_hr": 74.5,
+        "resting_hr": 55,
+        "sample_count": 30,
+    }
+    assert days[1]["sample_count"] == 40 and days[1]["resting_hr"] == 52
+    assert days[1]["mean_hr"] == round((30 * 74.5 + 10 * 64.5) / 40, 1)
+
+    clinician = _login_clinician(client)
+    ranged = client.get(
+        "/heart-rate-trend?patient_id=1&start_date=2024-01-02", headers=clinician
+    ).json["days"]
+    assert ranged == days[1:]
+    assert client.get("/heart-rate-trend", headers=clinician).status_code == 400
@@ -0,0 +1,139 @@
+import struct
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app import create_app
+from app.utilities.live_stream import MEDIA_TYPE
+from tests.test_files import _login_patient
+from tests.test_graph_data import _login_clinician
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            from app.init_db import InitDB
+
+            InitDB.flush_db()
+            InitDB.seed_db()
+        yield client
+
+
+START = 1704153000000  # 2024-01-01T23:50:00Z
+
+
+def test_live_session_streams_into_recordings(client):
+    headers = _login_patient(client)
+    session = client.post("/live-sessions", headers=headers).json
+    samples_url = f"/live-sessions/{session['session_id']}/samples"
+
+    ndjson = "\n".join(
+        f"[{START + i * 60000}, {70 + i}]" for i in range(5)
+    ) + '\n{"timestamp": %d, "value": null}\n' % (START + 5 * 60000)
+    first = client.post(
+        f"{samples_url}?seq=0",
+        data=ndjson,
+        content_type="application/x-ndjson",
+        headers=headers,
+    )
+    assert first.status_code == 201 and first.json["accepted"] == 5
+
+    retry = client.post(
+        f"{samples_url}?seq=0",
+        data=ndjson,
+        content_type="application/x-ndjson",
+        headers=headers,
+    )
+    assert retry.status_code == 200 and retry.json["duplicate"]
+
+    # Crosses midnight UTC
+    binary = b"".join(
+        struct.pack("<qf", START + i * 60000, 80.5 + i) for i in range(5, 15)
+    )
+    second = client.post(samples_url, data=binary, content_type=MEDIA_TYPE, headers=headers)
+    assert second.status_code == 201 and second.json["sample_count"] == 15
+
+    bad = client.post(samples_url, data=b"[1, ", content_type="application/x-ndjson", headers=headers)
+    assert bad.status_code == 400
+
+    clinician = _login_clinician(client)
+    newer = client.get(
+        f"{samples_url}?after={START + 12 * 60000}", headers=clinician
+    ).json
+    assert newer["time"] == [START + 13 * 60000, START + 14 * 60000]
+    assert newer["value"] == [93.5, 94.5]
+
+    closed = client.post(f"/live-sessions/{session['session_id']}/close", headers=headers)
+    assert closed.status_code == 200 and closed.json["status"] == "closed"
+    assert len(closed.json["file_ids"]) == 2
+
+    files = client.get("/list-files", headers=headers).json
+    dates = sorted(
+        (entry["measurement_date"], entry["upload_id"]) for entry in files["files"]
+    )
+    assert [date for date, _ in dates] == ["2024-01-01", "2024-01-02"]
+
+    data = client.get(
+        f"/heart-rate-data?file_id={closed.json['file_ids'][0]}", headers=headers
+    ).json["data"]
+    assert data["time"] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+    assert data["value"][:5] == [70, 71, 72, 73, 74]
+
+    late = client.post(samples_url, data=ndjson, content_type="application/x-ndjson", headers=headers)
+    assert late.status_code == 409
+
+
+def test_live_concurrent_appends(client):
+    headers = _login_patient(client)
+    session_id = client.post("/live-sessions", headers=headers).json["session_id"]
+    app = client.application
+
+    def send(i):
+        body = struct.pack("<qf", START + i * 1000, 60 + i) * 3
+        with app.test_client() as device:
+            return device.post(
+                f"/live-sessions/{session_id}/samples",
+                data=body,
+                content_type=MEDIA_TYPE,
+                headers=headers,
+            )
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(send, range(40)))
+    assert {response.status_code for response in responses} == {201}
+    assert sorted(response.json["seq"] for response in responses) == list(range(40))
+
+    session = client.get(f"/live-sessions/{session_id}", headers=headers).json
+    assert session["sample_count"] == 120
+
+
+def test_live_close_races_appends_and_closes(client):
+    headers = _login_patient(client)
+    session_id = client.post("/live-sessions", headers=headers).json["session_id"]
+    url = f"/live-sessions/{session_id}"
+    app = client.application
+
+    def send(i):
+        with app.test_client() as device:
+            if i % 10 == 5:
+                return "close", device.post(f"{url}/close", headers=headers)
+            body = struct.pack("<qf", START + i * 1000, 60 + i % 50)
+            return "append", device.post(
+                f"{url}/samples", data=body, content_type=MEDIA_TYPE, headers=headers
+            )
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(send, range(40)))
+    closes = [response for kind, response in results if kind == "close"]
+    appends = [response for kind, response in results if kind == "append"]
+    assert sorted(response.status_code for response in closes) == [200, 409, 409, 409]
+    assert {response.status_code for response in appends} <= {201, 409}
+
+    # Every acknowledged batch ended up in the recording, exactly once
+    closed = next(response for response in closes if response.status_code == 200)
+    stored = 0
+    for file_id in closed.json["file_ids"]:
+        data = client.get(f"/heart-rate-data?file_id={file_id}", headers=headers).json["data"]
+        stored += len(data["value"])
+    assert stored == sum(response.status_code == 201 for response in appends)
@@ -0,0 +1,108 @@
+import re
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from tests.test_files import _export, _login_patient, _upload
+from tests.test_graph_data import _login_clinician
+
+# Tables that grow with the number of users and recordings
+HOT_TABLES = ("file_meta", "person", "auth", "daily_rollup", "heart_rate_metrics")
+FULL_SCAN = re.compile(r"\bSCAN (%s)\b" % "|".join(HOT_TABLES))
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            from app.init_db import InitDB
+
+            InitDB.flush_db()
+            InitDB.seed_db()
+        yield client
+
+
+def _plans(client, request):
+    """Query plans of the SELECTs on hot tables that ``request()`` runs."""
+    with client.application.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and any(
+            table in statement for table in HOT_TABLES
+        ):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    with engine.connect() as connection:
+        return [
+            (
+                statement,
+                [
+                    row[-1]
+                    for row in connection.exec_driver_sql(
+                        f"EXPLAIN QUERY PLAN {statement}", parameters
+                    )
+                ],
+            )
+            for statement, parameters in statements
+        ]
+
+
+def test_routes_use_indexes(client):
+    patient = _login_patient(client)
+    upload = _upload(client, patient, _export(["2024-01-01", "2024-01-02"])).json
+    file_id = upload["file_ids"][0]
+    clinician = _login_clinician(client)
+
+    requests = {
+        "list-files": lambda: client.get("/list-files", headers=patient),
+        "list-patient-files": lambda: client.get("/list-patient-files/1", headers=clinician),
+        "patients": lambda: client.get("/patients", headers=clinician),
+        "heart-rate-data": lambda: client.get(
+            f"/heart-rate-data?file_id={file_id}", headers=patient
+        ),
+        "heart-rate-data-clinician": lambda: client.post(
+            "/heart-rate-data-clinician",
+            json={"patient_id": 1, "file_id": file_id},
+            headers=clinician,
+        ),
+        "merged": lambda: client.post(
+            "/heart-rate-data-clinician/merged",
+            json={"patient_id": 1, "start_date": "2024-01-01", "end_date": "2024-01-02"},
+            headers=clinician,
+        ),
+        "heart-rate-metrics": lambda: client.get(
+            f"/heart-rate-metrics?file_id={file_id}", headers=patient
+        ),
+        "heart-rate-trend": lambda: client.get("/heart-rate-trend", headers=patient),
+    }
+    for name, request in requests.items():
+        plans = _plans(client, request)
+        assert plans, name
+        for statement, plan in plans:
+            scans = [step for step in plan if FULL_SCAN.search(step)]
+            assert not scans, f"{name}: {scans} in {statement}"
+
+
+def test_hot_query_indexes(client):
+    with client.application.app_context():
+        plan = [
+            row[-1]
+            for row in db.session.execute(
+                db.text(
+                    "EXPLAIN QUERY PLAN SELECT id FROM file_meta "
+                    "WHERE patient_id = 1 ORDER BY created_at"
+                )
+            )
+        ]
+    assert any("ix_file_meta_patient_created" in step for step in plan)
+    assert not any("TEMP B-TREE" in step for step in plan)
@@ -1,5 +1,21 @@
+import io
+import json
+import os
+import random
 import pytest
 from app.utilities.util import Util
+from app.utilities.hr_stream import HeartRateStreamReader
+from app.utilities import hr_codec
+from app.utilities.hr_codec import HRCodec
+from app.utilities.downsample import Downsample
+from app.utilities import anomaly, metrics
+from app.utilities.anomaly import AnomalyScan
+from app.utilities.ingest import Ingest
+from app.utilities.metrics import Metrics
+from app.utilities.pyramid import Pyramid
+from app.utilities.series_wire import SeriesWire
+from app.utilities.passwords import PasswordHasher, PasswordHasherBusy, hash_password
+from werkzeug.security import generate_password_hash
 from app import create_app
 
 
@@ -22,3 +38,364 @@ def test_email_regex():
     assert not Util.check_email_address("test")
     assert not Util.check_email_address("test@.com")
     assert Util.check_email_address("test@user.sk")
+
+
+def _write_export(tmp_path, days):
+    export = [
+        {
+            date: {
+                "maxHeartRate": 120,
+                "heartRateValues": samples,
+                "minHeartRate": 50,
+                "restingHeartRate": 58,
+            }
+        }
+        for date, samples in days
+    ]
+    file_path = tmp_path / "export.json"
+    file_path.write_text(json.dumps(export, indent=1))
+    return str(file_path)
+
+
+def test_extract_heart_rate_values_stream_matches_full_parse(tmp_path):
+    start = 1700000000000
+    samples = [[start + i * 120000, None if i % 7 == 0 else 60 + i % 40] for i in range(500)]
+    file_path = _write_export(tmp_path, [("2024-01-01", samples), ("2024-01-02", samples)])
+
+    expected = Util.extract_heart_rate_values(file_path)
+    assert Util.extract_heart_rate_values(file_path, stream=True) == expected
+    assert expected["metadata"]["restingHeartRate"] == 58
+
+
+def test_heart_rate_stream_reader_small_chunks():
+    text = '[{"2024-01-01": {"heartRateValues": [[1000, 61], [61000 , null],\n [121000, 62.5]], "x": [1, {"y": true}]}}]'
+
+    events = list(HeartRateStreamReader(io.StringIO(text), chunk_size=3))
+
+    samples = [sample for kind, _, batch in events if kind == "samples" for sample in batch]
+    assert samples == [(1000, 61), (61000, None), (121000, 62.5)]
+    assert ("field", "2024-01-01", ("x", [1, {"y": True}])) in events
+    assert events[-1] == ("end_day", "2024-01-01", None)
+
+
+def test_hr_codec_round_trip():
+    data = {
+        "date_of_measurement": "2024-01-01",
+        "time": [0.0, 2.0, 4.07, 6.13, 1439.98],
+        "value": [61, 250, 72, 300, 58],
+        "metadata": {"maxHeartRate": 300, "minHeartRate": 58, "restingHeartRate": None},
+    }
+
+    for compress in (True, False):
+        blob = HRCodec.encode(data, compress=compress)
+        assert HRCodec.is_encoded(blob)
+        assert HRCodec.decode(blob) == data
+
+
+def test_hr_codec_unrounded_values_and_legacy_json():
+    data = {"time": [0.001, 0.5], "value": [60.5, 61], "metadata": {}}
+    assert HRCodec.decode(HRCodec.encode(data)) == data
+    assert HRCodec.decode(json.dumps(data)) == data
+
+
+def test_migrate_hr_data_skips_empty_rows():
+    from app import db
+    from app.init_db import InitDB
+
+    data = {"time": [0.0, 1.0], "value": [60, 61], "metadata": {}}
+    with create_app().app_context():
+        InitDB.flush_db()
+        InitDB.seed_db()
+        db.session.execute(
+            db.text("INSERT INTO file_meta (id, patient_id, hr_data) VALUES (1, 1, NULL), (2, 1, :data)"),
+            {"data": json.dumps(data)},
+        )
+        db.session.commit()
+        assert InitDB.migrate_hr_data() == 1
+        assert InitDB.migrate_hr_data() == 0
+
+
+def test_migrate_hr_data_backfills_dates_of_legacy_rows():
+    from app import db
+    from app.init_db import InitDB
+    from app.models import DailyRollup, FileMeta
+
+    legacy = {
+        "date_of_measurement": "2024-01-01",
+        "start_time": 1704067200000,
+        "time": [0.0, 1.0],
+        "value": [60, 62],
+        "metadata": {},
+    }
+    undated = {"time": [0.0], "value": [70], "metadata": {}}
+    with create_app().app_context():
+        InitDB.flush_db()
+        InitDB.seed_db()
+        db.session.execute(
+            db.text("INSERT INTO file_meta (id, patient_id, hr_data) VALUES (1, 1, :a), (2, 1, :b)"),
+            {"a": json.dumps(legacy), "b": json.dumps(undated)},
+        )
+        db.session.commit()
+
+        assert InitDB.migrate_hr_data() == 2
+        record = db.session.get(FileMeta, 1)
+        assert record.measurement_date.isoformat() == "2024-01-01"
+        assert record.start_time == 1704067200000
+
+        # The undated row has nothing to fold and is not counted
+        assert InitDB.rebuild_daily_rollups() == 1
+        rollup = DailyRollup.query.one()
+        assert (rollup.date.isoformat(), rollup.sample_count) == ("2024-01-01", 2)
+
+
+def test_hr_codec_decode_window(monkeypatch):
+    monkeypatch.setattr(hr_codec, "BLOCK_SIZE", 16)
+    data = {
+        "date_of_measurement": "2024-01-01",
+        "time": [i * 0.5 for i in range(100)],
+        "value": [60 + i for i in range(100)],
+        "metadata": {},
+    }
+    blob = HRCodec.encode(data)
+
+    assert HRCodec.decode(blob) == data
+    window = HRCodec.decode_window(blob, 10, 20.2)
+    assert window["time"] == [i * 0.5 for i in range(20, 41)]
+    assert window["value"] == [60 + i for i in range(20, 41)]
+    assert HRCodec.decode_window(blob, None, 0.5)["value"] == [60, 61]
+    assert HRCodec.decode_window(blob, 49.5, None)["value"] == [159]
+    assert HRCodec.decode_window(blob, 60, 70)["time"] == []
+
+    unsorted = {"time": [3.0, 1.0, 2.0], "value": [63, 61, 62]}
+    assert HRCodec.decode_window(HRCodec.encode(unsorted), 1.5, 3) == {
+        "time": [3.0, 2.0],
+        "value": [63, 62],
+    }
+
+
+def test_hr_codec_decodes_version_1():
+    data = {
+        "date_of_measurement": "2024-01-01",
+        "time": [0.0, 2.0, 4.07],
+        "value": [61, 250, 72],
+        "metadata": {"restingHeartRate": 58},
+    }
+    compressed = bytes.fromhex(
+        "4852430101789c7367606060066227a76aa594c492d4f8fcb4f8dcd4c4e2d2a2d4dcd4bc12"
+        "252b25230323135d03432052d251ca4d2d49042a4b54b2aa562a4a2d2ec9cc4bf7484d2c2a"
+        "09026a55b232b5a8ad653871def6970700325e1ba4"
+    )
+    raw = bytes.fromhex(
+        "4852430100470000000300000042427b22646174655f6f665f6d6561737572656d656e74"
+        "223a22323032342d30312d3031222c226d65746164617461223a7b2272657374696e6748"
+        "6561727452617465223a35387d7d00c8cf3dfa48"
+    )
+
+    assert HRCodec.decode(compressed) == data
+    assert HRCodec.decode(raw) == data
+    assert HRCodec.decode_window(compressed, 1, 3)["value"] == [250]
+
+
+def test_extract_heart_rate_days(tmp_path):
+    start = 1700000000000
+    samples = [[start + i * 120000, 70] for i in range(10)]
+    file_path = _write_export(
+        tmp_path, [("2024-01-01", samples), ("2024-01-02", []), ("2024-01-03", samples)]
+    )
+
+    days = Util.extract_heart_rate_days(file_path)
+    assert Util.extract_heart_rate_days(file_path, stream=True) == days
+    assert [day["date_of_measurement"] for day in days] == ["2024-01-01", "2024-01-03"]
+    assert days[0]["start_time"] == start
+
+
+def test_vectorized_extraction_matches_python(tmp_path):
+    start = 1700000000000
+    samples = [[start + i * 1000, None if i % 5 == 0 else 40 + i % 120] for i in range(5000)]
+    file_path = _write_export(tmp_path, [("2024-01-01", samples), ("2024-01-02", samples)])
+
+    expected = Util.extract_heart_rate_days(file_path, vectorized=False)
+    for stream in (False, True):
+        assert Util.extract_heart_rate_days(file_path, stream=stream, vectorized=True) == expected
+
+
+def test_vectorized_extraction_keeps_whole_values_as_ints(tmp_path):
+    start = 1700000000000
+    samples = [[start, 60], [start + 1000, 61.5], [start + 2000, None], [start + 3000, 62]]
+    file_path = _write_export(tmp_path, [("2024-01-01", samples)])
+
+    expected = Util.extract_heart_rate_days(file_path, vectorized=False)
+    for stream in (False, True):
+        days = Util.extract_heart_rate_days(file_path, stream=stream, vectorized=True)
+        assert days == expected
+        assert [type(value) for value in days[0]["value"]] == [int, float, int]
+
+
+def test_vectorized_rounding_matches_python():
+    # Millisecond offsets, including half-way cases such as 254635500 ms
+    rng = random.Random(7)
+    offsets = [0, 254635500, 300, 900, 1500] + [rng.randrange(0, 86400000) for _ in range(50000)]
+    offsets += [600 * rng.randrange(0, 144000) + 300 for _ in range(5000)]
+    start = 1700000000000
+    columns = Util.sample_columns([[start + offset, 60] for offset in offsets])
+
+    times, _, _ = Util.relative_columns(columns)
+    expected = []
+    Util._append_samples([[start + offset, 60] for offset in offsets], start, expected, [])
+    assert times.tolist() == expected
+
+
+def test_heart_rate_stream_reader_columns_fallback():
+    text = '[{"d": {"heartRateValues": [[1000, 61], [61000, null], [121000, 62.5], [181000, 63, "x"]]}}]'
+
+    events = list(HeartRateStreamReader(io.StringIO(text), chunk_size=8, columns=True))
+
+    samples = []
+    for kind, _, payload in events:
+        if kind == "columns":
+            samples.extend((int(ts), None if value != value else value) for ts, value in payload)
+        elif kind == "samples":
+            samples.extend(payload)
+    assert samples == [(1000, 61), (61000, None), (121000, 62.5), (181000, 63)]
+
+
+def test_lttb_downsampling():
+    times = [i / 10 for i in range(10000)]
+    values = [60 + (i % 500) // 10 for i in range(10000)]
+    values[4321] = 190  # A spike must survive downsampling
+
+    indices = Downsample.lttb_indices(times, values, 500)
+
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == 9999
+    assert indices == sorted(set(indices))
+    assert 4321 in indices
+    assert indices == Downsample._lttb_indices_python(times, values, 500)
+    assert Downsample.lttb_indices(times[:10], values[:10], 500) == list(range(10))
+
+
+def test_pyramid_levels_and_window():
+    # One sample every 5 seconds for two hours
+    data = {
+        "date_of_measurement": "2024-01-01",
+        "time": [round(i * 5 / 60, 2) for i in range(1440)],
+        "value": [60 + i % 12 for i in range(1440)],
+        "metadata": {},
+    }
+
+    levels = Pyramid.build(data)
+    assert sorted(levels) == [10, 60, 600]  # 1 s buckets would not reduce anything
+    assert levels[60][0] == 120
+
+    minute = Pyramid.read(levels[60][1])
+    assert minute["time"][:3] == [0.0, 1.0, 2.0]
+    assert minute["min"][0] == 60 and minute["max"][0] == 71
+    assert minute["value"][0] == 65.5
+
+    window = Pyramid.read(levels[60][1], start=10, end=19.5)
+    assert window["time"] == [float(m) for m in range(10, 20)]
+
+    assert Pyramid.choose_resolution({10: 720, 60: 120, 600: 12}, 1440, None, 1000) == 10
+    assert Pyramid.choose_resolution({10: 720, 60: 120, 600: 12}, 1440, None, 100) == 600
+    assert Pyramid.choose_resolution({10: 720, 60: 120, 600: 12}, 1440, 30, 100) == 60
+    assert Pyramid.choose_resolution({600: 12}, 700, None, 1000) is None
+
+
+def test_series_wire_round_trip():
+    data = {
+        "date_of_measurement": "2024-01-01",
+        "resolution": 60,
+        "time": [0.0, 1.0, 2.0],
+        "min": [60, 61, 62],
+        "max": [70, 71, 72],
+        "value": [65.5, 66.0, 67.25],
+        "metadata": {"restingHeartRate": 58},
+    }
+
+    blob = SeriesWire.encode(data, patient_name="test patient")
+    # Header and columns stay 8-byte aligned for typed-array views
+    assert len(blob) % 8 == 0
+    assert SeriesWire.decode(blob) == {**data, "patient_name": "test patient"}
+
+    with pytest.raises(ValueError):
+        SeriesWire.encode({"time": [0.0, 1.0], "value": [60]})
+
+
+def test_metrics_numpy_matches_python(monkeypatch):
+    data = {
+        "time": [0.0, 1.0, 2.0, 3.0, 20.0, 21.0, 22.5],
+        "value": [58, 62, 65, 101, 150, 172, 90],
+        "metadata": {"restingHeartRate": 57},
+    }
+
+    computed = Metrics.compute(data)
+    # The 17 minute gap counts towards no zone and no successive difference
+    assert computed["zone_minutes"] == {
+        "below_60": 1.0,
+        "60_to_99": 2.0,
+        "100_to_139": 0.0,
+        "140_to_169": 1.0,
+        "170_and_above": 1.5,
+    }
+    assert computed["rmssd"] == round(((4**2 + 3**2 + 36**2 + 22**2 + 82**2) / 5) ** 0.5, 2)
+    assert computed["rolling_mean"]["time"] == [3.0, 22.5]
+    assert computed["resting_hr_estimate"] == 137.3
+
+    monkeypatch.setattr(metrics, "np", None)
+    assert Metrics.compute(data) == computed
+    assert Metrics.compute({"time": [], "value": []})["mean_hr"] is None
+
+
+def test_anomaly_detect_numpy_matches_python(monkeypatch):
+    times = [float(t) for t in range(40)] + [100.0, 101.0]
+    # 12 minutes above 100 bpm; 8 and 1 minutes below 50 are not sustained
+    values = [70] * 5 + [110, 130, 125] + [105] * 10 + [70] * 5 + [45] * 9 + [70] * 8 + [40, 40]
+    data = {"time": times, "value": values}
+
+    flags = AnomalyScan.detect(data)
+    assert flags == [
+        {"kind": "tachycardia", "start_minute": 5.0, "end_minute": 17.0, "peak_hr": 130.0},
+        {"kind": "gap", "start_minute": 39.0, "end_minute": 100.0, "peak_hr": None},
+    ]
+
+    monkeypatch.setattr(anomaly, "np", None)
+    assert AnomalyScan.detect(data) == flags
+
+
+def test_password_hasher(tmp_path):
+    hasher = PasswordHasher(workers=1, rounds=4, max_pending=2, slot_folder=str(tmp_path))
+    hashed = hasher.hash("secret")
+    assert hashed.startswith("$2b$04$")
+    assert hasher.verify("secret", hashed)
+    assert not hasher.verify("wrong", hashed)
+    assert not hasher.verify("secret", None)
+    assert not hasher.needs_rehash(hashed)
+
+    # Werkzeug hashes from before bcrypt still verify, then get upgraded
+    legacy = generate_password_hash("secret")
+    assert hasher.verify("secret", legacy)
+    assert hasher.needs_rehash(legacy)
+    hasher.rounds = 5
+    assert hasher.needs_rehash(hashed)
+
+    # bcrypt would only compare the first 72 bytes
+    with pytest.raises(ValueError):
+        hash_password("x" * 73, 4)
+    assert not hasher.verify("secret" + "x" * 72, hasher.hash("secret" + "x" * 66))
+
+    # Slots are shared by every hasher, and so every worker, using the folder
+    other = PasswordHasher(workers=1, rounds=4, max_pending=2, slot_folder=str(tmp_path))
+    other.start()
+    held = [hasher._acquire_slot(), hasher._acquire_slot()]
+    with pytest.raises(PasswordHasherBusy):
+        other.hash("secret")
+    os.close(held.pop())
+    assert other.verify("secret", hashed)
+    os.close(held.pop())
+
+
+def test_ingest_pool_is_shared_per_process():
+    executor = Ingest.pool(2)
+    assert Ingest.pool(4) is executor
+    assert [days for days, _ in Ingest.parse_many(["missing.json"])] == [None]
+    assert Ingest.pool(2) is executor